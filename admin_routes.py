@@ -1,12 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+import io
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, Response, stream_with_context
 from models import (
-    get_all_blood_requests, get_all_donations, update_request_status,
-    get_blood_inventory, get_admin_statistics, search_requests
+    fulfill_blood_request, complete_donation, get_blood_inventory, search_requests,
+    get_blood_requests_page, get_donations_page, DEFAULT_PAGE_SIZE,
+    receive_units, withdraw_units, sweep_expired_lots, get_expiring_lots,
+    HOSPITALS, BLOOD_GROUPS, plan_allocation, apply_allocation,
+    get_admin_dashboard, FORECAST_HORIZON_HOURS
 )
+from bulk_import import import_rows, detect_format, IMPORT_KINDS
+from bulk_export import export_rows, export_filename, EXPORT_FORMATS, EXPORT_KINDS
 import logging
 
 admin_bp = Blueprint('admin', __name__)
 
+# Fields rendered by each admin listing
+RECENT_REQUEST_FIELDS = ['user_name', 'hospital', 'blood_group', 'units', 'status']
+REQUEST_LIST_FIELDS = ['user_name', 'hospital', 'blood_group', 'units', 'mobile', 'status']
+DONATION_LIST_FIELDS = ['user_name', 'hospital', 'blood_group', 'units', 'mobile', 'status']
+
 def admin_required(f):
     """Decorator to require admin login"""
     def decorated_function(*args, **kwargs):
@@ -20,23 +31,26 @@ def admin_required(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def get_page_args():
+    """Read page size and cursor from the query string"""
+    page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+    cursor = request.args.get('cursor', '') or None
+    return page_size, cursor
+
 @admin_bp.route('/dashboard')
 @admin_required
 def dashboard():
     """Admin dashboard with overview"""
-    # Get statistics
-    stats = get_admin_statistics()
-    
-    # Get recent requests
-    recent_requests = get_all_blood_requests(limit=10)
-    
-    # Get blood inventory
-    inventory = get_blood_inventory()
+    # Statistics, recent requests, inventory and projected shortages,
+    # served from cache until it expires or a write invalidates it
+    dashboard_data = get_admin_dashboard(recent_limit=10, recent_fields=RECENT_REQUEST_FIELDS)
     
     return render_template('admin_dashboard.html', 
-                         stats=stats,
-                         recent_requests=recent_requests,
-                         inventory=inventory)
+                         stats=dashboard_data['stats'],
+                         recent_requests=dashboard_data['recent_requests'],
+                         inventory=dashboard_data['inventory'],
+                         shortages=dashboard_data['shortages'],
+                         forecast_hours=FORECAST_HORIZON_HOURS)
 
 @admin_bp.route('/requests')
 @admin_required
@@ -46,24 +60,35 @@ def view_requests():
     blood_group_filter = request.args.get('blood_group', '')
     search_query = request.args.get('search', '')
     
+    page_size, cursor = get_page_args()
+    next_cursor = None
+    
     # Get filtered requests
     if search_query:
-        requests = search_requests(search_query, status_filter, blood_group_filter)
+        requests = search_requests(search_query, status_filter, blood_group_filter, fields=REQUEST_LIST_FIELDS)
     else:
-        requests = get_all_blood_requests(status_filter, blood_group_filter)
+        try:
+            requests, next_cursor = get_blood_requests_page(status_filter, blood_group_filter, page_size, cursor, fields=REQUEST_LIST_FIELDS)
+        except ValueError:
+            flash('Invalid page link - showing the first page', 'warning')
+            cursor = None
+            requests, next_cursor = get_blood_requests_page(status_filter, blood_group_filter, page_size, fields=REQUEST_LIST_FIELDS)
     
     return render_template('admin_dashboard.html', 
                          show_requests=True,
                          requests=requests,
                          status_filter=status_filter,
                          blood_group_filter=blood_group_filter,
-                         search_query=search_query)
+                         search_query=search_query,
+                         page_size=page_size,
+                         cursor=cursor,
+                         next_cursor=next_cursor)
 
 @admin_bp.route('/fulfill-request/<request_id>')
 @admin_required
 def fulfill_request(request_id):
     """Mark a blood request as fulfilled"""
-    success = update_request_status(request_id, 'fulfilled')
+    success = fulfill_blood_request(request_id)
     
     if success:
         flash('Blood request marked as fulfilled!', 'success')
@@ -76,18 +101,164 @@ def fulfill_request(request_id):
 @admin_required
 def view_donations():
     """View all donation schedules"""
-    donations = get_all_donations()
+    page_size, cursor = get_page_args()
+    
+    try:
+        donations, next_cursor = get_donations_page(page_size, cursor, fields=DONATION_LIST_FIELDS)
+    except ValueError:
+        flash('Invalid page link - showing the first page', 'warning')
+        cursor = None
+        donations, next_cursor = get_donations_page(page_size, fields=DONATION_LIST_FIELDS)
     
     return render_template('admin_dashboard.html', 
                          show_donations=True,
-                         donations=donations)
+                         donations=donations,
+                         page_size=page_size,
+                         cursor=cursor,
+                         next_cursor=next_cursor)
+
+@admin_bp.route('/complete-donation/<donation_id>')
+@admin_required
+def complete_donation_schedule(donation_id):
+    """Mark a scheduled donation as completed"""
+    success = complete_donation(donation_id)
+    
+    if success:
+        flash('Donation marked as completed - inventory will update shortly', 'success')
+    else:
+        flash('Failed to update donation status', 'danger')
+    
+    return redirect(url_for('admin.view_donations'))
 
 @admin_bp.route('/inventory')
 @admin_required
 def view_inventory():
     """View blood inventory management"""
+    expiring_days = max(1, request.args.get('expiring_days', 7, type=int))
+    
     inventory = get_blood_inventory()
+    expiring_lots = get_expiring_lots(expiring_days)
     
     return render_template('admin_dashboard.html', 
                          show_inventory=True,
-                         inventory=inventory)
+                         inventory=inventory,
+                         expiring_lots=expiring_lots,
+                         expiring_days=expiring_days,
+                         hospitals=HOSPITALS,
+                         blood_groups=BLOOD_GROUPS)
+
+@admin_bp.route('/inventory/adjust', methods=['POST'])
+@admin_required
+def adjust_inventory_units():
+    """Receive a lot of units or withdraw units for one hospital and blood group"""
+    hospital = request.form.get('hospital', '')
+    blood_group = request.form.get('blood_group', '')
+    units = request.form.get('units', 0, type=int)
+    expiry_date = request.form.get('expiry_date', '').strip() or None
+    
+    if not units:
+        flash('Enter a non-zero number of units', 'danger')
+        return redirect(url_for('admin.view_inventory'))
+    
+    try:
+        if units > 0:
+            units_available = receive_units(hospital, blood_group, units, expiry_date)
+        else:
+            result = withdraw_units(hospital, blood_group, -units)
+            units_available = result[0] if result else None
+    except ValueError:
+        flash('Please select a valid hospital, blood group and expiry date', 'danger')
+        return redirect(url_for('admin.view_inventory'))
+    
+    if units_available is None:
+        flash(f'Not enough {blood_group} stock at {hospital} to withdraw {-units} units', 'danger')
+    else:
+        flash(f'{hospital} now has {units_available} units of {blood_group}', 'success')
+    
+    return redirect(url_for('admin.view_inventory'))
+
+@admin_bp.route('/inventory/sweep-expired', methods=['POST'])
+@admin_required
+def sweep_expired_inventory():
+    """Remove expired lots now instead of waiting for the background sweep"""
+    swept = sweep_expired_lots()
+    if swept:
+        flash(f'Removed {swept} expired units from inventory', 'success')
+    else:
+        flash('No expired units to remove', 'info')
+    return redirect(url_for('admin.view_inventory'))
+
+@admin_bp.route('/allocation')
+@admin_required
+def view_allocation():
+    """Preview how pending requests would be filled from current stock"""
+    plan = plan_allocation()
+    
+    return render_template('admin_dashboard.html', 
+                         show_allocation=True,
+                         plan=plan)
+
+@admin_bp.route('/allocation/apply', methods=['POST'])
+@admin_required
+def apply_allocation_plan():
+    """Fulfil pending requests and withdraw the allocated stock"""
+    plan = apply_allocation()
+    
+    if plan['applied']:
+        flash(f"Fulfilled {len(plan['applied'])} requests using {plan['allocated_units']} planned units", 'success')
+    else:
+        flash('No pending requests could be fulfilled from current stock', 'warning')
+    if plan['failed']:
+        flash(f"{len(plan['failed'])} requests were skipped because they or the stock changed meanwhile", 'warning')
+    
+    return redirect(url_for('admin.view_allocation'))
+
+@admin_bp.route('/import', methods=['POST'])
+@admin_required
+def import_data():
+    """Bulk import an uploaded CSV or NDJSON file"""
+    kind = request.form.get('kind', '')
+    upload = request.files.get('file')
+    
+    if kind not in IMPORT_KINDS or not upload or not upload.filename:
+        flash('Choose what to import and a CSV or NDJSON file', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    # Rows are parsed straight off the upload stream, never buffered whole
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+    report = import_rows(kind, stream, detect_format(upload.filename))
+    
+    flash(f"Imported {report['imported']} of {report['rows']} {kind} rows "
+          f"({report['rows_per_second']} rows/sec)", 'success' if report['imported'] else 'warning')
+    if report['rejected']:
+        details = '; '.join(f"line {r['line']}: {r['reason']}" for r in report['rejects'][:5])
+        flash(f"Rejected {report['rejected']} rows - {details}", 'warning')
+    
+    return redirect(url_for('admin.dashboard'))
+
+@admin_bp.route('/export/<kind>')
+@admin_required
+def export_data(kind):
+    """Stream requests or donations as CSV or NDJSON, optionally gzipped"""
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        flash('Unsupported export', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    compress = request.args.get('gzip', '') in ('1', 'true', 'on')
+    filters = {
+        'status': request.args.get('status', ''),
+        'blood_group': request.args.get('blood_group', '')
+    }
+    
+    # Rows are encoded as they are read, so nothing is buffered and the
+    # response goes out with chunked transfer encoding
+    body = stream_with_context(export_rows(kind, fmt, filters, compress))
+    mimetype = 'application/gzip' if compress else EXPORT_FORMATS[fmt]['mimetype']
+    filename = export_filename(kind, fmt, compress)
+    
+    logging.info(f"Admin {session['user']['email']} exporting {kind} as {filename}")
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no'
+    })
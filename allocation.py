@@ -0,0 +1,107 @@
+from compatibility import CAN_RECEIVE_FROM
+
+# Requests carrying an urgency are served first; everything else is routine
+URGENCY_RANK = {'emergency': 0, 'urgent': 1, 'routine': 2}
+DEFAULT_URGENCY = 'routine'
+
+def donor_preference(blood_groups):
+    """Donor groups for each recipient, least versatile donor first
+
+    Spending the donor group that the fewest recipients can use keeps
+    universal stock such as O- for the requests that have no alternative.
+    """
+    versatility = {
+        donor: sum(donor in donors for donors in CAN_RECEIVE_FROM.values())
+        for donor in blood_groups
+    }
+    return {
+        recipient: sorted(
+            CAN_RECEIVE_FROM[recipient],
+            key=lambda donor: (donor != recipient, versatility[donor])
+        )
+        for recipient in blood_groups
+    }
+
+def request_priority(request):
+    """Sort key: most urgent first, then oldest first"""
+    urgency = URGENCY_RANK.get(request.get('urgency', DEFAULT_URGENCY), URGENCY_RANK[DEFAULT_URGENCY])
+    return (urgency, request.get('created_at', ''), str(request['id']))
+
+def allocate(requests, matrix):
+    """Plan which stock fulfils which pending requests
+
+    A priority greedy pass: requests are taken most urgent and oldest
+    first and each is filled whole or not at all, from the hospital it
+    named when that hospital has stock, then from the hospitals with the
+    most compatible units. Within a hospital the least versatile
+    compatible donor group is used first. Nothing is written; the plan
+    holds the allocations, the requests that could not be filled and the
+    stock left afterwards.
+    """
+    stock = [list(row) for row in matrix.stock]
+    group_index = matrix.group_index
+    hospital_index = {hospital.lower(): i for i, hospital in enumerate(matrix.hospitals)}
+    preferences = {
+        recipient: [group_index[donor] for donor in donors]
+        for recipient, donors in donor_preference(matrix.blood_groups).items()
+    }
+
+    allocations = []
+    unallocated = []
+    for request in sorted(requests, key=request_priority):
+        recipient = request.get('blood_group')
+        units = int(request.get('units', 0))
+        if recipient not in preferences or units <= 0:
+            unallocated.append({'request': request, 'reason': 'Invalid blood group or units'})
+            continue
+
+        donors = preferences[recipient]
+        totals = [sum(row[d] for d in donors) for row in stock]
+        if sum(totals) < units:
+            unallocated.append({'request': request, 'reason': 'Not enough compatible stock'})
+            continue
+
+        # Named hospital first, then the deepest compatible stock
+        preferred = hospital_index.get(str(request.get('hospital', '')).strip().lower())
+        order = sorted(
+            range(len(stock)),
+            key=lambda h: (h != preferred, -totals[h])
+        )
+
+        lines = []
+        needed = units
+        for h in order:
+            row = stock[h]
+            for d in donors:
+                if not needed:
+                    break
+                take = min(row[d], needed)
+                if take:
+                    row[d] -= take
+                    needed -= take
+                    lines.append({
+                        'hospital': matrix.hospitals[h],
+                        'blood_group': matrix.blood_groups[d],
+                        'units': take
+                    })
+            if not needed:
+                break
+
+        allocations.append({
+            'request': request,
+            'lines': lines,
+            'from_requested_hospital': all(
+                line['hospital'].lower() == str(request.get('hospital', '')).strip().lower()
+                for line in lines
+            )
+        })
+
+    return {
+        'allocations': allocations,
+        'unallocated': unallocated,
+        'allocated_units': sum(int(a['request'].get('units', 0)) for a in allocations),
+        'remaining_stock': {
+            hospital: dict(zip(matrix.blood_groups, row))
+            for hospital, row in zip(matrix.hospitals, stock)
+        }
+    }
@@ -1,5 +1,6 @@
 import os
 import logging
+import click
 from flask import Flask, render_template, session, redirect, url_for
 from werkzeug.middleware.proxy_fix import ProxyFix
 from aws_config import create_tables_if_not_exist
@@ -29,6 +30,12 @@ app.register_blueprint(auth_bp)
 app.register_blueprint(user_bp, url_prefix='/user')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 
+@app.before_request
+def start_background_jobs():
+    """Start the refresher's scheduled jobs in the serving process"""
+    from models import live_data
+    live_data.start()
+
 @app.route('/')
 def index():
     """Landing page with navigation"""
@@ -40,6 +47,54 @@ def logout():
     session.clear()
     return redirect(url_for('index'))
 
+@app.cli.command('reconcile-stats')
+def reconcile_stats():
+    """Rebuild the admin statistics counters from a full scan"""
+    from models import reconcile_admin_statistics
+    stats = reconcile_admin_statistics()
+    print(f"Reconciled admin statistics: {stats}")
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(['requests', 'donations', 'users']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Input format (default: from the file extension)')
+@click.option('--workers', type=int, default=None, help='Parallel batch writers')
+def import_data(kind, path, fmt, workers):
+    """Bulk import requests, donations or users from CSV or NDJSON"""
+    from bulk_import import import_rows, detect_format, IMPORT_WORKERS
+    fmt = fmt or detect_format(path)
+    with open(path, newline='', encoding='utf-8') as stream:
+        report = import_rows(kind, stream, fmt, workers or IMPORT_WORKERS)
+    
+    print(f"Imported {report['imported']} of {report['rows']} {kind} rows into {report['backend']} "
+          f"in {report['seconds']}s ({report['rows_per_second']} rows/sec)")
+    if report['rejected']:
+        print(f"Rejected {report['rejected']} rows:")
+        for reject in report['rejects']:
+            print(f"  line {reject['line']}: {reject['reason']}")
+
+@app.cli.command('sweep-expired')
+def sweep_expired():
+    """Remove expired inventory lots and their units"""
+    from models import sweep_expired_lots
+    swept = sweep_expired_lots()
+    print(f"Swept {swept} expired units")
+
+@app.cli.command('sweep-inventory-events')
+def sweep_inventory_events():
+    """Apply inventory changes left pending by failed or lost events"""
+    from models import sweep_pending_inventory_events, inventory_events
+    emitted = sweep_pending_inventory_events(retry_after=0)
+    inventory_events.flush()
+    print(f"Re-applied {emitted} pending inventory events")
+@app.cli.command('snapshot-inventory')
+def snapshot_inventory():
+    """Store a snapshot of the inventory grid for shortage forecasting"""
+    from models import take_inventory_snapshot
+    taken_at = take_inventory_snapshot()
+    print(f"Stored inventory snapshot at {taken_at.isoformat()}")
+
 @app.context_processor
 def inject_user():
     """Make user info available in all templates"""
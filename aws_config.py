@@ -1,5 +1,8 @@
 import os
+import time
+import threading
 import boto3
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, ClientError
 import logging
 
@@ -8,47 +11,185 @@ AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID', '')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY', '')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 
+# Connection pool settings shared by every DynamoDB call in the process
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', '50'))
+DYNAMODB_CONNECT_TIMEOUT = float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '2'))
+DYNAMODB_READ_TIMEOUT = float(os.environ.get('DYNAMODB_READ_TIMEOUT', '5'))
+DYNAMODB_MAX_ATTEMPTS = int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '3'))
+
+# Lazily created, process-wide DynamoDB resource and Table handles
+_dynamodb_lock = threading.Lock()
+_dynamodb_state = {
+    'pid': None,
+    'resource': None,
+    'tables': {},
+    'verified': set(),
+    'index_checks': {},
+    'warned': False
+}
+
+def get_dynamodb_config():
+    """Get botocore config with pooling, keep-alive and timeouts"""
+    return Config(
+        max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+        connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=DYNAMODB_READ_TIMEOUT,
+        tcp_keepalive=True,
+        retries={'max_attempts': DYNAMODB_MAX_ATTEMPTS, 'mode': 'standard'}
+    )
+
 def get_dynamodb_client():
     """Get DynamoDB client with proper configuration"""
-    try:
-        if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
-            # Real AWS credentials provided
-            client = boto3.client(
-                'dynamodb',
-                aws_access_key_id=AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-                region_name=AWS_REGION
-            )
-            logging.info("Connected to AWS DynamoDB")
-            return client
-        else:
-            # No credentials - return None to use mock data
-            logging.warning("No AWS credentials found - using mock data store")
-            return None
-    except (NoCredentialsError, ClientError) as e:
-        logging.error(f"AWS connection failed: {e}")
+    resource = get_dynamodb_resource()
+    if not resource:
         return None
+    # Share the resource's client so both use the same connection pool
+    return resource.meta.client
 
 def get_dynamodb_resource():
     """Get DynamoDB resource with proper configuration"""
-    try:
-        if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
-            # Real AWS credentials provided
-            resource = boto3.resource(
-                'dynamodb',
+    state = _dynamodb_state
+    resource = state['resource']
+    if resource is not None and state['pid'] == os.getpid():
+        return resource
+    
+    if not (AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY):
+        # No credentials - return None to use mock data
+        if not state['warned']:
+            logging.warning("No AWS credentials found - using mock data store")
+            state['warned'] = True
+        return None
+    
+    with _dynamodb_lock:
+        # Rebuild after a fork so worker processes never share sockets
+        if state['resource'] is not None and state['pid'] == os.getpid():
+            return state['resource']
+        try:
+            session = boto3.session.Session(
                 aws_access_key_id=AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
                 region_name=AWS_REGION
             )
+            resource = session.resource('dynamodb', config=get_dynamodb_config())
+            state['tables'] = {}
+            state['verified'] = set()
+            state['resource'] = resource
+            state['pid'] = os.getpid()
             logging.info("Connected to AWS DynamoDB Resource")
             return resource
-        else:
-            # No credentials - return None to use mock data
-            logging.warning("No AWS credentials found - using mock data store")
+        except (NoCredentialsError, ClientError) as e:
+            logging.error(f"AWS DynamoDB Resource connection failed: {e}")
             return None
-    except (NoCredentialsError, ClientError) as e:
-        logging.error(f"AWS DynamoDB Resource connection failed: {e}")
+
+def get_table(table_name):
+    """Get a cached DynamoDB Table handle, verified once with DescribeTable"""
+    resource = get_dynamodb_resource()
+    if not resource:
         return None
+    
+    state = _dynamodb_state
+    table = state['tables'].get(table_name)
+    if table is not None and table_name in state['verified']:
+        return table
+    
+    with _dynamodb_lock:
+        table = state['tables'].get(table_name)
+        if table is None:
+            table = resource.Table(table_name)
+            state['tables'][table_name] = table
+        if table_name not in state['verified']:
+            # Raises ResourceNotFoundException if the table is missing
+            table.load()
+            state['verified'].add(table_name)
+            logging.info(f"Verified table {table_name}")
+    return table
+
+def mark_table_verified(table_name, table):
+    """Record a table whose existence and schema are already known"""
+    with _dynamodb_lock:
+        _dynamodb_state['tables'][table_name] = table
+        _dynamodb_state['verified'].add(table_name)
+
+def invalidate_table(table_name):
+    """Forget cached metadata so the next get_table() verifies again"""
+    with _dynamodb_lock:
+        _dynamodb_state['tables'].pop(table_name, None)
+        _dynamodb_state['verified'].discard(table_name)
+
+def is_table_missing(error):
+    """Check whether an error is a DynamoDB ResourceNotFoundException"""
+    if not isinstance(error, ClientError):
+        return False
+    return error.response.get('Error', {}).get('Code') == 'ResourceNotFoundException'
+
+def invalidate_table_if_missing(table_name, error):
+    """Invalidate cached table metadata when DynamoDB reports it missing"""
+    if is_table_missing(error):
+        logging.warning(f"Table {table_name} not found - invalidating cached metadata")
+        invalidate_table(table_name)
+
+# How often to re-describe a table while one of its indexes is still building
+INDEX_STATUS_RECHECK_SECONDS = 60
+
+def build_global_secondary_index(index_name, hash_key, range_key=None):
+    """Build a GSI definition projecting all attributes"""
+    key_schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+    if range_key:
+        key_schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+    return {
+        'IndexName': index_name,
+        'KeySchema': key_schema,
+        'Projection': {'ProjectionType': 'ALL'}
+    }
+
+def ensure_global_secondary_indexes(table, indexes, attribute_definitions):
+    """Add any GSIs missing from an existing table"""
+    existing = {index['IndexName'] for index in (table.global_secondary_indexes or [])}
+    for index in indexes:
+        if index['IndexName'] in existing:
+            continue
+        key_names = {key['AttributeName'] for key in index['KeySchema']}
+        try:
+            table.meta.client.update_table(
+                TableName=table.name,
+                AttributeDefinitions=[
+                    attribute for attribute in attribute_definitions
+                    if attribute['AttributeName'] in key_names
+                ],
+                GlobalSecondaryIndexUpdates=[{'Create': index}]
+            )
+            logging.info(f"Creating index {index['IndexName']} on {table.name}")
+        except ClientError as e:
+            # DynamoDB builds one new index per table at a time; the rest are
+            # requested on a later startup once this one is active
+            logging.warning(f"Deferred index {index['IndexName']} on {table.name}: {e}")
+        break
+
+def is_index_active(table_name, index_name):
+    """Check cached table metadata for an ACTIVE global secondary index"""
+    table = get_table(table_name)
+    if not table:
+        return False
+    
+    def index_status():
+        for index in table.global_secondary_indexes or []:
+            if index['IndexName'] == index_name:
+                return index.get('IndexStatus')
+        return None
+    
+    if index_status() == 'ACTIVE':
+        return True
+    
+    # Index is missing or still backfilling - refresh metadata occasionally
+    checks = _dynamodb_state['index_checks']
+    now = time.monotonic()
+    with _dynamodb_lock:
+        key = (table_name, index_name)
+        if now - checks.get(key, 0) < INDEX_STATUS_RECHECK_SECONDS:
+            return False
+        checks[key] = now
+        table.reload()
+    return index_status() == 'ACTIVE'
 
 def create_tables_if_not_exist():
     """Create DynamoDB tables if they don't exist"""
@@ -85,64 +226,75 @@ def create_tables_if_not_exist():
             )
             users_table.wait_until_exists()
             logging.info(f"Created table {USERS_TABLE}")
+        mark_table_verified(USERS_TABLE, users_table)
 
         # Blood requests table
+        requests_attributes = [
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'user_id', 'AttributeType': 'S'},
+            {'AttributeName': 'status', 'AttributeType': 'S'},
+            {'AttributeName': 'blood_group', 'AttributeType': 'S'},
+            {'AttributeName': 'created_at', 'AttributeType': 'S'},
+            {'AttributeName': 'inventory_pending_at', 'AttributeType': 'S'}
+        ]
+        requests_indexes = [
+            build_global_secondary_index(USER_ACTIVITY_INDEX, 'user_id', 'created_at')
+        ] + [
+            build_global_secondary_index(index_name, attribute, 'created_at')
+            for attribute, index_name in REQUEST_FILTER_INDEXES.items()
+        ] + [
+            build_global_secondary_index(INVENTORY_PENDING_INDEX, 'status', 'inventory_pending_at')
+        ]
         try:
             requests_table = dynamodb.Table(REQUESTS_TABLE)
             requests_table.load()
             logging.info(f"Table {REQUESTS_TABLE} already exists")
+            ensure_global_secondary_indexes(requests_table, requests_indexes, requests_attributes)
         except dynamodb.meta.client.exceptions.ResourceNotFoundException:
             requests_table = dynamodb.create_table(
                 TableName=REQUESTS_TABLE,
                 KeySchema=[
                     {'AttributeName': 'id', 'KeyType': 'HASH'}
                 ],
-                AttributeDefinitions=[
-                    {'AttributeName': 'id', 'AttributeType': 'S'},
-                    {'AttributeName': 'user_id', 'AttributeType': 'S'}
-                ],
-                GlobalSecondaryIndexes=[
-                    {
-                        'IndexName': 'user_id-index',
-                        'KeySchema': [
-                            {'AttributeName': 'user_id', 'KeyType': 'HASH'}
-                        ],
-                        'Projection': {'ProjectionType': 'ALL'}
-                    }
-                ],
+                AttributeDefinitions=requests_attributes,
+                GlobalSecondaryIndexes=requests_indexes,
                 BillingMode='PAY_PER_REQUEST'
             )
             requests_table.wait_until_exists()
             logging.info(f"Created table {REQUESTS_TABLE}")
+        mark_table_verified(REQUESTS_TABLE, requests_table)
 
         # Donations table
+        donations_attributes = [
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'user_id', 'AttributeType': 'S'},
+            {'AttributeName': 'status', 'AttributeType': 'S'},
+            {'AttributeName': 'created_at', 'AttributeType': 'S'},
+            {'AttributeName': 'inventory_pending_at', 'AttributeType': 'S'}
+        ]
+        donations_indexes = [
+            build_global_secondary_index(USER_ACTIVITY_INDEX, 'user_id', 'created_at'),
+            build_global_secondary_index(DONATION_STATUS_INDEX, 'status', 'created_at'),
+            build_global_secondary_index(INVENTORY_PENDING_INDEX, 'status', 'inventory_pending_at')
+        ]
         try:
             donations_table = dynamodb.Table(DONATIONS_TABLE)
             donations_table.load()
             logging.info(f"Table {DONATIONS_TABLE} already exists")
+            ensure_global_secondary_indexes(donations_table, donations_indexes, donations_attributes)
         except dynamodb.meta.client.exceptions.ResourceNotFoundException:
             donations_table = dynamodb.create_table(
                 TableName=DONATIONS_TABLE,
                 KeySchema=[
                     {'AttributeName': 'id', 'KeyType': 'HASH'}
                 ],
-                AttributeDefinitions=[
-                    {'AttributeName': 'id', 'AttributeType': 'S'},
-                    {'AttributeName': 'user_id', 'AttributeType': 'S'}
-                ],
-                GlobalSecondaryIndexes=[
-                    {
-                        'IndexName': 'user_id-index',
-                        'KeySchema': [
-                            {'AttributeName': 'user_id', 'KeyType': 'HASH'}
-                        ],
-                        'Projection': {'ProjectionType': 'ALL'}
-                    }
-                ],
+                AttributeDefinitions=donations_attributes,
+                GlobalSecondaryIndexes=donations_indexes,
                 BillingMode='PAY_PER_REQUEST'
             )
             donations_table.wait_until_exists()
             logging.info(f"Created table {DONATIONS_TABLE}")
+        mark_table_verified(DONATIONS_TABLE, donations_table)
 
         # Inventory table
         try:
@@ -162,6 +314,53 @@ def create_tables_if_not_exist():
             )
             inventory_table.wait_until_exists()
             logging.info(f"Created table {INVENTORY_TABLE}")
+        mark_table_verified(INVENTORY_TABLE, inventory_table)
+
+        # Inventory lots table (one item per received batch of units)
+        lots_attributes = [
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'hospital', 'AttributeType': 'S'},
+            {'AttributeName': 'blood_group', 'AttributeType': 'S'}
+        ]
+        lots_indexes = [build_global_secondary_index(LOT_GROUP_INDEX, 'hospital', 'blood_group')]
+        try:
+            lots_table = dynamodb.Table(INVENTORY_LOTS_TABLE)
+            lots_table.load()
+            logging.info(f"Table {INVENTORY_LOTS_TABLE} already exists")
+            ensure_global_secondary_indexes(lots_table, lots_indexes, lots_attributes)
+        except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+            lots_table = dynamodb.create_table(
+                TableName=INVENTORY_LOTS_TABLE,
+                KeySchema=[
+                    {'AttributeName': 'id', 'KeyType': 'HASH'}
+                ],
+                AttributeDefinitions=lots_attributes,
+                GlobalSecondaryIndexes=lots_indexes,
+                BillingMode='PAY_PER_REQUEST'
+            )
+            lots_table.wait_until_exists()
+            logging.info(f"Created table {INVENTORY_LOTS_TABLE}")
+        mark_table_verified(INVENTORY_LOTS_TABLE, lots_table)
+
+        # Statistics counters table
+        try:
+            stats_table = dynamodb.Table(STATS_TABLE)
+            stats_table.load()
+            logging.info(f"Table {STATS_TABLE} already exists")
+        except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+            stats_table = dynamodb.create_table(
+                TableName=STATS_TABLE,
+                KeySchema=[
+                    {'AttributeName': 'id', 'KeyType': 'HASH'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'id', 'AttributeType': 'S'}
+                ],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            stats_table.wait_until_exists()
+            logging.info(f"Created table {STATS_TABLE}")
+        mark_table_verified(STATS_TABLE, stats_table)
             
         return True
     except Exception as e:
@@ -194,6 +393,29 @@ USERS_TABLE = 'blood_bank_users'
 REQUESTS_TABLE = 'blood_requests'
 DONATIONS_TABLE = 'donations'
 INVENTORY_TABLE = 'blood_inventory'
+INVENTORY_LOTS_TABLE = 'blood_inventory_lots'
+STATS_TABLE = 'blood_bank_stats'
+
+# Per-user history index (hash on user_id, range on created_at). The
+# original user_id-index has no range key and is only kept on old tables.
+USER_ACTIVITY_INDEX = 'user_id-created_at-index'
+LEGACY_USER_ID_INDEX = 'user_id-index'
+
+# Filter attribute -> GSI (hash on the attribute, range on created_at)
+REQUEST_FILTER_INDEXES = {
+    'blood_group': 'blood_group-created_at-index',
+    'status': 'status-created_at-index'
+}
+
+# Donations are listed newest first by merging this index's status partitions
+DONATION_STATUS_INDEX = 'status-created_at-index'
+
+# Sparse index of requests and donations whose inventory change is still
+# pending: only items carrying inventory_pending_at appear in it
+INVENTORY_PENDING_INDEX = 'status-inventory_pending_at-index'
+
+# One hospital and blood group's lots, read when a process's lot index misses them
+LOT_GROUP_INDEX = 'hospital-blood_group-index'
 
 # S3 bucket for document uploads
 S3_BUCKET = os.environ.get('S3_BUCKET_NAME', 'blood-bank-documents')
@@ -0,0 +1,98 @@
+import io
+import csv
+import json
+import zlib
+from decimal import Decimal
+import models
+
+# Encoded output is flushed to the client in blocks of about this size
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': {'mimetype': 'text/csv', 'extension': 'csv'},
+    'ndjson': {'mimetype': 'application/x-ndjson', 'extension': 'ndjson'}
+}
+
+EXPORT_KINDS = {
+    'requests': {
+        'fields': ['id', 'created_at', 'user_id', 'user_name', 'hospital', 'blood_group',
+                   'units', 'mobile', 'status', 'updated_at'],
+        'stream': lambda filters, fields: models.stream_blood_requests(
+            filters.get('status'), filters.get('blood_group'), fields=fields
+        )
+    },
+    'donations': {
+        'fields': ['id', 'created_at', 'user_id', 'user_name', 'hospital', 'blood_group',
+                   'units', 'mobile', 'status'],
+        'stream': lambda filters, fields: models.stream_donations(fields=fields)
+    }
+}
+
+def plain_value(value):
+    """Turn DynamoDB Decimals back into ints or floats"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+def encode_csv(chunks, fields):
+    """Yield CSV text, one block per chunk of records, header first"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows({field: plain_value(record.get(field)) for field in fields} for record in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def encode_ndjson(chunks, fields):
+    """Yield NDJSON text, one block per chunk of records"""
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps({field: plain_value(record.get(field)) for field in fields}, default=str) + '\n'
+            for record in chunk
+        )
+
+def gzip_blocks(blocks):
+    """Gzip a stream of byte blocks incrementally"""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def coalesce(blocks, size=EXPORT_FLUSH_BYTES):
+    """Join small encoded blocks so each write to the client is about size bytes"""
+    pending = []
+    pending_size = 0
+    for block in blocks:
+        if not block:
+            continue
+        pending.append(block)
+        pending_size += len(block)
+        if pending_size >= size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield b''.join(pending)
+
+def export_rows(kind, fmt='csv', filters=None, compress=False):
+    """Yield the encoded bytes of an export as records are read from the store"""
+    config = EXPORT_KINDS[kind]
+    fields = config['fields']
+    chunks = config['stream'](filters or {}, fields)
+    encode = encode_csv if fmt == 'csv' else encode_ndjson
+
+    blocks = (text.encode('utf-8') for text in encode(chunks, fields))
+    if compress:
+        blocks = gzip_blocks(blocks)
+    return coalesce(blocks)
+
+def export_filename(kind, fmt, compress=False):
+    """Download file name for an export"""
+    filename = f"blood_{kind}.{EXPORT_FORMATS[fmt]['extension']}"
+    return filename + '.gz' if compress else filename
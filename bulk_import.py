@@ -0,0 +1,248 @@
+import os
+import csv
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash
+from aws_config import get_table, USERS_TABLE, REQUESTS_TABLE, DONATIONS_TABLE
+from dynamodb_utils import batch_get_items, build_projection
+import models
+
+# Rows handed to one writer task, and how many writer tasks run at once
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '4'))
+
+# Only the first rejects are kept for the report; the rest are just counted
+MAX_REPORTED_REJECTS = 100
+
+IMPORT_KINDS = {
+    'requests': {'table': REQUESTS_TABLE, 'collection': 'blood_requests', 'statuses': models.REQUEST_STATUSES},
+    'donations': {'table': DONATIONS_TABLE, 'collection': 'donations', 'statuses': models.DONATION_STATUSES},
+    'users': {'table': USERS_TABLE, 'collection': 'users', 'statuses': None}
+}
+
+def detect_format(filename):
+    """Guess csv or ndjson from a file name"""
+    lower = (filename or '').lower()
+    if lower.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+def iter_rows(stream, fmt):
+    """Yield (line_number, row, error) from a CSV or NDJSON text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, row, None
+
+def required_text(row, field):
+    """Stripped text value of a required field"""
+    value = str(row.get(field) or '').strip()
+    if not value:
+        raise ValueError(f"Missing {field}")
+    return value
+
+def normalise_created_at(row):
+    """Keep a historical created_at if valid, otherwise stamp now"""
+    created_at = str(row.get('created_at') or '').strip()
+    if not created_at:
+        return datetime.now().isoformat()
+    try:
+        return datetime.fromisoformat(created_at).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid created_at: {created_at}")
+
+def validate_activity_row(row, statuses):
+    """Normalise a blood request or donation row; the first status is the default"""
+    record = {
+        field: required_text(row, field)
+        for field in ('user_id', 'hospital', 'blood_group', 'mobile')
+    }
+    if record['blood_group'] not in models.BLOOD_GROUPS:
+        raise ValueError(f"Invalid blood_group: {record['blood_group']}")
+
+    try:
+        record['units'] = int(str(row.get('units', '')).strip())
+    except ValueError:
+        raise ValueError(f"Invalid units: {row.get('units')}")
+    if record['units'] <= 0:
+        raise ValueError("Units must be positive")
+
+    record['status'] = str(row.get('status') or statuses[0]).strip()
+    if record['status'] not in statuses:
+        raise ValueError(f"Invalid status: {record['status']}")
+    record['created_at'] = normalise_created_at(row)
+    record['id'] = str(row.get('id') or uuid.uuid4())
+    return record
+
+def validate_user_row(row):
+    """Normalise a user row, hashing a plain password if one is given"""
+    record = {
+        field: required_text(row, field)
+        for field in ('name', 'email', 'role', 'blood_group', 'mobile')
+    }
+    if record['role'] not in ('user', 'admin'):
+        raise ValueError(f"Invalid role: {record['role']}")
+    if record['blood_group'] not in models.BLOOD_GROUPS:
+        raise ValueError(f"Invalid blood_group: {record['blood_group']}")
+
+    if row.get('password_hash'):
+        record['password_hash'] = str(row['password_hash'])
+    elif row.get('password'):
+        record['password_hash'] = generate_password_hash(str(row['password']))
+    else:
+        raise ValueError("Missing password or password_hash")
+
+    record['hospital'] = str(row.get('hospital') or '').strip()
+    record['admin_id'] = str(row.get('admin_id') or '').strip()
+    if record['role'] == 'admin' and not models.validate_admin_id(record['admin_id']):
+        raise ValueError(f"Invalid admin_id: {record['admin_id']}")
+
+    record['created_at'] = normalise_created_at(row)
+    record['id'] = str(row.get('id') or uuid.uuid4())
+    return record
+
+def write_batch_to_dynamodb(table_name, records):
+    """Write the records whose ids are not yet taken; returns those written
+
+    Existing ids are read first with BatchGetItem, as batch writes cannot
+    be conditional. A record created under the same id between the read
+    and the write is still overwritten.
+    """
+    existing = {item['id'] for item in batch_get_items(table_name, [record['id'] for record in records], **build_projection(['id']))}
+    new_records = [record for record in records if record['id'] not in existing]
+    table = get_table(table_name)
+    with table.batch_writer(overwrite_by_pkeys=['id']) as batch:
+        for record in new_records:
+            batch.put_item(Item=record)
+    return new_records
+
+def import_rows(kind, stream, fmt='csv', workers=IMPORT_WORKERS):
+    """Stream, validate and batch-write rows, returning an import report"""
+    config = IMPORT_KINDS[kind]
+    use_dynamodb = bool(models.get_dynamodb_resource())
+    collection = models.mock_data[config['collection']]
+
+    report = {
+        'kind': kind,
+        'backend': 'dynamodb' if use_dynamodb else models.LOCAL_STORAGE_BACKEND,
+        'rows': 0,
+        'imported': 0,
+        'rejected': 0,
+        'rejects': []
+    }
+    status_counts = Counter()
+    seen_ids = set()
+    seen_emails = set()
+    lock = threading.Lock()
+    # Bounds parsed-but-unwritten rows to a few batches per worker
+    in_flight = threading.BoundedSemaphore(max(1, workers) * 2)
+
+    def reject(line_number, reason):
+        with lock:
+            report['rejected'] += 1
+            if len(report['rejects']) < MAX_REPORTED_REJECTS:
+                report['rejects'].append({'line': line_number, 'reason': reason})
+
+    def write(batch):
+        try:
+            if kind == 'users':
+                # One lookup pass per batch, off the parse loop
+                registered = models.find_registered_emails([record['email'] for _, record in batch])
+                for line_number, record in batch:
+                    if record['email'] in registered:
+                        reject(line_number, f"Email already registered: {record['email']}")
+                batch = [(line_number, record) for line_number, record in batch if record['email'] not in registered]
+            records = [record for _, record in batch]
+            if use_dynamodb:
+                written = write_batch_to_dynamodb(config['table'], records)
+            else:
+                written = collection.insert_many_new(records)
+            with lock:
+                report['imported'] += len(written)
+                status_counts.update(record.get('status') for record in written)
+            written_ids = {record['id'] for record in written}
+            for line_number, record in batch:
+                if record['id'] not in written_ids:
+                    reject(line_number, f"id already exists: {record['id']}")
+        except Exception as e:
+            logging.error(f"Bulk import batch of {len(batch)} {kind} failed: {e}")
+            for line_number, _ in batch:
+                reject(line_number, f"Write failed: {e}")
+        finally:
+            in_flight.release()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='bulk-import') as executor:
+        batch = []
+        for line_number, row, error in iter_rows(stream, fmt):
+            report['rows'] += 1
+            if error:
+                reject(line_number, error)
+                continue
+            try:
+                if kind == 'users':
+                    record = validate_user_row(row)
+                    if record['email'] in seen_emails:
+                        raise ValueError(f"Duplicate email in file: {record['email']}")
+                    seen_emails.add(record['email'])
+                else:
+                    record = validate_activity_row(row, config['statuses'])
+                if record['id'] in seen_ids:
+                    raise ValueError(f"Duplicate id in file: {record['id']}")
+                seen_ids.add(record['id'])
+            except ValueError as e:
+                reject(line_number, str(e))
+                continue
+
+            batch.append((line_number, record))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                in_flight.acquire()
+                executor.submit(write, batch)
+                batch = []
+
+        if batch:
+            in_flight.acquire()
+            executor.submit(write, batch)
+
+    elapsed = time.monotonic() - started
+    report['seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows'] / elapsed, 1) if elapsed else float(report['rows'])
+
+    # Keep dashboard counters and the search index in step with the new rows
+    if use_dynamodb and kind == 'requests':
+        deltas = {'total_requests': report['imported']}
+        for status, count in status_counts.items():
+            deltas[f'{status}_requests'] = count
+        models.increment_admin_counters(deltas)
+    elif use_dynamodb and kind == 'donations':
+        models.increment_admin_counters({'total_donations': report['imported']})
+    if kind in ('requests', 'users'):
+        models.invalidate_search_index()
+    models.invalidate_dashboard_cache()
+
+    logging.info(
+        f"Imported {report['imported']} of {report['rows']} {kind} rows "
+        f"({report['rejected']} rejected) at {report['rows_per_second']} rows/sec"
+    )
+    return report
@@ -0,0 +1,77 @@
+# Red cell compatibility: recipient blood group -> donor groups it can receive
+CAN_RECEIVE_FROM = {
+    'A+': ('A+', 'A-', 'O+', 'O-'),
+    'A-': ('A-', 'O-'),
+    'B+': ('B+', 'B-', 'O+', 'O-'),
+    'B-': ('B-', 'O-'),
+    'AB+': ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'),
+    'AB-': ('A-', 'B-', 'AB-', 'O-'),
+    'O+': ('O+', 'O-'),
+    'O-': ('O-',)
+}
+
+def compatibility_mask(blood_groups):
+    """Recipient x donor 0/1 matrix over blood_groups"""
+    return [
+        [1 if donor in CAN_RECEIVE_FROM[recipient] else 0 for donor in blood_groups]
+        for recipient in blood_groups
+    ]
+
+class StockMatrix:
+    """Inventory as a hospital x blood group matrix with compatible totals
+
+    Building the matrix multiplies the stock by the transposed
+    compatibility mask once, giving every hospital's compatible units for
+    every recipient group. Queries for one or many recipients then read
+    columns of that product instead of re-walking the inventory.
+    """
+
+    def __init__(self, inventory, hospitals, blood_groups):
+        self.hospitals = list(hospitals)
+        self.blood_groups = list(blood_groups)
+        self.group_index = {bg: i for i, bg in enumerate(self.blood_groups)}
+        self.mask = compatibility_mask(self.blood_groups)
+
+        hospital_index = {hospital: i for i, hospital in enumerate(self.hospitals)}
+        self.stock = [[0] * len(self.blood_groups) for _ in self.hospitals]
+        for item in inventory:
+            row = hospital_index.get(item['hospital'])
+            column = self.group_index.get(item['blood_group'])
+            if row is not None and column is not None:
+                self.stock[row][column] = int(item.get('units_available', 0))
+
+        # compatible[h][r] = sum over donors d of stock[h][d] * mask[r][d]
+        self.compatible = [
+            [sum(units * allowed for units, allowed in zip(stock_row, mask_row)) for mask_row in self.mask]
+            for stock_row in self.stock
+        ]
+
+    def donor_groups(self, recipient):
+        """Donor groups a recipient can receive, in matrix column order"""
+        mask_row = self.mask[self.group_index[recipient]]
+        return [bg for bg, allowed in zip(self.blood_groups, mask_row) if allowed]
+
+    def compatible_stock(self, recipient, units=1):
+        """Hospitals holding at least units compatible with recipient, most stock first"""
+        column = self.group_index[recipient]
+        donors = [(self.group_index[bg], bg) for bg in self.donor_groups(recipient)]
+        matches = []
+        for hospital, stock_row, compatible_row in zip(self.hospitals, self.stock, self.compatible):
+            if compatible_row[column] < units:
+                continue
+            matches.append({
+                'hospital': hospital,
+                'compatible_units': compatible_row[column],
+                'by_blood_group': {bg: stock_row[i] for i, bg in donors if stock_row[i]}
+            })
+        matches.sort(key=lambda match: match['compatible_units'], reverse=True)
+        return matches
+
+    def compatible_stock_many(self, needs):
+        """compatible_stock for each (recipient, units) pair, in order"""
+        return [self.compatible_stock(recipient, units) for recipient, units in needs]
+
+    def total_compatible(self, recipient):
+        """Compatible units for recipient across every hospital"""
+        column = self.group_index[recipient]
+        return sum(row[column] for row in self.compatible)
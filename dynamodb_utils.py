@@ -0,0 +1,353 @@
+import os
+import time
+import json
+import base64
+import queue
+import threading
+import heapq
+import logging
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait
+from boto3.dynamodb.conditions import Key
+from aws_config import get_table, get_dynamodb_resource
+
+# Number of parallel Segment/TotalSegments workers for full-table scans
+SCAN_SEGMENTS = int(os.environ.get('DYNAMODB_SCAN_SEGMENTS', '4'))
+SCAN_MAX_WORKERS = int(os.environ.get('DYNAMODB_SCAN_MAX_WORKERS', '16'))
+
+# Dedicated pool so scan workers never wait behind the callers that started them
+_scan_executor = None
+_scan_executor_lock = threading.Lock()
+
+# Shared pool for running a page's independent reads side by side. It is
+# separate from the scan pool because those reads may start scans themselves.
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', '16'))
+_fanout_executor = None
+_fanout_executor_lock = threading.Lock()
+
+# DynamoDB BatchGetItem accepts at most 100 keys per call
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_GET_MAX_RETRIES = 5
+
+# A FilterExpression is applied after Limit, so filtered page reads ask for
+# at least this many items per call and give up on filling a page after
+# READ_PAGE_MAX_CALLS calls, returning it short with a cursor
+READ_PAGE_MIN_LIMIT = int(os.environ.get('DYNAMODB_READ_PAGE_MIN_LIMIT', '100'))
+READ_PAGE_MAX_CALLS = int(os.environ.get('DYNAMODB_READ_PAGE_MAX_CALLS', '10'))
+
+# TransactWriteItems accepts at most 100 actions per call
+TRANSACTION_MAX_ITEMS = 100
+
+# Marks a finished segment on the results queue
+_SEGMENT_DONE = object()
+
+def get_scan_executor():
+    """Get the shared thread pool used by parallel scans"""
+    global _scan_executor
+    if _scan_executor is None:
+        with _scan_executor_lock:
+            if _scan_executor is None:
+                _scan_executor = ThreadPoolExecutor(
+                    max_workers=SCAN_MAX_WORKERS,
+                    thread_name_prefix='dynamodb-scan'
+                )
+    return _scan_executor
+
+def get_fanout_executor():
+    """Get the shared thread pool used by fan_out"""
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _fanout_executor_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(
+                    max_workers=FANOUT_MAX_WORKERS,
+                    thread_name_prefix='fanout'
+                )
+    return _fanout_executor
+
+def fan_out(calls, timeout, defaults=None):
+    """Run independent zero-argument calls in parallel within a deadline
+
+    Returns (results, incomplete): results maps each name to its call's
+    return value, or to its default when the call failed or was still
+    running at the deadline; incomplete lists those names.
+    """
+    defaults = defaults or {}
+    executor = get_fanout_executor()
+    futures = {name: executor.submit(call) for name, call in calls.items()}
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    incomplete = []
+    for name, future in futures.items():
+        if not future.done():
+            # Left to finish in the background; its result is discarded
+            logging.warning(f"{name} missed the {timeout}s deadline")
+        elif future.exception() is not None:
+            logging.error(f"{name} failed: {future.exception()}")
+        else:
+            results[name] = future.result()
+            continue
+        results[name] = defaults.get(name)
+        incomplete.append(name)
+    return results, incomplete
+
+def paginate_scan(table, **scan_kwargs):
+    """Yield every scan page, following LastEvaluatedKey to completion"""
+    kwargs = dict(scan_kwargs)
+    while True:
+        response = table.scan(**kwargs)
+        yield response
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+
+def query_items(table_name, limit=None, **query_kwargs):
+    """Stream Query results across pages, stopping once limit items are read"""
+    table = get_table(table_name)
+    kwargs = dict(query_kwargs)
+    count = 0
+    while True:
+        if limit:
+            kwargs['Limit'] = limit - count
+        response = table.query(**kwargs)
+        for item in response.get('Items', []):
+            count += 1
+            yield item
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or (limit and count >= limit):
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+
+def count_query(table_name, **query_kwargs):
+    """Count Query matches across pages without transferring the items"""
+    table = get_table(table_name)
+    kwargs = dict(query_kwargs, Select='COUNT')
+    count = 0
+    while True:
+        response = table.query(**kwargs)
+        count += response.get('Count', 0)
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return count
+        kwargs['ExclusiveStartKey'] = last_key
+
+def build_projection(fields):
+    """ProjectionExpression kwargs reading only the given attributes"""
+    if not fields:
+        return {}
+    # Placeholders sidestep reserved words such as status and name
+    names = {f'#p{i}': field for i, field in enumerate(fields)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+def scan_pages(table_name, segments=None, **scan_kwargs):
+    """Yield scan pages from a table, split across parallel segments"""
+    table = get_table(table_name)
+    segments = SCAN_SEGMENTS if segments is None else segments
+
+    if segments <= 1:
+        yield from paginate_scan(table, **scan_kwargs)
+        return
+
+    # Bounded so fast segments cannot buffer the whole table in memory
+    results = queue.Queue(maxsize=segments * 2)
+    stop = threading.Event()
+
+    def offer(item):
+        # Give up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment):
+        try:
+            for page in paginate_scan(table, Segment=segment, TotalSegments=segments, **scan_kwargs):
+                if not offer(page):
+                    return
+            offer(_SEGMENT_DONE)
+        except Exception as e:
+            offer(e)
+
+    executor = get_scan_executor()
+    for segment in range(segments):
+        executor.submit(scan_segment, segment)
+
+    remaining = segments
+    try:
+        while remaining:
+            page = results.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        # Release workers if the consumer stopped early or a segment failed
+        stop.set()
+        while True:
+            try:
+                results.get_nowait()
+            except queue.Empty:
+                break
+
+    logging.info(f"Completed {segments}-segment scan of {table_name}")
+
+def scan_table(table_name, segments=None, **scan_kwargs):
+    """Stream every item in a table using a parallel, paginated scan"""
+    for page in scan_pages(table_name, segments, **scan_kwargs):
+        yield from page.get('Items', [])
+
+def count_table(table_name, segments=None, **scan_kwargs):
+    """Count the items in a table without transferring them"""
+    return sum(
+        page.get('Count', 0)
+        for page in scan_pages(table_name, segments, Select='COUNT', **scan_kwargs)
+    )
+
+def encode_cursor(key):
+    """Encode a start key as an opaque, URL-safe cursor string"""
+    if not key:
+        return None
+    # Every key attribute in this schema is a string
+    payload = json.dumps(key, sort_keys=True, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor, or None for the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+    if not isinstance(key, dict):
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+    return key
+
+def read_page(table_name, page_size, cursor=None, operation='scan', key_attributes=('id',), **kwargs):
+    """Read up to page_size items with Limit/ExclusiveStartKey keyset paging
+
+    key_attributes are the table and index key attributes the returned
+    items carry, used to resume after the last item kept when a filtered
+    read returns more than the page needs.
+    """
+    table = get_table(table_name)
+    read = getattr(table, operation)
+    start_key = decode_cursor(cursor)
+    filtered = 'FilterExpression' in kwargs
+    items = []
+
+    # Unfiltered reads never ask for more than remains, which keeps the
+    # cursor exact; filtered reads ask for more and cut the page back
+    for _ in range(READ_PAGE_MAX_CALLS):
+        remaining = page_size - len(items)
+        request = dict(kwargs, Limit=max(remaining, READ_PAGE_MIN_LIMIT) if filtered else remaining)
+        if start_key:
+            request['ExclusiveStartKey'] = start_key
+        response = read(**request)
+        items.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if len(items) > page_size:
+            items = items[:page_size]
+            start_key = {attribute: items[-1][attribute] for attribute in key_attributes}
+        if not start_key or len(items) == page_size:
+            break
+
+    return items, encode_cursor(start_key)
+
+def read_merged_page(table_name, index_name, attribute, values, page_size, cursor=None, **kwargs):
+    """Read up to page_size items newest first across several index partitions
+
+    The index is hashed on attribute and ranged on created_at. One Query
+    stream per value is merged on (created_at, id), so pages follow one
+    order across the whole table; the cursor is the last item's
+    (created_at, id). Items must carry id and created_at.
+    """
+    start_key = decode_cursor(cursor)
+    if start_key and not {'created_at', 'id'} <= start_key.keys():
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+    table = get_table(table_name)
+
+    def order(item):
+        return item.get('created_at', ''), str(item['id'])
+
+    def partition(value):
+        condition = Key(attribute).eq(value)
+        if start_key:
+            condition = condition & Key('created_at').lte(start_key['created_at'])
+        request = dict(kwargs, IndexName=index_name, KeyConditionExpression=condition,
+                       ScanIndexForward=False, Limit=page_size + 1)
+        while True:
+            response = table.query(**request)
+            for item in response.get('Items', []):
+                # Items sharing the cursor's created_at are ordered on id
+                if not start_key or order(item) < (start_key['created_at'], start_key['id']):
+                    yield item
+            if not response.get('LastEvaluatedKey'):
+                return
+            request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    # Read one extra item to learn whether another page follows
+    merged = heapq.merge(*(partition(value) for value in values), key=order, reverse=True)
+    items = list(islice(merged, page_size + 1))
+    page = items[:page_size]
+    next_cursor = None
+    if len(items) > page_size:
+        next_cursor = encode_cursor({'created_at': page[-1]['created_at'], 'id': str(page[-1]['id'])})
+    return page, next_cursor
+
+def batch_get_items(table_name, ids, **request_kwargs):
+    """Fetch items by id with chunked BatchGetItem, retrying unprocessed keys"""
+    dynamodb = get_dynamodb_resource()
+    items = []
+    if not dynamodb or not ids:
+        return items
+
+    for start in range(0, len(ids), BATCH_GET_CHUNK_SIZE):
+        chunk = ids[start:start + BATCH_GET_CHUNK_SIZE]
+        request_items = {
+            table_name: dict(request_kwargs, Keys=[{'id': item_id} for item_id in chunk])
+        }
+
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                if attempt > BATCH_GET_MAX_RETRIES:
+                    logging.warning(f"Giving up on {len(request_items[table_name]['Keys'])} unprocessed keys in {table_name}")
+                    break
+                # Exponential backoff before retrying throttled keys
+                time.sleep(min(0.05 * (2 ** attempt), 1.0))
+
+    return items
+
+def transact_write(actions):
+    """Apply Put/Update/Delete/ConditionCheck actions all or nothing
+
+    Actions take plain Python values in Key, Item and
+    ExpressionAttributeValues; the resource's client serializes them.
+    """
+    if len(actions) > TRANSACTION_MAX_ITEMS:
+        raise ValueError(f"A transaction holds at most {TRANSACTION_MAX_ITEMS} actions, got {len(actions)}")
+    client = get_dynamodb_resource().meta.client
+    client.transact_write_items(TransactItems=actions)
+
+def cancellation_reasons(error):
+    """Per-action codes of a cancelled transaction ('None' for actions that passed), or []"""
+    if error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+        return []
+    return [reason.get('Code', 'None') for reason in error.response.get('CancellationReasons', [])]
@@ -0,0 +1,80 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+class EventPipeline:
+    """In-process event queue drained in batches by a background worker
+
+    emit() only enqueues, so request handlers never wait on the work the
+    events trigger. The worker blocks for the first event, then collects
+    up to batch_size more for at most max_wait seconds and hands the
+    whole batch to the handler. The worker is started lazily and again
+    after a fork, since threads do not survive into gunicorn workers.
+    """
+
+    def __init__(self, name, handler, batch_size=100, max_wait=0.5):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.pid = None
+        self.queue = None
+        self.worker = None
+
+    def _ensure_worker(self):
+        if self.pid == os.getpid() and self.worker.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.worker.is_alive():
+                return
+            if self.pid != os.getpid():
+                # A queue inherited across fork belongs to the parent
+                self.queue = queue.Queue()
+            self.pid = os.getpid()
+            self.worker = threading.Thread(target=self._run, name=f'{self.name}-worker', daemon=True)
+            self.worker.start()
+
+    def emit(self, event):
+        """Queue an event for the worker"""
+        self._ensure_worker()
+        self.queue.put(event)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        events = self.queue
+        while True:
+            batch = self._next_batch()
+            try:
+                self.handler(batch)
+            except Exception as e:
+                logging.error(f"{self.name} failed to process {len(batch)} events: {e}")
+            finally:
+                for _ in batch:
+                    events.task_done()
+
+    def flush(self):
+        """Block until every queued event has been handled"""
+        if self.pid == os.getpid() and self.worker is not None and self.worker.is_alive():
+            self.queue.join()
+
+def create_pipeline(name, handler, batch_size=100, max_wait=0.5):
+    """Create a pipeline that is drained before the process exits"""
+    pipeline = EventPipeline(name, handler, batch_size, max_wait)
+    atexit.register(pipeline.flush)
+    return pipeline
@@ -0,0 +1,62 @@
+import sys
+import base64
+from array import array
+from bisect import bisect_right
+
+def encode_grid(units):
+    """Pack a flat hospital x blood group grid of unit counts into a compact string"""
+    packed = array('i', units)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode()
+
+def decode_grid(encoded):
+    """Unpack a grid packed by encode_grid"""
+    packed = array('i')
+    packed.frombytes(base64.b64decode(encoded))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tolist()
+
+def resample(times, history, step):
+    """Interpolate snapshots onto a regular grid ending at the latest one
+
+    times are the snapshot times in seconds, ascending, and history the
+    matching snapshots, each a list with one value per series. Returns
+    snapshots step seconds apart, linearly interpolated between the
+    surrounding real ones, so forecasting horizons count real time even
+    when snapshots were taken late or missed.
+    """
+    if not history:
+        return []
+    count = int((times[-1] - times[0]) // step) + 1
+    grid_times = [times[-1] - step * back for back in range(count - 1, -1, -1)]
+    resampled = []
+    for moment in grid_times:
+        after = min(bisect_right(times, moment), len(times) - 1)
+        before = max(after - 1, 0)
+        span = times[after] - times[before]
+        weight = (moment - times[before]) / span if span else 1.0
+        resampled.append([
+            a + (b - a) * weight for a, b in zip(history[before], history[after])
+        ])
+    return resampled
+
+def holt_forecast(history, horizon, alpha=0.5, beta=0.3):
+    """Forecast every series horizon steps ahead with Holt's linear smoothing
+
+    history is a list of evenly spaced snapshots, each a list with one
+    value per series.
+    """
+    if not history:
+        return []
+    level = [float(value) for value in history[0]]
+    if len(history) > 1:
+        trend = [float(b - a) for a, b in zip(history[0], history[1])]
+    else:
+        trend = [0.0] * len(level)
+    for observed in history[1:]:
+        previous = level
+        level = [alpha * x + (1 - alpha) * (l + t) for x, l, t in zip(observed, level, trend)]
+        trend = [beta * (l - p) + (1 - beta) * t for l, p, t in zip(level, previous, trend)]
+    return [max(l + horizon * t, 0.0) for l, t in zip(level, trend)]
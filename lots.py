@@ -0,0 +1,117 @@
+import bisect
+import heapq
+import threading
+
+class LotIndex:
+    """Blood unit lots ordered by expiry date
+
+    Each (hospital, blood group) pair keeps a min-heap of (expiry_date,
+    lot_id), so the soonest-expiring lot is always at the top and taking
+    it costs O(log n). A single list sorted by expiry serves sweeps and
+    reports: expired lots are a prefix of it and "expiring within N
+    days" is a bisected range, so neither has to look at lots outside
+    the answer. Heap entries for lots that have since been removed are
+    skipped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.lots = {}
+        self.heaps = {}
+        self.by_expiry = []
+
+    def __len__(self):
+        return len(self.lots)
+
+    @staticmethod
+    def entry(lot):
+        return (lot['expiry_date'], str(lot['id']))
+
+    def add(self, lot):
+        """Index a lot with units remaining"""
+        with self.lock:
+            lot_id = str(lot['id'])
+            if lot_id in self.lots:
+                self.remove(lot_id)
+            if int(lot.get('units', 0)) <= 0:
+                return
+            self.lots[lot_id] = lot
+            entry = self.entry(lot)
+            heapq.heappush(self.heaps.setdefault((lot['hospital'], lot['blood_group']), []), entry)
+            bisect.insort(self.by_expiry, entry)
+
+    def remove(self, lot_id):
+        """Drop a lot; its heap entry is discarded when it surfaces"""
+        with self.lock:
+            lot = self.lots.pop(str(lot_id), None)
+            if lot is None:
+                return None
+            entry = self.entry(lot)
+            position = bisect.bisect_left(self.by_expiry, entry)
+            if position < len(self.by_expiry) and self.by_expiry[position] == entry:
+                del self.by_expiry[position]
+            return lot
+
+    def replace_group(self, hospital, blood_group, lots):
+        """Swap one hospital and blood group's lots for a fresh read of them"""
+        with self.lock:
+            for _, lot_id in self.heaps.pop((hospital, blood_group), []):
+                self.remove(lot_id)
+            for lot in lots:
+                self.add(lot)
+
+    def soonest(self, hospital, blood_group):
+        """Soonest-expiring lot for a hospital and blood group, or None"""
+        with self.lock:
+            heap = self.heaps.get((hospital, blood_group))
+            while heap:
+                expiry_date, lot_id = heap[0]
+                lot = self.lots.get(lot_id)
+                if lot is not None and lot['expiry_date'] == expiry_date:
+                    return lot
+                heapq.heappop(heap)
+            return None
+
+    def plan_take(self, hospital, blood_group, units):
+        """(lot, units) pairs covering units from the soonest-expiring lots
+
+        Nothing is changed; the plan covers fewer units if the lots run out.
+        """
+        with self.lock:
+            plan = []
+            seen = set()
+            for expiry_date, lot_id in sorted(self.heaps.get((hospital, blood_group), [])):
+                if units <= 0:
+                    break
+                lot = self.lots.get(lot_id)
+                if lot is None or lot['expiry_date'] != expiry_date or lot_id in seen:
+                    continue
+                seen.add(lot_id)
+                take = min(int(lot['units']), units)
+                plan.append((lot, take))
+                units -= take
+            return plan
+
+    def take(self, lot_id, units):
+        """Record units taken from a lot, removing it once empty"""
+        with self.lock:
+            lot = self.lots.get(str(lot_id))
+            if lot is None:
+                return
+            lot['units'] = int(lot['units']) - units
+            if lot['units'] <= 0:
+                self.remove(lot_id)
+
+    def expired(self, today):
+        """Lots whose expiry date is before today, soonest first"""
+        with self.lock:
+            end = bisect.bisect_left(self.by_expiry, (today, ''))
+            return [self.lots[lot_id] for _, lot_id in self.by_expiry[:end]]
+
+    def expiring_between(self, start, end):
+        """Lots expiring on or after start and on or before end, soonest first"""
+        with self.lock:
+            first = bisect.bisect_left(self.by_expiry, (start, ''))
+            # Lot ids never exceed this sentinel, so every lot expiring on end is included
+            last = bisect.bisect_right(self.by_expiry, (end, '\uffff'))
+            return [self.lots[lot_id] for _, lot_id in self.by_expiry[first:last]]
@@ -0,0 +1,205 @@
+import bisect
+import threading
+from itertools import islice
+
+def matches(record, expected):
+    """Whether a record has every expected value (None means unset)"""
+    return all(record.get(attribute) == value for attribute, value in (expected or {}).items())
+
+class MockCollection:
+    """In-memory record store with hash indexes and created_at ordering
+
+    Every record is keyed by its string id. Each indexed attribute maps a
+    value to a list of (created_at, id) keys kept in sorted order, so
+    lookups by value are O(1) and newest-first reads touch only the k
+    records they return. Sparse attributes keep a sorted list of (value,
+    id) for just the records where they are set, for range reads.
+    """
+
+    def __init__(self, indexes=(), sparse=()):
+        self.records = {}
+        self.indexes = {attribute: {} for attribute in indexes}
+        self.sparse = {attribute: [] for attribute in sparse}
+        self.ordered = []
+        self.lock = threading.RLock()
+        self.id_counter = 1
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, record_id):
+        return str(record_id) in self.records
+
+    def next_id(self):
+        """Next sequential record id"""
+        with self.lock:
+            record_id = self.id_counter
+            self.id_counter += 1
+        return str(record_id)
+
+    @staticmethod
+    def sort_key(record):
+        """Ordering key shared by every index: (created_at, id)"""
+        return (record.get('created_at', ''), str(record['id']))
+
+    def insert(self, record):
+        """Add a record and index it"""
+        with self.lock:
+            record_id = str(record['id'])
+            if record_id in self.records:
+                self.delete(record_id)
+            self.records[record_id] = record
+            key = self.sort_key(record)
+            bisect.insort(self.ordered, key)
+            for attribute, buckets in self.indexes.items():
+                bisect.insort(buckets.setdefault(record.get(attribute), []), key)
+            for attribute, keys in self.sparse.items():
+                if record.get(attribute) is not None:
+                    bisect.insort(keys, (record[attribute], record_id))
+        return record
+
+    def insert_new(self, record):
+        """Add a record unless its id is already taken; None if it was"""
+        with self.lock:
+            if str(record['id']) in self.records:
+                return None
+            return self.insert(record)
+
+    def insert_many_new(self, records):
+        """Add the records whose ids are not yet taken; returns those added"""
+        with self.lock:
+            return [record for record in records if self.insert_new(record) is not None]
+
+    def insert_many(self, records):
+        """Add and index a batch of records"""
+        with self.lock:
+            for record in records:
+                self.insert(record)
+        return len(records)
+
+    def delete(self, record_id, expected=None):
+        """Remove a record and its index entries, only if it matches expected"""
+        with self.lock:
+            record = self.records.get(str(record_id))
+            if record is None or not matches(record, expected):
+                return None
+            del self.records[str(record_id)]
+            key = self.sort_key(record)
+            self._remove_key(self.ordered, key)
+            for attribute, buckets in self.indexes.items():
+                self._remove_from_bucket(buckets, record.get(attribute), key)
+            for attribute, keys in self.sparse.items():
+                if record.get(attribute) is not None:
+                    self._remove_key(keys, (record[attribute], str(record_id)))
+            return record
+
+    def update(self, record_id, changes, expected=None):
+        """Apply changes to a record, only if it matches expected, moving it between index buckets"""
+        with self.lock:
+            record = self.records.get(str(record_id))
+            if record is None or not matches(record, expected):
+                return None
+            key = self.sort_key(record)
+            for attribute, buckets in self.indexes.items():
+                if attribute in changes and changes[attribute] != record.get(attribute):
+                    self._remove_from_bucket(buckets, record.get(attribute), key)
+                    bisect.insort(buckets.setdefault(changes[attribute], []), key)
+            for attribute, keys in self.sparse.items():
+                if attribute in changes and changes[attribute] != record.get(attribute):
+                    if record.get(attribute) is not None:
+                        self._remove_key(keys, (record[attribute], str(record_id)))
+                    if changes[attribute] is not None:
+                        bisect.insort(keys, (changes[attribute], str(record_id)))
+            record.update(changes)
+            return record
+
+    def increment(self, record_id, attribute, delta, minimum=None, changes=None):
+        """Atomically add delta to a numeric attribute
+
+        Returns the updated record, or None if it is missing or the new
+        value would fall below minimum.
+        """
+        with self.lock:
+            record = self.records.get(str(record_id))
+            if record is None:
+                return None
+            value = int(record.get(attribute) or 0) + delta
+            if minimum is not None and value < minimum:
+                return None
+            return self.update(record_id, dict(changes or {}, **{attribute: value}))
+
+    def get(self, record_id, default=None):
+        """Get a record by id"""
+        return self.records.get(str(record_id), default)
+
+    def values(self):
+        """All records, in no particular order"""
+        return list(self.records.values())
+
+    def count(self, attribute, value):
+        """Number of records whose indexed attribute equals value"""
+        return len(self.indexes[attribute].get(value, ()))
+
+    def count_matching(self, filters):
+        """Number of records matching all filters"""
+        if len(filters) == 1:
+            (attribute, value), = filters.items()
+            if attribute in self.indexes:
+                return self.count(attribute, value)
+        return len(self.find(filters))
+
+    def find_one(self, attribute, value):
+        """Newest record whose indexed attribute equals value"""
+        matches = self.find({attribute: value}, limit=1)
+        return matches[0] if matches else None
+
+    def find(self, filters=None, limit=None, before=None):
+        """Records matching all filters, newest first
+
+        The smallest matching index bucket drives the walk and remaining
+        filters are checked per record. ``before`` is an exclusive
+        (created_at, id) key to resume from.
+        """
+        with self.lock:
+            keys = self._driving_keys(filters or {})
+            end = bisect.bisect_left(keys, before) if before else len(keys)
+            matches = (
+                self.records[record_id]
+                for _, record_id in (keys[i] for i in range(end - 1, -1, -1))
+            )
+            if filters:
+                matches = (
+                    record for record in matches
+                    if all(record.get(attribute) == value for attribute, value in filters.items())
+                )
+            return list(islice(matches, limit)) if limit else list(matches)
+
+    def find_below(self, attribute, upper):
+        """Records whose sparse attribute is set and below upper, lowest first"""
+        with self.lock:
+            keys = self.sparse[attribute]
+            end = bisect.bisect_left(keys, (upper, ''))
+            return [self.records[record_id] for _, record_id in keys[:end]]
+
+    def _driving_keys(self, filters):
+        """Sorted key list of the most selective index bucket for filters"""
+        candidates = [
+            self.indexes[attribute].get(value, [])
+            for attribute, value in filters.items()
+            if attribute in self.indexes
+        ]
+        return min(candidates, key=len) if candidates else self.ordered
+
+    def _remove_from_bucket(self, buckets, value, key):
+        bucket = buckets.get(value)
+        if bucket is None:
+            return
+        self._remove_key(bucket, key)
+        if not bucket:
+            del buckets[value]
+
+    @staticmethod
+    def _remove_key(keys, key):
+        position = bisect.bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            del keys[position]
@@ -1,50 +1,145 @@
+import os
+import time
 import uuid
-from datetime import datetime
+import functools
+import threading
+from collections import Counter, OrderedDict
+from itertools import islice
+from datetime import datetime, date, timedelta
 import logging
 import boto3
 import boto3.dynamodb.conditions
-from aws_config import get_dynamodb_client, get_dynamodb_resource, create_tables_if_not_exist, USERS_TABLE, REQUESTS_TABLE, DONATIONS_TABLE, INVENTORY_TABLE
-from botocore.exceptions import ClientError
+from aws_config import get_dynamodb_client, get_dynamodb_resource, get_table, invalidate_table_if_missing, create_tables_if_not_exist, USERS_TABLE, REQUESTS_TABLE, DONATIONS_TABLE, INVENTORY_TABLE, INVENTORY_LOTS_TABLE, STATS_TABLE, REQUEST_FILTER_INDEXES, DONATION_STATUS_INDEX, INVENTORY_PENDING_INDEX, LOT_GROUP_INDEX, USER_ACTIVITY_INDEX, LEGACY_USER_ID_INDEX, is_index_active
+from botocore.exceptions import ClientError, BotoCoreError
+from mock_store import MockCollection
+from sqlite_store import SQLiteCollection, transaction as sqlite_transaction
+from search_index import NGramIndex
+from compatibility import StockMatrix
+from allocation import allocate
+from lots import LotIndex
+from events import create_pipeline
+from forecast import encode_grid, decode_grid, resample, holt_forecast
+from refresher import BackgroundRefresher
+from dynamodb_utils import fan_out, transact_write, cancellation_reasons, TRANSACTION_MAX_ITEMS, scan_table, count_table, count_query, query_items, batch_get_items, build_projection, read_page, read_merged_page, encode_cursor, decode_cursor
 
-# Mock data store when AWS is not available
+# Identical reads running at the same time in this process share one call
+in_flight = {}
+in_flight_lock = threading.Lock()
+
+def freeze(value):
+    """Hashable form of call arguments (lists of fields become tuples)"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def single_flight(func):
+    """Coalesce concurrent identical calls into one backend read
+
+    The first caller for a given function and arguments runs it; callers
+    arriving while it is in flight wait and receive the same result (or
+    exception). Results are shared, so callers must not modify them.
+    Nothing is cached once the call completes.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, freeze(args), freeze(kwargs))
+        with in_flight_lock:
+            flight = in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = in_flight[key] = {'done': threading.Event()}
+        
+        if not leader:
+            flight['done'].wait()
+            if 'error' in flight:
+                raise flight['error']
+            return flight['result']
+        
+        try:
+            flight['result'] = func(*args, **kwargs)
+            return flight['result']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with in_flight_lock:
+                in_flight.pop(key, None)
+            flight['done'].set()
+    return wrapper
+
+# Local store used when AWS is not available: 'memory' (per process) or
+# 'sqlite' (a WAL-mode database file shared by every gunicorn worker)
+LOCAL_STORAGE_BACKEND = os.environ.get('LOCAL_STORAGE_BACKEND', 'memory').lower()
+SQLITE_DB_PATH = os.environ.get('SQLITE_DB_PATH', 'blood_bank.db')
+
+def create_local_collection(name, indexes, sparse=()):
+    """Create a mock data collection on the configured local backend"""
+    if LOCAL_STORAGE_BACKEND == 'sqlite':
+        return SQLiteCollection(SQLITE_DB_PATH, name, indexes, sparse)
+    return MockCollection(indexes, sparse)
+
+# Mock data store when AWS is not available, indexed for the lookups below
 mock_data = {
-    'users': {},
-    'blood_requests': {},
-    'donations': {},
-    'inventory': {}
+    'users': create_local_collection('users', ['email']),
+    'blood_requests': create_local_collection('blood_requests', ['user_id', 'status', 'blood_group'], ['inventory_pending_at']),
+    'donations': create_local_collection('donations', ['user_id', 'status', 'blood_group'], ['inventory_pending_at']),
+    'inventory_lots': create_local_collection('inventory_lots', ['hospital', 'blood_group']),
+    'inventory': create_local_collection('inventory', []),
+    'inventory_snapshots': create_local_collection('inventory_snapshots', [])
 }
 
-# Counter for generating IDs in mock mode
-id_counter = {'users': 1, 'requests': 1, 'donations': 1, 'inventory': 1}
+# Every status a request or donation can be in; the admin listings merge
+# one status index partition per value
+REQUEST_STATUSES = ['pending', 'fulfilled']
+DONATION_STATUSES = ['scheduled', 'completed']
+
+# Blood groups and the 10 blood banks tracked in inventory
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+HOSPITALS = [
+    'City General Hospital',
+    'Metropolitan Medical Center',
+    'St. Mary\'s Hospital',
+    'Regional Blood Bank',
+    'University Hospital',
+    'Central Blood Center',
+    'Community Health Hospital',
+    'Emergency Medical Center',
+    'District Hospital',
+    'Primary Care Blood Bank'
+]
+
+def inventory_key(hospital, blood_group):
+    """Inventory item id for one hospital and blood group"""
+    return f"{hospital}#{blood_group}"
+
+def empty_inventory_item(hospital, blood_group):
+    """Inventory row for a hospital/blood group with no stock recorded"""
+    return {
+        'id': inventory_key(hospital, blood_group),
+        'hospital': hospital,
+        'blood_group': blood_group,
+        'units_available': 0,  # Start with 0 - real data will come from donations
+        'last_updated': datetime.now().isoformat()
+    }
 
 # Initialize blood inventory data
 def initialize_inventory():
     """Initialize blood inventory with 10 blood banks"""
-    blood_groups = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
-    hospitals = [
-        'City General Hospital',
-        'Metropolitan Medical Center',
-        'St. Mary\'s Hospital',
-        'Regional Blood Bank',
-        'University Hospital',
-        'Central Blood Center',
-        'Community Health Hospital',
-        'Emergency Medical Center',
-        'District Hospital',
-        'Primary Care Blood Bank'
+    # Only missing cells are created, so a shared SQLite grid keeps its counts
+    for hospital in HOSPITALS:
+        for bg in BLOOD_GROUPS:
+            mock_data['inventory'].insert_new(empty_inventory_item(hospital, bg))
+
+def local_inventory_grid():
+    """Copy of the local store's inventory in HOSPITALS x BLOOD_GROUPS order"""
+    items = {item['id']: item for item in mock_data['inventory'].values()}
+    return [
+        dict(items.get(inventory_key(hospital, bg)) or dict(empty_inventory_item(hospital, bg), last_updated=''))
+        for hospital in HOSPITALS
+        for bg in BLOOD_GROUPS
     ]
-    
-    if not mock_data['inventory']:
-        for i, hospital in enumerate(hospitals, 1):
-            for bg in blood_groups:
-                inventory_id = f"inv_{i}_{bg.replace('+', 'pos').replace('-', 'neg')}"
-                mock_data['inventory'][inventory_id] = {
-                    'id': inventory_id,
-                    'hospital': hospital,
-                    'blood_group': bg,
-                    'units_available': 0,  # Start with 0 - real data will come from donations
-                    'last_updated': datetime.now().isoformat()
-                }
 
 # Initialize inventory on module load
 initialize_inventory()
@@ -59,16 +154,145 @@ def validate_admin_id(admin_id):
     """Validate admin ID"""
     return admin_id in VALID_ADMIN_IDS
 
+# Bounded LRU of user id -> display name for admin listings
+USER_NAME_CACHE_SIZE = int(os.environ.get('USER_NAME_CACHE_SIZE', '10000'))
+user_name_cache = OrderedDict()
+user_name_cache_lock = threading.Lock()
+
+def cache_user_name(user_id, name):
+    """Remember a user's display name, evicting the least recently used"""
+    with user_name_cache_lock:
+        user_name_cache[str(user_id)] = name
+        user_name_cache.move_to_end(str(user_id))
+        while len(user_name_cache) > USER_NAME_CACHE_SIZE:
+            user_name_cache.popitem(last=False)
+
+def get_cached_user_names(user_ids):
+    """Split user ids into cached names and ids that still need a lookup"""
+    names = {}
+    missing = []
+    with user_name_cache_lock:
+        for user_id in user_ids:
+            if user_id in user_name_cache:
+                user_name_cache.move_to_end(user_id)
+                names[user_id] = user_name_cache[user_id]
+            else:
+                missing.append(user_id)
+    return names, missing
+
+def batch_get_user_names(user_ids):
+    """Resolve user names with chunked BatchGetItem calls"""
+    users = batch_get_items(
+        USERS_TABLE,
+        user_ids,
+        ProjectionExpression='#id, #name',
+        ExpressionAttributeNames={'#id': 'id', '#name': 'name'}
+    )
+    names = {user['id']: user.get('name', 'Unknown User') for user in users}
+    logging.info(f"Resolved {len(names)} of {len(user_ids)} user names via BatchGetItem")
+    return names
+
+def attach_user_names(items):
+    """Attach user_name to each item with one batched lookup per listing"""
+    user_ids = list(dict.fromkeys(str(item['user_id']) for item in items if item.get('user_id')))
+    names, missing = get_cached_user_names(user_ids)
+    
+    if missing:
+        try:
+            fetched = batch_get_user_names(missing)
+        except ClientError as e:
+            logging.error(f"DynamoDB error resolving user names: {e}")
+            invalidate_table_if_missing(USERS_TABLE, e)
+            fetched = {}
+        for user_id, name in fetched.items():
+            cache_user_name(user_id, name)
+        names.update(fetched)
+    
+    for item in items:
+        item['user_name'] = names.get(str(item.get('user_id', '')), 'Unknown User')
+    return items
+
+# Key of the counters item holding admin dashboard statistics
+ADMIN_STATS_ID = 'admin'
+ADMIN_STATS_FIELDS = ['total_requests', 'total_donations', 'pending_requests', 'fulfilled_requests']
+
+def increment_admin_counters(deltas):
+    """Atomically apply counter deltas to the admin statistics item"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    
+    try:
+        table = get_table(STATS_TABLE)
+        names = {f'#c{i}': name for i, name in enumerate(deltas)}
+        values = {f':c{i}': delta for i, delta in enumerate(deltas.values())}
+        table.update_item(
+            Key={'id': ADMIN_STATS_ID},
+            UpdateExpression='ADD ' + ', '.join(f'#c{i} :c{i}' for i in range(len(deltas))),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except (ClientError, BotoCoreError) as e:
+        # Counters drift until the next reconcile; the write itself succeeded
+        logging.error(f"DynamoDB error updating admin counters: {e}")
+        invalidate_table_if_missing(STATS_TABLE, e)
+
+def compute_admin_statistics():
+    """Compute admin statistics from full-table scans"""
+    # Only request statuses are needed; donations are just counted
+    status_counts = Counter(
+        r.get('status') for r in scan_table(
+            REQUESTS_TABLE,
+            ProjectionExpression='#status',
+            ExpressionAttributeNames={'#status': 'status'}
+        )
+    )
+    
+    stats = {
+        'total_requests': sum(status_counts.values()),
+        'total_donations': count_table(DONATIONS_TABLE)
+    }
+    for status, count in status_counts.items():
+        if status:
+            stats[f'{status}_requests'] = count
+    for field in ADMIN_STATS_FIELDS:
+        stats.setdefault(field, 0)
+    return stats
+
+def reconcile_admin_statistics():
+    """Rebuild the admin counters item from a scan of both tables"""
+    stats = compute_admin_statistics()
+    table = get_table(STATS_TABLE)
+    table.put_item(Item={'id': ADMIN_STATS_ID, **stats, 'reconciled_at': datetime.now().isoformat()})
+    logging.info(f"Reconciled admin statistics: {stats}")
+    return stats
+
+def find_registered_emails(emails):
+    """The subset of emails that already belong to a user
+
+    DynamoDB cannot batch-read by an index key, so each email costs one
+    Count query on email-index; bulk imports check a batch at a time.
+    """
+    dynamodb = get_dynamodb_resource()
+
+    if dynamodb:
+        try:
+            return {
+                email for email in emails
+                if count_query(USERS_TABLE, IndexName='email-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('email').eq(email))
+            }
+        except Exception as e:
+            logging.error(f"DynamoDB error checking {len(emails)} emails: {e}")
+            invalidate_table_if_missing(USERS_TABLE, e)
+    return {email for email in emails if mock_data['users'].find_one('email', email)}
+
 def get_user_by_email(email):
     """Get user by email"""
     dynamodb = get_dynamodb_resource()
     
     if dynamodb:
         try:
-            table = dynamodb.Table(USERS_TABLE)
-            
-            # First check if table exists
-            table.load()
+            table = get_table(USERS_TABLE)
             
             response = table.query(
                 IndexName='email-index',
@@ -85,18 +309,18 @@ def get_user_by_email(email):
                 
         except Exception as e:
             logging.error(f"DynamoDB error getting user by email: {e}")
+            invalidate_table_if_missing(USERS_TABLE, e)
             # Fall back to mock data on error
-            for user in mock_data['users'].values():
-                if user['email'] == email:
-                    logging.info(f"Found user by email: {email} in mock data")
-                    return user
-            return None
+            user = mock_data['users'].find_one('email', email)
+            if user:
+                logging.info(f"Found user by email: {email} in mock data")
+            return user
     else:
         # Use mock data
-        for user in mock_data['users'].values():
-            if user['email'] == email:
-                logging.info(f"Found user by email: {email} in mock data")
-                return user
+        user = mock_data['users'].find_one('email', email)
+        if user:
+            logging.info(f"Found user by email: {email} in mock data")
+            return user
     
     return None
 
@@ -106,10 +330,7 @@ def create_user(user_data):
     
     if dynamodb:
         try:
-            table = dynamodb.Table(USERS_TABLE)
-            
-            # Ensure table exists first
-            table.load()
+            table = get_table(USERS_TABLE)
             
             # Generate unique user ID
             user_id = str(uuid.uuid4())
@@ -120,31 +341,31 @@ def create_user(user_data):
             response = table.put_item(Item=user_data)
             
             logging.info(f"Successfully created user in DynamoDB: {user_id}, Response: {response}")
+            cache_user_name(user_id, user_data.get('name', 'Unknown User'))
             return user_id
             
         except Exception as e:
             logging.error(f"DynamoDB error creating user: {e}")
+            invalidate_table_if_missing(USERS_TABLE, e)
             # Fall back to mock data on error
-            user_id = id_counter['users']
-            id_counter['users'] += 1
+            user_id = mock_data['users'].next_id()
             
-            user_data['id'] = str(user_id)
+            user_data['id'] = user_id
             user_data['created_at'] = datetime.now().isoformat()
-            mock_data['users'][user_id] = user_data
+            mock_data['users'].insert(user_data)
             
             logging.info(f"Created user in mock data: {user_id}")
-            return str(user_id)
+            return user_id
     else:
         # Use mock data
-        user_id = id_counter['users']
-        id_counter['users'] += 1
+        user_id = mock_data['users'].next_id()
         
-        user_data['id'] = str(user_id)
+        user_data['id'] = user_id
         user_data['created_at'] = datetime.now().isoformat()
-        mock_data['users'][user_id] = user_data
+        mock_data['users'].insert(user_data)
         
         logging.info(f"Created user in mock data: {user_id}")
-        return str(user_id)
+        return user_id
 
 def create_blood_request(request_data):
     """Create a blood request"""
@@ -152,8 +373,7 @@ def create_blood_request(request_data):
     
     if dynamodb:
         try:
-            table = dynamodb.Table(REQUESTS_TABLE)
-            table.load()  # Check if table exists
+            table = get_table(REQUESTS_TABLE)
             
             # Generate unique request ID
             request_id = str(uuid.uuid4())
@@ -167,31 +387,43 @@ def create_blood_request(request_data):
             response = table.put_item(Item=request_data)
             
             logging.info(f"Successfully created blood request in DynamoDB: {request_id}, Response: {response}")
-            return request_id
             
         except Exception as e:
             logging.error(f"DynamoDB error creating blood request: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
             # Fall back to mock data on error
-            request_id = id_counter['requests']
-            id_counter['requests'] += 1
+            request_id = mock_data['blood_requests'].next_id()
             
-            request_data['id'] = str(request_id)
+            request_data['id'] = request_id
             request_data['created_at'] = datetime.now().isoformat()
-            mock_data['blood_requests'][request_id] = request_data
+            mock_data['blood_requests'].insert(request_data)
             
             logging.info(f"Created blood request in mock data: {request_id}")
-            return str(request_id)
+            index_new_request(request_data, in_mock=True)
+            invalidate_dashboard_cache()
+            return request_id
+        
+        # Bookkeeping stays outside the try, so a failure in it can never
+        # store the request a second time in mock data
+        increment_admin_counters({
+            'total_requests': 1,
+            f"{request_data.get('status', 'pending')}_requests": 1
+        })
+        index_new_request(request_data, in_mock=False)
+        invalidate_dashboard_cache()
+        return request_id
     else:
         # Use mock data
-        request_id = id_counter['requests']
-        id_counter['requests'] += 1
+        request_id = mock_data['blood_requests'].next_id()
         
-        request_data['id'] = str(request_id)
+        request_data['id'] = request_id
         request_data['created_at'] = datetime.now().isoformat()
-        mock_data['blood_requests'][request_id] = request_data
+        mock_data['blood_requests'].insert(request_data)
         
         logging.info(f"Created blood request in mock data: {request_id}")
-        return str(request_id)
+        index_new_request(request_data, in_mock=True)
+        invalidate_dashboard_cache()
+        return request_id
 
 def create_donation_schedule(donation_data):
     """Create a donation schedule"""
@@ -199,8 +431,7 @@ def create_donation_schedule(donation_data):
     
     if dynamodb:
         try:
-            table = dynamodb.Table(DONATIONS_TABLE)
-            table.load()  # Check if table exists
+            table = get_table(DONATIONS_TABLE)
             
             # Generate unique donation ID
             donation_id = str(uuid.uuid4())
@@ -214,161 +445,200 @@ def create_donation_schedule(donation_data):
             response = table.put_item(Item=donation_data)
             
             logging.info(f"Successfully created donation schedule in DynamoDB: {donation_id}, Response: {response}")
-            return donation_id
             
         except Exception as e:
             logging.error(f"DynamoDB error creating donation: {e}")
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
             # Fall back to mock data on error
-            donation_id = id_counter['donations']
-            id_counter['donations'] += 1
+            donation_id = mock_data['donations'].next_id()
             
-            donation_data['id'] = str(donation_id)
+            donation_data['id'] = donation_id
             donation_data['created_at'] = datetime.now().isoformat()
-            mock_data['donations'][donation_id] = donation_data
+            mock_data['donations'].insert(donation_data)
             
             logging.info(f"Created donation in mock data: {donation_id}")
-            return str(donation_id)
+            invalidate_dashboard_cache()
+            return donation_id
+        
+        # Outside the try for the same reason as in create_blood_request
+        increment_admin_counters({'total_donations': 1})
+        invalidate_dashboard_cache()
+        return donation_id
     else:
         # Use mock data
-        donation_id = id_counter['donations']
-        id_counter['donations'] += 1
+        donation_id = mock_data['donations'].next_id()
         
-        donation_data['id'] = str(donation_id)
+        donation_data['id'] = donation_id
         donation_data['created_at'] = datetime.now().isoformat()
-        mock_data['donations'][donation_id] = donation_data
+        mock_data['donations'].insert(donation_data)
         
         logging.info(f"Created donation in mock data: {donation_id}")
-        return str(donation_id)
+        invalidate_dashboard_cache()
+        return donation_id
+
+# Attributes computed at read time rather than stored on items
+DERIVED_FIELDS = {'user_name'}
 
-def get_user_blood_requests(user_id, limit=None):
+def list_fields(fields, *required):
+    """Stored attributes to read for a view; id and created_at are always kept"""
+    if not fields:
+        return None
+    if 'user_name' in fields:
+        required += ('user_id',)
+    stored = [field for field in fields if field not in DERIVED_FIELDS]
+    return list(dict.fromkeys(['id', 'created_at', *required, *stored]))
+
+def wants_user_names(fields):
+    """Whether a view renders user_name (every view does without a field set)"""
+    return not fields or 'user_name' in fields
+
+def project_records(records, fields):
+    """Copy only the requested fields out of mock records"""
+    if not fields:
+        return records
+    return [{field: record[field] for field in fields if field in record} for record in records]
+
+def user_activity_index(table_name):
+    """Name of the best available per-user GSI on a table"""
+    if is_index_active(table_name, USER_ACTIVITY_INDEX):
+        return USER_ACTIVITY_INDEX
+    return LEGACY_USER_ID_INDEX
+
+def query_user_items(table_name, user_id, limit=None, fields=None):
+    """Query a user's items newest first, pushing the limit down to DynamoDB"""
+    key_condition = boto3.dynamodb.conditions.Key('user_id').eq(user_id)
+    projection = build_projection(list_fields(fields))
+    
+    if user_activity_index(table_name) == USER_ACTIVITY_INDEX:
+        return list(query_items(
+            table_name,
+            limit=limit,
+            IndexName=USER_ACTIVITY_INDEX,
+            KeyConditionExpression=key_condition,
+            ScanIndexForward=False,  # Sort by newest first
+            **projection
+        ))
+    
+    # The legacy index has no range key, so order and limit in Python
+    items = list(query_items(
+        table_name,
+        IndexName=LEGACY_USER_ID_INDEX,
+        KeyConditionExpression=key_condition,
+        **projection
+    ))
+    items.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+    return items[:limit] if limit else items
+
+def count_user_items(table_name, user_id, status=None):
+    """Count a user's items, optionally with one status, via Select=COUNT"""
+    query_kwargs = {
+        'IndexName': user_activity_index(table_name),
+        'KeyConditionExpression': boto3.dynamodb.conditions.Key('user_id').eq(user_id)
+    }
+    if status:
+        query_kwargs['FilterExpression'] = boto3.dynamodb.conditions.Attr('status').eq(status)
+    return count_query(table_name, **query_kwargs)
+
+@single_flight
+def get_user_blood_requests(user_id, limit=None, fields=None):
     """Get blood requests for a user"""
     dynamodb = get_dynamodb_resource()
     user_id = str(user_id)  # Ensure user_id is string
     
     if dynamodb:
         try:
-            table = dynamodb.Table(REQUESTS_TABLE)
-            table.load()  # Check if table exists
-            
-            response = table.query(
-                IndexName='user_id-index',
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('user_id').eq(user_id),
-                ScanIndexForward=False  # Sort by newest first
-            )
-            
-            requests = response['Items']
+            requests = query_user_items(REQUESTS_TABLE, user_id, limit, fields)
             logging.info(f"Found {len(requests)} blood requests for user {user_id} in DynamoDB")
-            
-            if limit:
-                requests = requests[:limit]
-            
             return requests
             
         except Exception as e:
             logging.error(f"DynamoDB error getting user blood requests: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
             # Fall back to mock data
             pass
     
     # Use mock data fallback
-    requests = []
-    for request in mock_data['blood_requests'].values():
-        if str(request['user_id']) == user_id:
-            requests.append(request)
-    
-    # Sort by creation date (newest first)
-    requests.sort(key=lambda x: x['created_at'], reverse=True)
-    
-    if limit:
-        requests = requests[:limit]
+    requests = mock_data['blood_requests'].find({'user_id': user_id}, limit=limit)
+    requests = project_records(requests, list_fields(fields))
     
     logging.info(f"Found {len(requests)} blood requests for user {user_id} in mock data")
     return requests
 
-def get_user_donations(user_id, limit=None):
+@single_flight
+def get_user_donations(user_id, limit=None, fields=None):
     """Get donations for a user"""
     dynamodb = get_dynamodb_resource()
     user_id = str(user_id)  # Ensure user_id is string
     
     if dynamodb:
         try:
-            table = dynamodb.Table(DONATIONS_TABLE)
-            response = table.query(
-                IndexName='user_id-index',
-                KeyConditionExpression='user_id = :user_id',
-                ExpressionAttributeValues={':user_id': user_id},
-                ScanIndexForward=False  # Sort by newest first
-            )
-            
-            donations = response['Items']
+            donations = query_user_items(DONATIONS_TABLE, user_id, limit, fields)
             logging.info(f"Found {len(donations)} donations for user {user_id}")
-            
-            if limit:
-                donations = donations[:limit]
-            
             return donations
             
         except ClientError as e:
             logging.error(f"DynamoDB error getting user donations: {e}")
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
             # Fall back to mock data
             pass
     
     # Use mock data fallback
-    donations = []
-    for donation in mock_data['donations'].values():
-        if str(donation['user_id']) == user_id:
-            donations.append(donation)
-    
-    # Sort by creation date (newest first)
-    donations.sort(key=lambda x: x['created_at'], reverse=True)
-    
-    if limit:
-        donations = donations[:limit]
+    donations = mock_data['donations'].find({'user_id': user_id}, limit=limit)
+    donations = project_records(donations, list_fields(fields))
     
     return donations
 
+@single_flight
 def get_user_statistics(user_id):
     """Get statistics for a user"""
-    requests = get_user_blood_requests(user_id)
-    donations = get_user_donations(user_id)
+    dynamodb = get_dynamodb_resource()
+    user_id = str(user_id)  # Ensure user_id is string
     
-    pending_requests = len([r for r in requests if r['status'] == 'pending'])
+    if dynamodb:
+        try:
+            # Counts only - no request or donation items are transferred
+            stats = {
+                'total_requests': count_user_items(REQUESTS_TABLE, user_id),
+                'total_donations': count_user_items(DONATIONS_TABLE, user_id),
+                'pending_requests': count_user_items(REQUESTS_TABLE, user_id, status='pending')
+            }
+            logging.info(f"User statistics for {user_id} from DynamoDB: {stats}")
+            return stats
+            
+        except ClientError as e:
+            logging.error(f"DynamoDB error getting user statistics: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
+            # Fall back to mock data
+            pass
     
+    # Use mock data fallback
     return {
-        'total_requests': len(requests),
-        'total_donations': len(donations),
-        'pending_requests': pending_requests
+        'total_requests': mock_data['blood_requests'].count('user_id', user_id),
+        'total_donations': mock_data['donations'].count('user_id', user_id),
+        'pending_requests': mock_data['blood_requests'].count_matching({'user_id': user_id, 'status': 'pending'})
     }
 
-def get_all_blood_requests(status_filter=None, blood_group_filter=None, limit=None):
+@single_flight
+def get_all_blood_requests(status_filter=None, blood_group_filter=None, limit=None, fields=None):
     """Get all blood requests with optional filtering"""
     dynamodb = get_dynamodb_resource()
     
     if dynamodb:
         try:
-            table = dynamodb.Table(REQUESTS_TABLE)
-            
-            # Scan all requests (for admin view)
-            response = table.scan()
-            requests = response['Items']
-            
-            # Apply filters
-            if status_filter:
-                requests = [r for r in requests if r.get('status') == status_filter]
-            
-            if blood_group_filter:
-                requests = [r for r in requests if r.get('blood_group') == blood_group_filter]
-            
-            # Add user names to requests
-            users_table = dynamodb.Table(USERS_TABLE)
-            for request in requests:
-                try:
-                    user_response = users_table.get_item(Key={'id': request['user_id']})
-                    if 'Item' in user_response:
-                        request['user_name'] = user_response['Item'].get('name', 'Unknown User')
-                    else:
-                        request['user_name'] = 'Unknown User'
-                except:
-                    request['user_name'] = 'Unknown User'
+            query_kwargs = build_request_query(status_filter, blood_group_filter)
+            if query_kwargs:
+                # Index order is newest first, so the limit can be pushed down
+                projection = build_projection(list_fields(fields))
+                requests = list(query_items(REQUESTS_TABLE, limit=limit, **query_kwargs, **projection))
+            else:
+                # Scan all requests (for admin view), applying filters as pages stream in
+                projection = build_projection(list_fields(fields, 'status', 'blood_group'))
+                requests = [
+                    r for r in scan_table(REQUESTS_TABLE, **projection)
+                    if (not status_filter or r.get('status') == status_filter)
+                    and (not blood_group_filter or r.get('blood_group') == blood_group_filter)
+                ]
             
             # Sort by creation date (newest first)
             requests.sort(key=lambda x: x.get('created_at', ''), reverse=True)
@@ -376,60 +646,45 @@ def get_all_blood_requests(status_filter=None, blood_group_filter=None, limit=No
             if limit:
                 requests = requests[:limit]
             
+            # Add user names to requests
+            if wants_user_names(fields):
+                attach_user_names(requests)
+            
             logging.info(f"Retrieved {len(requests)} blood requests from DynamoDB")
             return requests
             
         except ClientError as e:
             logging.error(f"DynamoDB error getting all blood requests: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
             # Fall back to mock data
             pass
     
     # Use mock data fallback
-    requests = list(mock_data['blood_requests'].values())
-    
-    # Apply filters
-    if status_filter:
-        requests = [r for r in requests if r['status'] == status_filter]
-    
-    if blood_group_filter:
-        requests = [r for r in requests if r['blood_group'] == blood_group_filter]
+    # Filters and newest-first order come from the store's indexes
+    requests = mock_data['blood_requests'].find(
+        request_filters(status_filter, blood_group_filter), limit=limit
+    )
+    requests = project_records(requests, list_fields(fields))
     
     # Add user names to requests
-    for request in requests:
-        user = mock_data['users'].get(request['user_id'], {})
-        request['user_name'] = user.get('name', 'Unknown User')
-    
-    # Sort by creation date (newest first)
-    requests.sort(key=lambda x: x['created_at'], reverse=True)
-    
-    if limit:
-        requests = requests[:limit]
+    if wants_user_names(fields):
+        attach_mock_user_names(requests)
     
     return requests
 
-def get_all_donations():
+@single_flight
+def get_all_donations(fields=None):
     """Get all donation schedules"""
     dynamodb = get_dynamodb_resource()
     
     if dynamodb:
         try:
-            table = dynamodb.Table(DONATIONS_TABLE)
-            
             # Scan all donations (for admin view)
-            response = table.scan()
-            donations = response['Items']
+            donations = list(scan_table(DONATIONS_TABLE, **build_projection(list_fields(fields))))
             
             # Add user names to donations
-            users_table = dynamodb.Table(USERS_TABLE)
-            for donation in donations:
-                try:
-                    user_response = users_table.get_item(Key={'id': donation['user_id']})
-                    if 'Item' in user_response:
-                        donation['user_name'] = user_response['Item'].get('name', 'Unknown User')
-                    else:
-                        donation['user_name'] = 'Unknown User'
-                except:
-                    donation['user_name'] = 'Unknown User'
+            if wants_user_names(fields):
+                attach_user_names(donations)
             
             # Sort by creation date (newest first)
             donations.sort(key=lambda x: x.get('created_at', ''), reverse=True)
@@ -439,101 +694,1476 @@ def get_all_donations():
             
         except ClientError as e:
             logging.error(f"DynamoDB error getting all donations: {e}")
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
             # Fall back to mock data
             pass
     
     # Use mock data fallback
-    donations = list(mock_data['donations'].values())
+    donations = project_records(mock_data['donations'].find(), list_fields(fields))
     
     # Add user names to donations
-    for donation in donations:
-        user = mock_data['users'].get(donation['user_id'], {})
-        donation['user_name'] = user.get('name', 'Unknown User')
-    
-    # Sort by creation date (newest first)
-    donations.sort(key=lambda x: x['created_at'], reverse=True)
+    if wants_user_names(fields):
+        attach_mock_user_names(donations)
     
     return donations
 
-def update_request_status(request_id, status):
-    """Update the status of a blood request"""
+# Page sizes for cursor-paginated admin listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def mock_page(collection, filters, page_size, cursor=None):
+    """Page mock records newest first using a (created_at, id) cursor"""
+    start_key = decode_cursor(cursor)
+    if start_key and not {'created_at', 'id'} <= start_key.keys():
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+    before = (start_key['created_at'], start_key['id']) if start_key else None
+    
+    # Read one extra record to learn whether another page follows
+    records = collection.find(filters, limit=page_size + 1, before=before)
+    page = records[:page_size]
+    next_cursor = None
+    if len(records) > page_size:
+        last = page[-1]
+        next_cursor = encode_cursor({'created_at': last['created_at'], 'id': str(last['id'])})
+    return page, next_cursor
+
+def request_filters(status_filter=None, blood_group_filter=None):
+    """Mock store filters for the admin request filters that are set"""
+    filters = {'status': status_filter, 'blood_group': blood_group_filter}
+    return {attribute: value for attribute, value in filters.items() if value}
+
+def attach_mock_user_names(items):
+    """Attach user_name to mock records from the mock users store"""
+    for item in items:
+        user = mock_data['users'].get(item['user_id'], {})
+        item['user_name'] = user.get('name', 'Unknown User')
+    return items
+
+def build_request_filter(status_filter=None, blood_group_filter=None):
+    """Build a FilterExpression for the admin request filters"""
+    condition = None
+    for name, value in (('status', status_filter), ('blood_group', blood_group_filter)):
+        if value:
+            clause = boto3.dynamodb.conditions.Attr(name).eq(value)
+            condition = clause if condition is None else condition & clause
+    return condition
+
+def build_request_query(status_filter=None, blood_group_filter=None):
+    """Plan a Query on the most selective active filter index, or None to scan"""
+    filters = {'status': status_filter, 'blood_group': blood_group_filter}
+    
+    # REQUEST_FILTER_INDEXES is ordered most selective first (8 blood groups vs 2 statuses)
+    for attribute, index_name in REQUEST_FILTER_INDEXES.items():
+        value = filters[attribute]
+        if not value or not is_index_active(REQUESTS_TABLE, index_name):
+            continue
+        
+        query_kwargs = {
+            'IndexName': index_name,
+            'KeyConditionExpression': boto3.dynamodb.conditions.Key(attribute).eq(value),
+            'ScanIndexForward': False  # Newest first on created_at
+        }
+        remaining = {f'{name}_filter': v for name, v in filters.items() if name != attribute}
+        condition = build_request_filter(**remaining)
+        if condition is not None:
+            query_kwargs['FilterExpression'] = condition
+        return query_kwargs
+    
+    return None
+
+def scan_page_while_indexing(table_name, page_size, cursor, condition, fields):
+    """Page a table with Scan while the index that orders it is not active
+
+    Scan pages follow hash order, so only each page is sorted newest first.
+    """
+    logging.warning(f"Listing {table_name} in scan order until its index is active")
+    scan_kwargs = build_projection(fields)
+    if condition is not None:
+        scan_kwargs['FilterExpression'] = condition
+    items, next_cursor = read_page(table_name, page_size, cursor, **scan_kwargs)
+    items.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+    return items, next_cursor
+
+@single_flight
+def get_blood_requests_page(status_filter=None, blood_group_filter=None, page_size=DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+    """Get one page of blood requests and the cursor for the next page"""
+    dynamodb = get_dynamodb_resource()
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    
+    if dynamodb:
+        try:
+            query_kwargs = build_request_query(status_filter, blood_group_filter)
+            status_index = REQUEST_FILTER_INDEXES['status']
+            if query_kwargs:
+                attribute = next(name for name, index in REQUEST_FILTER_INDEXES.items() if index == query_kwargs['IndexName'])
+                requests, next_cursor = read_page(
+                    REQUESTS_TABLE, page_size, cursor, operation='query',
+                    key_attributes=('id', attribute, 'created_at'),
+                    **query_kwargs, **build_projection(list_fields(fields, attribute))
+                )
+            elif not (status_filter or blood_group_filter) and is_index_active(REQUESTS_TABLE, status_index):
+                requests, next_cursor = read_merged_page(
+                    REQUESTS_TABLE, status_index, 'status', REQUEST_STATUSES, page_size, cursor,
+                    **build_projection(list_fields(fields))
+                )
+            else:
+                requests, next_cursor = scan_page_while_indexing(
+                    REQUESTS_TABLE, page_size, cursor, build_request_filter(status_filter, blood_group_filter), list_fields(fields)
+                )
+            if wants_user_names(fields):
+                attach_user_names(requests)
+            
+            logging.info(f"Retrieved page of {len(requests)} blood requests from DynamoDB")
+            return requests, next_cursor
+            
+        except ClientError as e:
+            logging.error(f"DynamoDB error getting blood requests page: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    requests, next_cursor = mock_page(
+        mock_data['blood_requests'], request_filters(status_filter, blood_group_filter), page_size, cursor
+    )
+    requests = project_records(requests, list_fields(fields))
+    if wants_user_names(fields):
+        attach_mock_user_names(requests)
+    
+    return requests, next_cursor
+
+@single_flight
+def get_donations_page(page_size=DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+    """Get one page of donation schedules and the cursor for the next page"""
+    dynamodb = get_dynamodb_resource()
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    
+    if dynamodb:
+        try:
+            if is_index_active(DONATIONS_TABLE, DONATION_STATUS_INDEX):
+                donations, next_cursor = read_merged_page(
+                    DONATIONS_TABLE, DONATION_STATUS_INDEX, 'status', DONATION_STATUSES, page_size, cursor,
+                    **build_projection(list_fields(fields))
+                )
+            else:
+                donations, next_cursor = scan_page_while_indexing(DONATIONS_TABLE, page_size, cursor, None, list_fields(fields))
+            if wants_user_names(fields):
+                attach_user_names(donations)
+            
+            logging.info(f"Retrieved page of {len(donations)} donations from DynamoDB")
+            return donations, next_cursor
+            
+        except ClientError as e:
+            logging.error(f"DynamoDB error getting donations page: {e}")
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    donations, next_cursor = mock_page(mock_data['donations'], {}, page_size, cursor)
+    donations = project_records(donations, list_fields(fields))
+    if wants_user_names(fields):
+        attach_mock_user_names(donations)
+    
+    return donations, next_cursor
+
+# Records handed to an export writer at a time; user names are joined per chunk
+EXPORT_CHUNK_SIZE = 500
+
+def chunked(items, size):
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def mock_chunks(collection, filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield mock records newest first in chunks, resuming after each chunk's last key"""
+    before = None
+    while True:
+        records = collection.find(filters, limit=chunk_size, before=before)
+        if records:
+            yield records
+        if len(records) < chunk_size:
+            return
+        last = records[-1]
+        before = (last['created_at'], str(last['id']))
+
+def stream_blood_requests(status_filter=None, blood_group_filter=None, fields=None):
+    """Yield blood requests in chunks as they are read, for streaming exports"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        streamed = False
+        try:
+            projection = build_projection(list_fields(fields))
+            query_kwargs = build_request_query(status_filter, blood_group_filter)
+            if query_kwargs:
+                requests = query_items(REQUESTS_TABLE, **query_kwargs, **projection)
+            else:
+                scan_kwargs = dict(projection)
+                condition = build_request_filter(status_filter, blood_group_filter)
+                if condition is not None:
+                    scan_kwargs['FilterExpression'] = condition
+                requests = scan_table(REQUESTS_TABLE, **scan_kwargs)
+            
+            for chunk in chunked(requests, EXPORT_CHUNK_SIZE):
+                if wants_user_names(fields):
+                    attach_user_names(chunk)
+                streamed = True
+                yield chunk
+            return
+            
+        except ClientError as e:
+            logging.error(f"DynamoDB error streaming blood requests: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
+            if streamed:
+                # Part of the export has already been sent; mixing in mock data would corrupt it
+                raise
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    filters = request_filters(status_filter, blood_group_filter)
+    for chunk in mock_chunks(mock_data['blood_requests'], filters):
+        chunk = project_records(chunk, list_fields(fields))
+        if wants_user_names(fields):
+            attach_mock_user_names(chunk)
+        yield chunk
+
+def stream_donations(fields=None):
+    """Yield donation schedules in chunks as they are read, for streaming exports"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        streamed = False
+        try:
+            donations = scan_table(DONATIONS_TABLE, **build_projection(list_fields(fields)))
+            for chunk in chunked(donations, EXPORT_CHUNK_SIZE):
+                if wants_user_names(fields):
+                    attach_user_names(chunk)
+                streamed = True
+                yield chunk
+            return
+            
+        except ClientError as e:
+            logging.error(f"DynamoDB error streaming donations: {e}")
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
+            if streamed:
+                # Part of the export has already been sent; mixing in mock data would corrupt it
+                raise
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    for chunk in mock_chunks(mock_data['donations'], {}):
+        chunk = project_records(chunk, list_fields(fields))
+        if wants_user_names(fields):
+            attach_mock_user_names(chunk)
+        yield chunk
+
+def status_update(status, expected_status=None, changes=None):
+    """update_item kwargs setting status (and changes), conditional on expected_status"""
+    names = {'#status': 'status'}
+    values = {
+        ':status': status,
+        ':updated_at': datetime.now().isoformat()
+    }
+    assignments = ['#status = :status', 'updated_at = :updated_at']
+    for i, (name, value) in enumerate((changes or {}).items()):
+        names[f'#c{i}'] = name
+        values[f':c{i}'] = value
+        assignments.append(f'#c{i} = :c{i}')
+    
+    condition = 'attribute_exists(id)'
+    if expected_status:
+        condition += ' AND #status = :expected'
+        values[':expected'] = expected_status
+    
+    return {
+        'UpdateExpression': 'SET ' + ', '.join(assignments),
+        'ConditionExpression': condition,
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+def update_request_status(request_id, status, expected_status=None, changes=None):
+    """Update the status of a blood request, and any other changes with it
+
+    With expected_status the update only happens if the request is still
+    in that status, so concurrent callers cannot both claim it.
+    """
     dynamodb = get_dynamodb_resource()
     request_id = str(request_id)  # Ensure request_id is string
     
     if dynamodb:
         try:
-            table = dynamodb.Table(REQUESTS_TABLE)
+            table = get_table(REQUESTS_TABLE)
             
             response = table.update_item(
                 Key={'id': request_id},
-                UpdateExpression='SET #status = :status, updated_at = :updated_at',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':status': status,
-                    ':updated_at': datetime.now().isoformat()
-                },
-                ReturnValues='UPDATED_NEW'
+                ReturnValues='UPDATED_OLD',
+                **status_update(status, expected_status, changes)
             )
             
+            # The old status tells us exactly which counters moved
+            old_status = response.get('Attributes', {}).get('status')
+            if old_status != status:
+                deltas = {f'{status}_requests': 1}
+                if old_status:
+                    deltas[f'{old_status}_requests'] = -1
+                increment_admin_counters(deltas)
+            
             logging.info(f"Updated blood request {request_id} status to {status}")
+            update_indexed_status(request_id, status)
+            invalidate_dashboard_cache()
             return True
             
         except ClientError as e:
+            if expected_status and e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logging.warning(f"Blood request {request_id} is no longer {expected_status}")
+                return False
             logging.error(f"DynamoDB error updating request status: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
             # Fall back to mock data
             pass
     
-    # Use mock data fallback
-    if request_id in mock_data['blood_requests']:
-        mock_data['blood_requests'][request_id]['status'] = status
-        mock_data['blood_requests'][request_id]['updated_at'] = datetime.now().isoformat()
-        return True
-    return False
+    # Use mock data fallback; the store checks expected_status in the same write
+    updated = mock_data['blood_requests'].update(request_id, dict(
+        changes or {}, status=status, updated_at=datetime.now().isoformat()
+    ), expected={'status': expected_status} if expected_status else None)
+    if updated is None:
+        return False
+    update_indexed_status(request_id, status)
+    invalidate_dashboard_cache()
+    return True
 
-def get_blood_inventory():
-    """Get blood inventory from all blood banks"""
-    return list(mock_data['inventory'].values())
+def fulfill_blood_request(request_id):
+    """Fulfil a pending request and queue the stock withdrawal it implies"""
+    request_id = str(request_id)
+    # The pending marker lets the sweep redo the withdrawal if its event is lost
+    pending = {'inventory_pending_at': datetime.now().isoformat()}
+    if not update_request_status(request_id, 'fulfilled', expected_status='pending', changes=pending):
+        return False
+    
+    requests = get_requests_by_ids([request_id], fields=['hospital', 'blood_group', 'units'])
+    if requests:
+        emit_inventory_event('request_fulfilled', requests[0])
+    return True
 
-def get_admin_statistics():
-    """Get statistics for admin dashboard"""
+def update_donation_status(donation_id, status, expected_status=None, changes=None):
+    """Update the status of a donation schedule, returning the updated donation
+
+    Returns None if the donation does not exist or, with expected_status,
+    is no longer in that status.
+    """
     dynamodb = get_dynamodb_resource()
+    donation_id = str(donation_id)
     
     if dynamodb:
         try:
-            requests_table = dynamodb.Table(REQUESTS_TABLE)
-            donations_table = dynamodb.Table(DONATIONS_TABLE)
-            
-            # Get all requests and donations for statistics
-            requests_response = requests_table.scan()
-            donations_response = donations_table.scan()
+            table = get_table(DONATIONS_TABLE)
             
-            requests = requests_response['Items']
-            donations = donations_response['Items']
+            response = table.update_item(
+                Key={'id': donation_id},
+                ReturnValues='ALL_NEW',
+                **status_update(status, expected_status, changes)
+            )
             
-            total_requests = len(requests)
-            total_donations = len(donations)
-            pending_requests = len([r for r in requests if r.get('status') == 'pending'])
-            fulfilled_requests = len([r for r in requests if r.get('status') == 'fulfilled'])
+            logging.info(f"Updated donation {donation_id} status to {status}")
+            return response['Attributes']
             
-            logging.info(f"Admin statistics from DynamoDB: {total_requests} requests, {total_donations} donations")
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logging.warning(f"Donation {donation_id} is missing or no longer {expected_status}")
+                return None
+            logging.error(f"DynamoDB error updating donation status: {e}")
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback; the store checks expected_status in the same write
+    return mock_data['donations'].update(donation_id, dict(
+        changes or {}, status=status, updated_at=datetime.now().isoformat()
+    ), expected={'status': expected_status} if expected_status else None)
+
+def complete_donation(donation_id):
+    """Mark a scheduled donation completed and queue its units into inventory"""
+    # The pending marker lets the sweep redo the receipt if its event is lost
+    pending = {'inventory_pending_at': datetime.now().isoformat()}
+    donation = update_donation_status(donation_id, 'completed', expected_status='scheduled', changes=pending)
+    if donation is None:
+        return False
+    emit_inventory_event('donation_completed', donation)
+    return True
+
+# The 10x8 hospital/blood group grid is cached per process for this many
+# seconds; writes from this process invalidate it immediately
+INVENTORY_CACHE_TTL = float(os.environ.get('INVENTORY_CACHE_TTL', '10'))
+inventory_cache = {'grid': None, 'loaded_at': None}
+inventory_lock = threading.Lock()
+
+def load_inventory_grid():
+    """Read every hospital/blood group item from DynamoDB in grid order"""
+    keys = [inventory_key(hospital, bg) for hospital in HOSPITALS for bg in BLOOD_GROUPS]
+    items = {item['id']: item for item in batch_get_items(INVENTORY_TABLE, keys)}
+    
+    grid = []
+    for hospital in HOSPITALS:
+        for bg in BLOOD_GROUPS:
+            item = items.get(inventory_key(hospital, bg))
+            if item is None:
+                # Items are only written once stock first changes
+                grid.append(dict(empty_inventory_item(hospital, bg), last_updated=''))
+                continue
+            grid.append({
+                'id': item['id'],
+                'hospital': hospital,
+                'blood_group': bg,
+                'units_available': int(item.get('units_available', 0)),
+                'last_updated': item.get('last_updated', '')
+            })
+    return grid
+
+def invalidate_inventory_cache():
+    """Force the next inventory read to go to DynamoDB"""
+    inventory_cache['loaded_at'] = None
+
+def refresh_inventory_cache():
+    """Reload the inventory grid into the cache without making readers wait on it
+
+    DynamoDB errors are raised, not answered with mock data, so the
+    background refresher keeps serving the last good grid.
+    """
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            grid = load_inventory_grid()
+            # Swap in place of the old grid; readers never see an empty cache
+            inventory_cache['grid'] = grid
+            inventory_cache['loaded_at'] = time.monotonic()
+            return grid
+        except ClientError as e:
+            logging.error(f"DynamoDB error refreshing blood inventory: {e}")
+            invalidate_table_if_missing(INVENTORY_TABLE, e)
+            raise
+    
+    return local_inventory_grid()
+
+def get_blood_inventory():
+    """Get blood inventory from all blood banks"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        loaded_at = inventory_cache['loaded_at']
+        if loaded_at is not None and time.monotonic() - loaded_at < INVENTORY_CACHE_TTL:
+            return inventory_cache['grid']
+        
+        try:
+            with inventory_lock:
+                # Another request may have reloaded the grid while we waited
+                loaded_at = inventory_cache['loaded_at']
+                if loaded_at is not None and time.monotonic() - loaded_at < INVENTORY_CACHE_TTL:
+                    return inventory_cache['grid']
+                
+                grid = load_inventory_grid()
+                inventory_cache['grid'] = grid
+                inventory_cache['loaded_at'] = time.monotonic()
+                logging.info(f"Loaded inventory grid of {len(grid)} items from DynamoDB")
+                return grid
             
-            return {
-                'total_requests': total_requests,
-                'total_donations': total_donations,
-                'pending_requests': pending_requests,
-                'fulfilled_requests': fulfilled_requests
-            }
+        except ClientError as e:
+            logging.error(f"DynamoDB error getting blood inventory: {e}")
+            invalidate_table_if_missing(INVENTORY_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    return local_inventory_grid()
+
+def inventory_update(hospital, blood_group, delta):
+    """update_item kwargs adding delta units to one inventory item"""
+    update_kwargs = {
+        'Key': {'id': inventory_key(hospital, blood_group)},
+        'UpdateExpression': 'ADD units_available :delta SET hospital = :hospital, blood_group = :blood_group, last_updated = :now',
+        'ExpressionAttributeValues': {
+            ':delta': delta,
+            ':hospital': hospital,
+            ':blood_group': blood_group,
+            ':now': datetime.now().isoformat()
+        }
+    }
+    if delta < 0:
+        # The check and the decrement happen in one write, so
+        # concurrent withdrawals can never oversell the stock
+        update_kwargs['ConditionExpression'] = 'units_available >= :needed'
+        update_kwargs['ExpressionAttributeValues'][':needed'] = -delta
+    return update_kwargs
+
+def adjust_inventory(hospital, blood_group, delta):
+    """Atomically add delta units to one inventory item
+
+    Returns the new units_available, or None when a withdrawal would take
+    the stock below zero.
+    """
+    if hospital not in HOSPITALS or blood_group not in BLOOD_GROUPS:
+        raise ValueError(f"Unknown inventory item: {hospital} {blood_group}")
+    dynamodb = get_dynamodb_resource()
+    delta = int(delta)
+    
+    if dynamodb:
+        try:
+            table = get_table(INVENTORY_TABLE)
+            response = table.update_item(ReturnValues='UPDATED_NEW', **inventory_update(hospital, blood_group, delta))
+            invalidate_inventory_cache()
+            invalidate_dashboard_cache()
+            units = int(response['Attributes']['units_available'])
+            logging.info(f"Adjusted {blood_group} at {hospital} by {delta} to {units} units")
+            return units
             
         except ClientError as e:
-            logging.error(f"DynamoDB error getting admin statistics: {e}")
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logging.warning(f"Not enough {blood_group} at {hospital} to withdraw {-delta} units")
+                return None
+            logging.error(f"DynamoDB error adjusting inventory: {e}")
+            invalidate_table_if_missing(INVENTORY_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback; the check and the change are one store write
+    item = mock_data['inventory'].increment(
+        inventory_key(hospital, blood_group), 'units_available', delta,
+        minimum=0, changes={'last_updated': datetime.now().isoformat()}
+    )
+    if item is None:
+        logging.warning(f"Not enough {blood_group} at {hospital} to withdraw {-delta} units")
+        return None
+    invalidate_dashboard_cache()
+    return item['units_available']
+
+# Units received without an expiry date keep for the red cell shelf life
+BLOOD_SHELF_LIFE_DAYS = int(os.environ.get('BLOOD_SHELF_LIFE_DAYS', '42'))
+# Expired lots are removed by a background sweep this often, never on a read
+EXPIRED_LOT_SWEEP_INTERVAL = float(os.environ.get('EXPIRED_LOT_SWEEP_INTERVAL', '3600'))
+
+# Expiry-ordered lot index. It lives in each process and is rebuilt from
+# the store once older than LOT_INDEX_MAX_AGE seconds; writes in this
+# process apply at once. Lots changed elsewhere are caught by the
+# conditional writes below, and a withdrawal the index cannot cover
+# re-reads that hospital and blood group from the store, at most
+# LOT_GROUP_MAX_REFRESHES times.
+LOT_INDEX_MAX_AGE = int(os.environ.get('LOT_INDEX_MAX_AGE', '300'))
+LOT_GROUP_MAX_REFRESHES = 3
+lot_index_state = {'index': None, 'built_at': None}
+lot_index_lock = threading.Lock()
+
+def build_lot_index():
+    """Rebuild the lot index from the active store"""
+    dynamodb = get_dynamodb_resource()
+    lots = None
+    
+    if dynamodb:
+        try:
+            lots = [dict(lot, units=int(lot['units'])) for lot in scan_table(INVENTORY_LOTS_TABLE)]
+        except ClientError as e:
+            logging.error(f"DynamoDB error building lot index: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
+            lots = None
+    
+    if lots is None:
+        lots = mock_data['inventory_lots'].find()
+    
+    # Build aside and swap; the index holds copies so it never edits stored records
+    index = LotIndex()
+    for lot in lots:
+        index.add(dict(lot))
+    lot_index_state['index'] = index
+    lot_index_state['built_at'] = time.monotonic()
+    logging.info(f"Built inventory lot index with {len(index)} lots")
+    return index
+
+def get_lot_index():
+    """Get the lot index, rebuilding it when missing or stale"""
+    built_at = lot_index_state['built_at']
+    if built_at is not None and time.monotonic() - built_at < LOT_INDEX_MAX_AGE:
+        return lot_index_state['index']
+    
+    with lot_index_lock:
+        built_at = lot_index_state['built_at']
+        if built_at is not None and time.monotonic() - built_at < LOT_INDEX_MAX_AGE:
+            return lot_index_state['index']
+        return build_lot_index()
+
+def read_lot_group(hospital, blood_group):
+    """Read one hospital and blood group's lots from the active store"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            if is_index_active(INVENTORY_LOTS_TABLE, LOT_GROUP_INDEX):
+                lots = query_items(
+                    INVENTORY_LOTS_TABLE,
+                    IndexName=LOT_GROUP_INDEX,
+                    KeyConditionExpression=boto3.dynamodb.conditions.Key('hospital').eq(hospital)
+                    & boto3.dynamodb.conditions.Key('blood_group').eq(blood_group)
+                )
+            else:
+                # Until the index is built the group is a filtered scan
+                lots = scan_table(
+                    INVENTORY_LOTS_TABLE,
+                    FilterExpression=boto3.dynamodb.conditions.Attr('hospital').eq(hospital)
+                    & boto3.dynamodb.conditions.Attr('blood_group').eq(blood_group)
+                )
+            return [dict(lot, units=int(lot['units'])) for lot in lots]
+        except ClientError as e:
+            logging.error(f"DynamoDB error reading inventory lots: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    return [dict(lot) for lot in mock_data['inventory_lots'].find({'hospital': hospital, 'blood_group': blood_group})]
+
+def refresh_lot_group(hospital, blood_group):
+    """Reload one hospital and blood group of the lot index from the store"""
+    index = get_lot_index()
+    index.replace_group(hospital, blood_group, read_lot_group(hospital, blood_group))
+    return index
+
+def new_lot(hospital, blood_group, units, expiry_date=None):
+    """Lot record for units received now, kept for the shelf life unless dated"""
+    if expiry_date:
+        expiry_date = date.fromisoformat(expiry_date).isoformat()
+    else:
+        expiry_date = (date.today() + timedelta(days=BLOOD_SHELF_LIFE_DAYS)).isoformat()
+    return {
+        'id': str(uuid.uuid4()),
+        'hospital': hospital,
+        'blood_group': blood_group,
+        'units': units,
+        'expiry_date': expiry_date,
+        'created_at': datetime.now().isoformat()
+    }
+
+def receive_units(hospital, blood_group, units, expiry_date=None):
+    """Add a lot of units with an expiry date and count them into inventory"""
+    units = int(units)
+    if units <= 0:
+        raise ValueError("Units must be positive")
+    if hospital not in HOSPITALS or blood_group not in BLOOD_GROUPS:
+        raise ValueError(f"Unknown inventory item: {hospital} {blood_group}")
+    lot = new_lot(hospital, blood_group, units, expiry_date)
+    
+    dynamodb = get_dynamodb_resource()
+    stored = False
+    if dynamodb:
+        try:
+            get_table(INVENTORY_LOTS_TABLE).put_item(Item=lot)
+            stored = True
+        except ClientError as e:
+            logging.error(f"DynamoDB error creating inventory lot: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
+            # Fall back to mock data
+            pass
+    if not stored:
+        mock_data['inventory_lots'].insert(dict(lot))
+    
+    get_lot_index().add(lot)
+    logging.info(f"Received {units} units of {blood_group} at {hospital} expiring {lot['expiry_date']}")
+    return adjust_inventory(hospital, blood_group, units)
+
+def take_from_lot(lot_id, units):
+    """Atomically take units from a stored lot; False if it no longer has them"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            table = get_table(INVENTORY_LOTS_TABLE)
+            response = table.update_item(
+                Key={'id': lot_id},
+                UpdateExpression='ADD units :taken',
+                ConditionExpression='units >= :units',
+                ExpressionAttributeValues={':taken': -units, ':units': units},
+                ReturnValues='UPDATED_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            logging.error(f"DynamoDB error taking from inventory lot: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
+            # Fall back to mock data
+            response = None
+        
+        if response is not None:
+            if int(response['Attributes']['units']) <= 0:
+                delete_empty_lot(lot_id)
+            return True
+    
+    # Use mock data fallback
+    lot = mock_data['inventory_lots'].increment(lot_id, 'units', -units, minimum=0)
+    if lot is None:
+        return False
+    if lot['units'] == 0:
+        delete_empty_lot(lot_id)
+    return True
+
+def delete_empty_lot(lot_id):
+    """Delete a used-up lot, unless units were returned to it meanwhile"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            get_table(INVENTORY_LOTS_TABLE).delete_item(
+                Key={'id': lot_id},
+                ConditionExpression='units <= :zero',
+                ExpressionAttributeValues={':zero': 0}
+            )
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return
+            logging.error(f"DynamoDB error deleting empty inventory lot: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    mock_data['inventory_lots'].delete(lot_id, expected={'units': 0})
+
+def withdraw_units(hospital, blood_group, units):
+    """Withdraw units, consuming the soonest-expiring lots first
+
+    Returns (units_available, taken) where taken lists the lots the units
+    came from, or None when the stock is too low.
+    """
+    units = int(units)
+    units_available = adjust_inventory(hospital, blood_group, -units)
+    if units_available is None:
+        return None
+    
+    index = get_lot_index()
+    taken = []
+    needed = units
+    refreshes = 0
+    while needed:
+        lot = index.soonest(hospital, blood_group)
+        if lot is not None:
+            take = min(int(lot['units']), needed)
+            if take_from_lot(lot['id'], take):
+                index.take(lot['id'], take)
+                taken.append({'lot_id': lot['id'], 'units': take, 'expiry_date': lot['expiry_date']})
+                needed -= take
+                continue
+        
+        if refreshes == LOT_GROUP_MAX_REFRESHES or (lot is None and refreshes):
+            # Stock counted before lots were tracked has no expiry to follow
+            logging.warning(f"{needed} {blood_group} units withdrawn at {hospital} are not in any lot")
+            break
+        # Other processes received lots this index has not seen, or used
+        # the one it offered, so re-read this group from the store
+        index = refresh_lot_group(hospital, blood_group)
+        refreshes += 1
+    
+    return units_available, taken
+
+def restore_lot(hospital, blood_group, line):
+    """Put units back into the lot they were taken from, recreating it if emptied"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            response = get_table(INVENTORY_LOTS_TABLE).update_item(
+                Key={'id': line['lot_id']},
+                UpdateExpression='ADD units :units SET hospital = :hospital, blood_group = :blood_group, '
+                                 'expiry_date = :expiry_date, created_at = if_not_exists(created_at, :now)',
+                ExpressionAttributeValues={
+                    ':units': line['units'],
+                    ':hospital': hospital,
+                    ':blood_group': blood_group,
+                    ':expiry_date': line['expiry_date'],
+                    ':now': datetime.now().isoformat()
+                },
+                ReturnValues='ALL_NEW'
+            )
+            return dict(response['Attributes'], units=int(response['Attributes']['units']))
+        except ClientError as e:
+            logging.error(f"DynamoDB error restoring inventory lot: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    collection = mock_data['inventory_lots']
+    while True:
+        lot = collection.increment(line['lot_id'], 'units', line['units'])
+        if lot is None:
+            # The lot was emptied and deleted; recreate it unless another worker just did
+            lot = collection.insert_new({
+                'id': line['lot_id'],
+                'hospital': hospital,
+                'blood_group': blood_group,
+                'units': line['units'],
+                'expiry_date': line['expiry_date'],
+                'created_at': datetime.now().isoformat()
+            })
+        if lot is not None:
+            return dict(lot)
+
+def return_units(hospital, blood_group, units, taken):
+    """Undo withdraw_units: refill the lots it used and count the units back"""
+    index = get_lot_index()
+    for line in taken:
+        index.add(restore_lot(hospital, blood_group, line))
+    return adjust_inventory(hospital, blood_group, units)
+
+def discard_lot(lot_id):
+    """Delete a stored lot, returning the units it still held"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            response = get_table(INVENTORY_LOTS_TABLE).delete_item(Key={'id': lot_id}, ReturnValues='ALL_OLD')
+            return int(response.get('Attributes', {}).get('units', 0))
+        except ClientError as e:
+            logging.error(f"DynamoDB error deleting inventory lot: {e}")
+            invalidate_table_if_missing(INVENTORY_LOTS_TABLE, e)
             # Fall back to mock data
             pass
     
     # Use mock data fallback
+    lot = mock_data['inventory_lots'].delete(lot_id)
+    return lot['units'] if lot else 0
+
+def sweep_expired_lots(today=None):
+    """Remove lots past their expiry date and take their units out of inventory"""
+    today = today or date.today().isoformat()
+    index = get_lot_index()
+    swept = 0
+    
+    # Expired lots are a prefix of the expiry order, so nothing else is read
+    for lot in index.expired(today):
+        index.remove(lot['id'])
+        units = discard_lot(lot['id'])
+        if not units:
+            continue
+        if adjust_inventory(lot['hospital'], lot['blood_group'], -units) is None:
+            logging.warning(f"Inventory for {lot['blood_group']} at {lot['hospital']} was below expired lot {lot['id']}")
+        swept += units
+    
+    if swept:
+        logging.info(f"Swept {swept} expired units")
+    return swept
+
+def get_expiring_lots(days=7):
+    """Lots expiring within the next days, soonest first"""
+    today = date.today()
+    lots = get_lot_index().expiring_between(today.isoformat(), (today + timedelta(days=days)).isoformat())
+    return [
+        dict(lot, days_left=(date.fromisoformat(lot['expiry_date']) - today).days)
+        for lot in lots
+    ]
+
+# Donation and fulfilment events are applied to inventory by a background
+# worker in batches of up to INVENTORY_EVENT_BATCH_SIZE. The status change
+# behind an event also sets inventory_pending_at on the donation or request,
+# and the event's stock change is written in one transaction with the swap of
+# that marker for inventory_applied_at. Each transition therefore moves stock
+# exactly once, and one whose event was lost with its process or failed to
+# apply is re-emitted by sweep_pending_inventory_events.
+INVENTORY_EVENT_BATCH_SIZE = int(os.environ.get('INVENTORY_EVENT_BATCH_SIZE', '100'))
+INVENTORY_EVENT_MAX_WAIT = float(os.environ.get('INVENTORY_EVENT_MAX_WAIT', '0.5'))
+INVENTORY_EVENT_SWEEP_INTERVAL = float(os.environ.get('INVENTORY_EVENT_SWEEP_INTERVAL', '300'))
+INVENTORY_EVENT_RETRY_AFTER = float(os.environ.get('INVENTORY_EVENT_RETRY_AFTER', '60'))
+INVENTORY_EVENT_MAX_ATTEMPTS = 3
+INVENTORY_EVENT_SOURCES = {
+    'donation_completed': (DONATIONS_TABLE, 'donations', 'completed'),
+    'request_fulfilled': (REQUESTS_TABLE, 'blood_requests', 'fulfilled')
+}
+HOSPITALS_BY_NAME = {hospital.lower(): hospital for hospital in HOSPITALS}
+
+# Groups local store writes that must land together
+mock_transaction_lock = threading.RLock()
+
+def local_transaction():
+    """Context in which several local store writes apply together"""
+    if LOCAL_STORAGE_BACKEND == 'sqlite':
+        return sqlite_transaction(SQLITE_DB_PATH)
+    # The memory store lives and dies with this process, so keeping other
+    # threads out is enough
+    return mock_transaction_lock
+
+def match_hospital(name):
+    """Tracked hospital for a free-text hospital name, or None"""
+    return HOSPITALS_BY_NAME.get(str(name or '').strip().lower())
+
+def event_stock_change(event):
+    """(hospital, blood_group, delta) an event moves, or None if no tracked stock"""
+    hospital = match_hospital(event.get('hospital'))
+    units = int(event.get('units') or 0)
+    if hospital is None or event.get('blood_group') not in BLOOD_GROUPS or units <= 0:
+        logging.warning(f"{event['type']} {event['record_id']}: {event.get('hospital')} is not a tracked blood bank")
+        return None
+    return hospital, event['blood_group'], units if event['type'] == 'donation_completed' else -units
+
+def applied_marker_action(table_name, record_id, now):
+    """Transaction action swapping a record's pending marker for applied"""
+    return {'Update': {
+        'TableName': table_name,
+        'Key': {'id': record_id},
+        'UpdateExpression': 'SET inventory_applied_at = :now REMOVE inventory_pending_at',
+        'ConditionExpression': 'attribute_exists(inventory_pending_at) AND attribute_not_exists(inventory_applied_at)',
+        'ExpressionAttributeValues': {':now': now}
+    }}
+
+def lot_take_action(lot_id, units):
+    """Transaction action taking units from a lot that still holds them"""
+    return {'Update': {
+        'TableName': INVENTORY_LOTS_TABLE,
+        'Key': {'id': lot_id},
+        'UpdateExpression': 'ADD units :taken',
+        'ConditionExpression': 'units >= :units',
+        'ExpressionAttributeValues': {':taken': -units, ':units': units}
+    }}
+
+def apply_event_in_dynamodb(event, stock, now):
+    """Write one event with TransactWriteItems; None if it was already applied"""
+    table_name = INVENTORY_EVENT_SOURCES[event['type']][0]
+    index = get_lot_index()
+    refreshed = False
+    
+    for attempt in range(INVENTORY_EVENT_MAX_ATTEMPTS):
+        actions = [applied_marker_action(table_name, event['record_id'], now)]
+        result = {'lot': None, 'taken': []}
+        if stock:
+            hospital, blood_group, delta = stock
+            actions.append({'Update': dict(inventory_update(hospital, blood_group, delta), TableName=INVENTORY_TABLE)})
+            if delta > 0:
+                result['lot'] = new_lot(hospital, blood_group, delta)
+                actions.append({'Put': {
+                    'TableName': INVENTORY_LOTS_TABLE,
+                    'Item': result['lot'],
+                    'ConditionExpression': 'attribute_not_exists(id)'
+                }})
+            else:
+                plan = index.plan_take(hospital, blood_group, -delta)
+                if sum(take for _, take in plan) < -delta and not refreshed:
+                    # Lots received by other processes are missing from this index
+                    index = refresh_lot_group(hospital, blood_group)
+                    refreshed = True
+                    plan = index.plan_take(hospital, blood_group, -delta)
+                # Soonest-expiring lots first, as many as fit in one transaction
+                for lot, take in plan[:TRANSACTION_MAX_ITEMS - 2]:
+                    actions.append(lot_take_action(lot['id'], take))
+                    result['taken'].append({'lot_id': lot['id'], 'units': take, 'emptied': take == int(lot['units'])})
+        
+        try:
+            transact_write(actions)
+            return result
+        except ClientError as e:
+            reasons = cancellation_reasons(e)
+            if not reasons:
+                invalidate_table_if_missing(table_name, e)
+                raise
+            if reasons[0] == 'ConditionalCheckFailed':
+                return None
+            if reasons[1:2] == ['ConditionalCheckFailed']:
+                logging.warning(f"Fulfilled {-stock[2]} {stock[1]} units at {stock[0]} with less stock on record")
+                stock = None
+            elif 'ConditionalCheckFailed' in reasons[2:]:
+                # Another process used one of the planned lots
+                index = refresh_lot_group(stock[0], stock[1])
+                refreshed = True
+    
+    raise RuntimeError(f"Gave up applying {event['type']} {event['record_id']} after {INVENTORY_EVENT_MAX_ATTEMPTS} attempts")
+
+def apply_event_locally(event, stock, now):
+    """Write one event in a single local store transaction; None if it was already applied"""
+    collection = mock_data[INVENTORY_EVENT_SOURCES[event['type']][1]]
+    result = {'lot': None, 'taken': []}
+    
+    with local_transaction():
+        record = collection.get(event['record_id'])
+        if record is None or not record.get('inventory_pending_at') or record.get('inventory_applied_at'):
+            return None
+        collection.update(event['record_id'], {'inventory_applied_at': now, 'inventory_pending_at': None})
+        if not stock:
+            return result
+        
+        hospital, blood_group, delta = stock
+        item = mock_data['inventory'].increment(
+            inventory_key(hospital, blood_group), 'units_available', delta,
+            minimum=0, changes={'last_updated': now}
+        )
+        if delta > 0:
+            result['lot'] = dict(mock_data['inventory_lots'].insert(new_lot(hospital, blood_group, delta)))
+            return result
+        if item is None:
+            logging.warning(f"Fulfilled {-delta} {blood_group} units at {hospital} with less stock on record")
+            return result
+        
+        # Lots are read inside the transaction, so the plan cannot go stale
+        needed = -delta
+        lots = mock_data['inventory_lots'].find({'hospital': hospital, 'blood_group': blood_group})
+        for lot in sorted(lots, key=lambda lot: (lot['expiry_date'], str(lot['id']))):
+            take = min(int(lot['units']), needed)
+            updated = mock_data['inventory_lots'].increment(lot['id'], 'units', -take, minimum=0) if take else None
+            if updated is not None:
+                result['taken'].append({'lot_id': lot['id'], 'units': take, 'emptied': updated['units'] == 0})
+                needed -= take
+            if not needed:
+                break
+    return result
+
+def apply_inventory_event(event):
+    """Apply one event's stock change together with its record's applied marker
+
+    Returns False if the record was already applied. Backend errors are
+    raised rather than falling back to mock data, leaving the record
+    pending for the next sweep.
+    """
+    stock = event_stock_change(event)
+    now = datetime.now().isoformat()
+    if get_dynamodb_resource():
+        result = apply_event_in_dynamodb(event, stock, now)
+    else:
+        result = apply_event_locally(event, stock, now)
+    if result is None:
+        return False
+    
+    index = get_lot_index()
+    if result['lot']:
+        index.add(result['lot'])
+    for line in result['taken']:
+        index.take(line['lot_id'], line['units'])
+        if line['emptied']:
+            delete_empty_lot(line['lot_id'])
+    if stock:
+        invalidate_inventory_cache()
+        invalidate_dashboard_cache()
+    return True
+
+def apply_inventory_events(events):
+    """Apply a batch of donation and fulfilment events, each in its own transaction"""
+    applied = 0
+    for event in events:
+        try:
+            if apply_inventory_event(event):
+                applied += 1
+            else:
+                logging.info(f"Skipping {event['type']} {event['record_id']}: already applied")
+        except Exception as e:
+            logging.error(f"Failed to apply {event['type']} {event['record_id']}, leaving it for the sweep: {e}")
+    
+    if applied:
+        logging.info(f"Applied {applied} of {len(events)} inventory events")
+
+inventory_events = create_pipeline(
+    'inventory-events', apply_inventory_events,
+    batch_size=INVENTORY_EVENT_BATCH_SIZE, max_wait=INVENTORY_EVENT_MAX_WAIT
+)
+
+def emit_inventory_event(event_type, record):
+    """Queue an inventory event for a donation or request that changed status"""
+    inventory_events.emit({
+        'type': event_type,
+        'record_id': str(record['id']),
+        'hospital': record.get('hospital'),
+        'blood_group': record.get('blood_group'),
+        'units': int(record.get('units', 0))
+    })
+
+def find_pending_inventory_records(event_type, before):
+    """Records of an event type whose inventory change has been pending since before"""
+    table_name, collection_name, status = INVENTORY_EVENT_SOURCES[event_type]
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            projection = build_projection(['id', 'hospital', 'blood_group', 'units'])
+            if is_index_active(table_name, INVENTORY_PENDING_INDEX):
+                # Only pending records are in the index, so this reads nothing else
+                return list(query_items(
+                    table_name,
+                    IndexName=INVENTORY_PENDING_INDEX,
+                    KeyConditionExpression=boto3.dynamodb.conditions.Key('status').eq(status)
+                    & boto3.dynamodb.conditions.Key('inventory_pending_at').lt(before),
+                    **projection
+                ))
+            # Until the index is built the sweep is a filtered scan
+            return list(scan_table(
+                table_name,
+                FilterExpression=boto3.dynamodb.conditions.Attr('inventory_pending_at').lt(before),
+                **projection
+            ))
+        except ClientError as e:
+            logging.error(f"DynamoDB error finding pending inventory events: {e}")
+            invalidate_table_if_missing(table_name, e)
+            raise
+    
+    return mock_data[collection_name].find_below('inventory_pending_at', before)
+
+def sweep_pending_inventory_events(retry_after=INVENTORY_EVENT_RETRY_AFTER):
+    """Re-emit events for records still pending after retry_after seconds
+
+    Catches events lost with a crashed or redeployed process and events
+    that failed to apply. Re-emitting is safe: an event that was applied
+    meanwhile is skipped by its marker.
+    """
+    before = (datetime.now() - timedelta(seconds=retry_after)).isoformat()
+    emitted = 0
+    for event_type in INVENTORY_EVENT_SOURCES:
+        for record in find_pending_inventory_records(event_type, before):
+            emit_inventory_event(event_type, record)
+            emitted += 1
+    
+    if emitted:
+        logging.warning(f"Re-emitted {emitted} pending inventory events")
+    return emitted
+
+# Inventory snapshots are stored one item per hour as parallel taken_at and
+# grids lists, each grid the packed HOSPITALS x BLOOD_GROUPS unit counts.
+# At about 450 bytes a snapshot, a day item outgrew DynamoDB's 400KB item
+# limit at two-minute intervals; the interval floor keeps an hour item
+# under 30KB
+MIN_INVENTORY_SNAPSHOT_INTERVAL = 60
+INVENTORY_SNAPSHOT_INTERVAL = max(MIN_INVENTORY_SNAPSHOT_INTERVAL, int(os.environ.get('INVENTORY_SNAPSHOT_INTERVAL', '3600')))
+FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', '14'))
+FORECAST_HORIZON_HOURS = int(os.environ.get('FORECAST_HORIZON_HOURS', '24'))
+SHORTAGE_THRESHOLD_UNITS = int(os.environ.get('SHORTAGE_THRESHOLD_UNITS', '5'))
+snapshot_state = {'taken_at': None}
+mock_snapshot_lock = threading.Lock()
+
+def snapshot_item_id(moment):
+    """Stats table item id holding the inventory snapshots of moment's hour"""
+    return f"inventory_snapshots#{moment.strftime('%Y-%m-%dT%H')}"
+
+def snapshot_item_ids(days):
+    """Snapshot item ids for every hour of today and the previous days
+
+    Day items stored before snapshots were split by hour are included so
+    their history is still read.
+    """
+    now = datetime.now()
+    start = datetime.combine(now.date() - timedelta(days=days), datetime.min.time())
+    hours = int((now - start).total_seconds() // 3600) + 1
+    day_ids = [f"inventory_snapshots#{(start.date() + timedelta(days=day)).isoformat()}" for day in range(days + 1)]
+    return day_ids + [snapshot_item_id(start + timedelta(hours=hour)) for hour in range(hours)]
+
+def inventory_units_grid():
+    """Current units_available as a flat list in HOSPITALS x BLOOD_GROUPS order"""
+    units = {(item['hospital'], item['blood_group']): int(item['units_available']) for item in get_blood_inventory()}
+    return [units.get((hospital, bg), 0) for hospital in HOSPITALS for bg in BLOOD_GROUPS]
+
+def take_inventory_snapshot():
+    """Append the current inventory grid to this hour's snapshot item"""
+    invalidate_inventory_cache()
+    taken_at = datetime.now()
+    item_id = snapshot_item_id(taken_at)
+    grid = encode_grid(inventory_units_grid())
+    dynamodb = get_dynamodb_resource()
+    stored = False
+    
+    if dynamodb:
+        try:
+            get_table(STATS_TABLE).update_item(
+                Key={'id': item_id},
+                UpdateExpression='SET taken_at = list_append(if_not_exists(taken_at, :empty), :taken_at), '
+                                 'grids = list_append(if_not_exists(grids, :empty), :grid)',
+                ExpressionAttributeValues={
+                    ':empty': [],
+                    ':taken_at': [taken_at.isoformat()],
+                    ':grid': [grid]
+                }
+            )
+            stored = True
+        except ClientError as e:
+            logging.error(f"DynamoDB error storing inventory snapshot: {e}")
+            invalidate_table_if_missing(STATS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    if not stored:
+        collection = mock_data['inventory_snapshots']
+        with mock_snapshot_lock:
+            item = collection.get(item_id) or {
+                'id': item_id, 'created_at': taken_at.replace(minute=0, second=0, microsecond=0).isoformat(), 'taken_at': [], 'grids': []
+            }
+            collection.insert(dict(item, taken_at=item['taken_at'] + [taken_at.isoformat()], grids=item['grids'] + [grid]))
+    
+    snapshot_state['taken_at'] = taken_at
+    logging.info(f"Stored inventory snapshot at {taken_at.isoformat()}")
+    return taken_at
+
+def load_snapshot_history(days=FORECAST_HISTORY_DAYS):
+    """(taken_at, units) snapshots from today and the previous days, oldest first"""
+    item_ids = snapshot_item_ids(days)
+    items = None
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            # Hour items have known keys, so history is a batch read, never a scan
+            items = batch_get_items(STATS_TABLE, item_ids)
+        except ClientError as e:
+            logging.error(f"DynamoDB error loading inventory snapshots: {e}")
+            invalidate_table_if_missing(STATS_TABLE, e)
+            items = None
+    
+    if items is None:
+        items = [item for item in (mock_data['inventory_snapshots'].get(item_id) for item_id in item_ids) if item]
+    
+    size = len(HOSPITALS) * len(BLOOD_GROUPS)
+    snapshots = sorted(
+        (taken_at, grid)
+        for item in items
+        for taken_at, grid in zip(item.get('taken_at', []), item.get('grids', []))
+    )
+    
+    history = []
+    min_gap = INVENTORY_SNAPSHOT_INTERVAL / 2
+    last_taken = None
+    for taken_at, grid in snapshots:
+        taken = datetime.fromisoformat(taken_at)
+        # Workers racing on the same interval can both store a snapshot; keep one
+        if last_taken is not None and (taken - last_taken).total_seconds() < min_gap:
+            continue
+        units = decode_grid(grid)
+        if len(units) != size:
+            # Stored before the tracked hospitals changed
+            continue
+        history.append((taken_at, units))
+        last_taken = taken
+    return history
+
+def maybe_snapshot_inventory():
+    """Take an inventory snapshot if the last one is older than the interval
+
+    Runs on the live-data refresher in every worker; the stored history
+    is re-read before a snapshot is taken, so only one worker per
+    interval usually takes it.
+    """
+    last = snapshot_state['taken_at']
+    if last is None or (datetime.now() - last).total_seconds() >= INVENTORY_SNAPSHOT_INTERVAL:
+        history = load_snapshot_history(1)
+        last = datetime.fromisoformat(history[-1][0]) if history else datetime.min
+        snapshot_state['taken_at'] = last
+    if (datetime.now() - last).total_seconds() >= INVENTORY_SNAPSHOT_INTERVAL:
+        return take_inventory_snapshot()
+    return None
+
+def get_shortage_forecast():
+    """Hospital/blood groups projected to fall below SHORTAGE_THRESHOLD_UNITS"""
+    history = load_snapshot_history()
+    if len(history) < 2:
+        return []
+    
+    # Snapshots drift and get missed, so put them on an even
+    # INVENTORY_SNAPSHOT_INTERVAL grid before counting horizon steps
+    times = [datetime.fromisoformat(taken_at).timestamp() for taken_at, _ in history]
+    series = resample(times, [units for _, units in history], INVENTORY_SNAPSHOT_INTERVAL)
+    horizon = max(1, round(FORECAST_HORIZON_HOURS * 3600 / INVENTORY_SNAPSHOT_INTERVAL))
+    projected = holt_forecast(series, horizon)
+    current = history[-1][1]
+    
+    shortages = []
+    for position, (now_units, future_units) in enumerate(zip(current, projected)):
+        # Already-empty cells are not a forecast; flag the ones heading down into shortage
+        if future_units < SHORTAGE_THRESHOLD_UNITS and future_units < now_units:
+            hospital, bg = divmod(position, len(BLOOD_GROUPS))
+            shortages.append({
+                'hospital': HOSPITALS[hospital],
+                'blood_group': BLOOD_GROUPS[bg],
+                'units_available': now_units,
+                'projected_units': round(future_units, 1)
+            })
+    shortages.sort(key=lambda shortage: shortage['projected_units'])
+    return shortages
+
+# (grid, matrix) pair; the matrix is rebuilt only when get_blood_inventory
+# hands back a different grid, and the pair is swapped as one object
+stock_matrix_cache = (None, None)
+
+def get_stock_matrix():
+    """Get the hospital x blood group stock matrix for the current inventory"""
+    global stock_matrix_cache
+    grid = get_blood_inventory()
+    cached_grid, matrix = stock_matrix_cache
+    if cached_grid is not grid:
+        matrix = StockMatrix(grid, HOSPITALS, BLOOD_GROUPS)
+        stock_matrix_cache = (grid, matrix)
+    return matrix
+
+def find_compatible_stock(blood_group, units=1):
+    """Hospitals with at least units of stock compatible with blood_group"""
+    if blood_group not in BLOOD_GROUPS:
+        raise ValueError(f"Invalid blood group: {blood_group}")
+    return get_stock_matrix().compatible_stock(blood_group, units)
+
+def find_compatible_stock_many(needs):
+    """find_compatible_stock for many (blood_group, units) needs against one snapshot"""
+    for blood_group, _ in needs:
+        if blood_group not in BLOOD_GROUPS:
+            raise ValueError(f"Invalid blood group: {blood_group}")
+    return get_stock_matrix().compatible_stock_many(needs)
+
+# Request attributes the allocation engine and its preview read
+ALLOCATION_FIELDS = ['user_name', 'hospital', 'blood_group', 'units', 'urgency', 'status']
+
+def plan_allocation():
+    """Plan fulfilment of every pending request against the inventory"""
+    pending = get_all_blood_requests(status_filter='pending', fields=ALLOCATION_FIELDS)
+    started = time.monotonic()
+    plan = allocate(pending, get_stock_matrix())
+    plan['seconds'] = round(time.monotonic() - started, 4)
+    logging.info(
+        f"Allocation plan fills {len(plan['allocations'])} of {len(pending)} pending requests "
+        f"in {plan['seconds']}s"
+    )
+    return plan
+
+def apply_allocation():
+    """Plan against fresh stock, then claim each request and withdraw its units
+
+    A request is claimed with a pending -> fulfilled conditional update
+    before any stock moves, so two admins applying at once cannot fill
+    it twice. Units come out of the soonest-expiring lots first. If a
+    withdrawal fails because stock changed since the plan, the units
+    already taken go back to their lots and the request returns to
+    pending.
+    """
+    invalidate_inventory_cache()
+    plan = plan_allocation()
+    applied = []
+    failed = []
+    
+    for allocation in plan['allocations']:
+        request_id = allocation['request']['id']
+        if not update_request_status(request_id, 'fulfilled', expected_status='pending'):
+            failed.append(allocation)
+            continue
+        
+        withdrawn = []
+        for line in allocation['lines']:
+            result = withdraw_units(line['hospital'], line['blood_group'], line['units'])
+            if result is None:
+                break
+            line['lots'] = result[1]
+            withdrawn.append(line)
+        
+        if len(withdrawn) == len(allocation['lines']):
+            applied.append(allocation)
+            continue
+        
+        for line in withdrawn:
+            return_units(line['hospital'], line['blood_group'], line['units'], line['lots'])
+        update_request_status(request_id, 'pending', expected_status='fulfilled')
+        failed.append(allocation)
+    
+    plan['applied'] = applied
+    plan['failed'] = failed
+    logging.info(f"Applied allocation: {len(applied)} requests fulfilled, {len(failed)} skipped")
+    return plan
+
+# Admin dashboard payloads are cached per process for DASHBOARD_CACHE_TTL
+# seconds. Writes in this process bump the generation, which both drops
+# cached payloads and stops a build that overlapped a write from storing
+# its already-stale result.
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', '30'))
+dashboard_cache = {'generation': 0, 'payloads': {}}
+# Dashboards render with whatever their parallel reads returned by this deadline
+DASHBOARD_DEADLINE_SECONDS = float(os.environ.get('DASHBOARD_DEADLINE_SECONDS', '3'))
+dashboard_cache_lock = threading.Lock()
+
+def clear_dashboard_payloads():
+    """Drop cached admin dashboard payloads"""
+    with dashboard_cache_lock:
+        dashboard_cache['generation'] += 1
+        dashboard_cache['payloads'] = {}
+
+def invalidate_dashboard_cache():
+    """Drop cached admin dashboard payloads after a write and refresh live data"""
+    clear_dashboard_payloads()
+    live_data.refresh()
+
+def build_admin_dashboard(recent_limit, recent_fields):
+    """Compute the admin dashboard's statistics, recent requests, inventory and forecast
+
+    The reads are independent, so they run side by side and the page
+    waits roughly as long as the slowest one, never past the deadline.
+    """
+    return fan_out({
+        'stats': lambda: live_data.get('admin_stats'),
+        # The first listing page: newest first from the status index, not a scan
+        'recent_requests': lambda: get_blood_requests_page(page_size=recent_limit, fields=recent_fields)[0],
+        'inventory': lambda: live_data.get('inventory'),
+        'shortages': get_shortage_forecast
+    }, DASHBOARD_DEADLINE_SECONDS, defaults={'recent_requests': [], 'inventory': [], 'shortages': []})
+
+def get_admin_dashboard(recent_limit=10, recent_fields=None):
+    """Get the admin dashboard payload, from cache while fresh"""
+    key = (recent_limit, tuple(recent_fields or ()))
+    cached = dashboard_cache['payloads'].get(key)
+    if cached is not None and time.monotonic() - cached[0] < DASHBOARD_CACHE_TTL:
+        return cached[1]
+    
+    generation = dashboard_cache['generation']
+    payload, incomplete = build_admin_dashboard(recent_limit, recent_fields)
+    if incomplete:
+        # Serve what arrived in time, but let the next load try again
+        return payload
+    with dashboard_cache_lock:
+        if dashboard_cache['generation'] == generation:
+            dashboard_cache['payloads'][key] = (time.monotonic(), payload)
+    return payload
+
+def get_user_dashboard(user_id, recent_limit=5, recent_fields=None):
+    """Get a user's statistics and recent requests and donations in parallel"""
+    payload, _ = fan_out({
+        'stats': lambda: get_user_statistics(user_id),
+        'recent_requests': lambda: get_user_blood_requests(user_id, limit=recent_limit, fields=recent_fields),
+        'recent_donations': lambda: get_user_donations(user_id, limit=recent_limit, fields=recent_fields)
+    }, DASHBOARD_DEADLINE_SECONDS, defaults={'recent_requests': [], 'recent_donations': []})
+    return payload
+
+@single_flight
+def get_admin_statistics():
+    """Get statistics for admin dashboard
+
+    DynamoDB errors are raised, not answered with mock data, so the
+    background refresher keeps serving the last good statistics.
+    """
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            table = get_table(STATS_TABLE)
+            response = table.get_item(Key={'id': ADMIN_STATS_ID})
+            item = response.get('Item')
+            
+            if item and 'reconciled_at' in item:
+                stats = {field: int(item.get(field, 0)) for field in ADMIN_STATS_FIELDS}
+            else:
+                # Counters have never been seeded from the existing data
+                stats = reconcile_admin_statistics()
+                stats = {field: stats[field] for field in ADMIN_STATS_FIELDS}
+            
+            logging.info(f"Admin statistics from DynamoDB: {stats['total_requests']} requests, {stats['total_donations']} donations")
+            return stats
+            
+        except ClientError as e:
+            logging.error(f"DynamoDB error getting admin statistics: {e}")
+            invalidate_table_if_missing(STATS_TABLE, e)
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
+            invalidate_table_if_missing(DONATIONS_TABLE, e)
+            raise
+    
     total_requests = len(mock_data['blood_requests'])
     total_donations = len(mock_data['donations'])
-    pending_requests = len([r for r in mock_data['blood_requests'].values() if r['status'] == 'pending'])
-    fulfilled_requests = len([r for r in mock_data['blood_requests'].values() if r['status'] == 'fulfilled'])
+    pending_requests = mock_data['blood_requests'].count('status', 'pending')
+    fulfilled_requests = mock_data['blood_requests'].count('status', 'fulfilled')
     
     return {
         'total_requests': total_requests,
@@ -542,17 +2172,167 @@ def get_admin_statistics():
         'fulfilled_requests': fulfilled_requests
     }
 
-def search_requests(query, status_filter=None, blood_group_filter=None):
+# Admin statistics and the inventory grid are recomputed in the background
+# every STATS_REFRESH_INTERVAL seconds (and straight after local writes), so
+# dashboards read the latest snapshot without waiting on DynamoDB
+STATS_REFRESH_INTERVAL = float(os.environ.get('STATS_REFRESH_INTERVAL', '15'))
+live_data = BackgroundRefresher('live-data', STATS_REFRESH_INTERVAL, on_refresh=clear_dashboard_payloads)
+live_data.register('admin_stats', get_admin_statistics)
+live_data.register('inventory', refresh_inventory_cache)
+live_data.schedule('inventory_events', sweep_pending_inventory_events, INVENTORY_EVENT_SWEEP_INTERVAL)
+live_data.schedule('expired_lots', sweep_expired_lots, EXPIRED_LOT_SWEEP_INTERVAL)
+# Checked every minute so snapshots land close to INVENTORY_SNAPSHOT_INTERVAL apart
+live_data.schedule('inventory_snapshot', maybe_snapshot_inventory, min(60, INVENTORY_SNAPSHOT_INTERVAL))
+
+# Inverted n-gram index over requester name and hospital for admin search.
+# It lives in each process and is rebuilt from the store once it is older
+# than SEARCH_INDEX_MAX_AGE seconds; writes in this process apply at once.
+# In the serving app the live-data refresher rebuilds it while searches
+# keep reading the old one; only the first search builds it inline.
+SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', '300'))
+search_index_state = {'index': None, 'built_at': None}
+search_index_lock = threading.Lock()
+
+def new_search_index():
+    """Create an empty request search index"""
+    return NGramIndex(n=3, filter_fields=['status', 'blood_group'])
+
+def index_request(index, request):
+    """Add one request, with its user_name attached, to a search index"""
+    index.add(
+        request['id'],
+        [request.get('user_name', ''), request.get('hospital', '')],
+        {'status': request.get('status'), 'blood_group': request.get('blood_group')}
+    )
+
+def build_search_index():
+    """Rebuild the request search index from the active store"""
+    dynamodb = get_dynamodb_resource()
+    requests = None
+    
+    if dynamodb:
+        try:
+            requests = list(scan_table(
+                REQUESTS_TABLE,
+                ProjectionExpression='#id, user_id, hospital, #status, blood_group',
+                ExpressionAttributeNames={'#id': 'id', '#status': 'status'}
+            ))
+            attach_user_names(requests)
+        except ClientError as e:
+            logging.error(f"DynamoDB error building search index: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
+            requests = None
+    
+    if requests is None:
+        requests = attach_mock_user_names(mock_data['blood_requests'].find())
+    
+    # Build aside and swap so searches never wait on a rebuild
+    index = new_search_index()
+    for request in requests:
+        index_request(index, request)
+    search_index_state['index'] = index
+    search_index_state['built_at'] = time.monotonic()
+    logging.info(f"Built request search index with {len(index)} requests")
+    return index
+
+def search_index_stale():
+    """Whether the search index was invalidated or is older than SEARCH_INDEX_MAX_AGE"""
+    built_at = search_index_state['built_at']
+    return built_at is None or time.monotonic() - built_at >= SEARCH_INDEX_MAX_AGE
+
+def search_index_usable():
+    """Whether searches can use the current index as it is
+
+    A stale index still serves while the refresher's jobs run; CLI
+    commands and tests, which never start them, rebuild it inline.
+    """
+    return search_index_state['index'] is not None and (live_data.jobs_enabled or not search_index_stale())
+
+def get_search_index():
+    """Get the request search index, building it inline only when unusable"""
+    if search_index_usable():
+        return search_index_state['index']
+    
+    with search_index_lock:
+        if search_index_usable():
+            return search_index_state['index']
+        return build_search_index()
+
+def refresh_search_index():
+    """Rebuild a stale search index off the request path"""
+    if search_index_state['index'] is None or not search_index_stale():
+        return
+    with search_index_lock:
+        if search_index_stale():
+            build_search_index()
+
+def invalidate_search_index():
+    """Rebuild the search index soon, in the background where it runs"""
+    search_index_state['built_at'] = None
+    live_data.run_soon('search_index')
+
+# Checked every minute, and at once after an invalidation
+live_data.schedule('search_index', refresh_search_index, min(60, SEARCH_INDEX_MAX_AGE))
+
+def index_new_request(request_data, in_mock):
+    """Add a newly created request to the search index if it is built"""
+    index = search_index_state['index']
+    if index is None:
+        return
+    request = dict(request_data)
+    if in_mock:
+        attach_mock_user_names([request])
+    else:
+        attach_user_names([request])
+    index_request(index, request)
+
+def update_indexed_status(request_id, status):
+    """Move a request between status postings in the search index"""
+    index = search_index_state['index']
+    if index is not None:
+        index.update_filters(request_id, {'status': status})
+
+def get_requests_by_ids(request_ids, fields=None):
+    """Fetch blood requests by id, with user names attached if the view wants them"""
+    dynamodb = get_dynamodb_resource()
+    
+    if dynamodb:
+        try:
+            requests = batch_get_items(REQUESTS_TABLE, request_ids, **build_projection(list_fields(fields)))
+            if wants_user_names(fields):
+                attach_user_names(requests)
+            return requests
+        except ClientError as e:
+            logging.error(f"DynamoDB error getting requests by id: {e}")
+            invalidate_table_if_missing(REQUESTS_TABLE, e)
+            # Fall back to mock data
+            pass
+    
+    # Use mock data fallback
+    requests = [mock_data['blood_requests'].get(request_id) for request_id in request_ids]
+    requests = project_records([r for r in requests if r], list_fields(fields))
+    if wants_user_names(fields):
+        attach_mock_user_names(requests)
+    return requests
+
+@single_flight
+def search_requests(query, status_filter=None, blood_group_filter=None, fields=None):
     """Search blood requests by user name or hospital"""
-    all_requests = get_all_blood_requests(status_filter, blood_group_filter)
+    filters = request_filters(status_filter, blood_group_filter)
+    request_ids = get_search_index().search(query, filters)
     
-    # Filter by search query
-    filtered_requests = []
+    # Re-check the current records, since the index may lag other workers
+    if fields:
+        fields = ['user_name', 'hospital', 'status', 'blood_group', *fields]
     query_lower = query.lower()
+    filtered_requests = [
+        request for request in get_requests_by_ids(request_ids, fields)
+        if all(request.get(attribute) == value for attribute, value in filters.items())
+        and (query_lower in request.get('user_name', '').lower() or
+             query_lower in request.get('hospital', '').lower())
+    ]
     
-    for request in all_requests:
-        if (query_lower in request.get('user_name', '').lower() or 
-            query_lower in request.get('hospital', '').lower()):
-            filtered_requests.append(request)
+    # Sort by creation date (newest first)
+    filtered_requests.sort(key=lambda x: x.get('created_at', ''), reverse=True)
     
     return filtered_requests
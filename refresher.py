@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import threading
+
+class BackgroundRefresher:
+    """Named values kept fresh by a background thread (stale-while-revalidate)
+
+    Readers get the latest computed value immediately; only the very
+    first read of a value in a process computes it inline. A daemon
+    thread recomputes every value each interval, or sooner once
+    refresh() is called after a write, and swaps the results in. It
+    pauses while nobody has read for idle_after seconds and is
+    restarted after a fork. on_refresh is called when a pass changed
+    any value.
+
+    Scheduled jobs run on the same thread at their own intervals, idle
+    or not, but only once start() was called, so CLI commands and tests
+    that merely read values never trigger them.
+    """
+
+    def __init__(self, name, interval, idle_after=None, on_refresh=None):
+        self.name = name
+        self.interval = interval
+        self.idle_after = idle_after if idle_after is not None else interval * 20
+        self.on_refresh = on_refresh
+        self.loaders = {}
+        self.values = {}
+        self.jobs = {}
+        self.jobs_enabled = False
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.last_read = time.monotonic()
+        self.pid = None
+        self.worker = None
+
+    def register(self, key, loader):
+        """Add a value and the zero-argument function that computes it"""
+        self.loaders[key] = loader
+
+    def schedule(self, name, job, every):
+        """Run a zero-argument job every `every` seconds once started"""
+        self.jobs[name] = {'job': job, 'every': every, 'due': time.monotonic() + every}
+
+    def run_soon(self, name):
+        """Make a scheduled job due now and wake the worker"""
+        self.jobs[name]['due'] = time.monotonic()
+        self.wake.set()
+
+    def start(self):
+        """Enable scheduled jobs and make sure the worker is running"""
+        self.jobs_enabled = True
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self.pid == os.getpid() and self.worker.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.worker.is_alive():
+                return
+            self.pid = os.getpid()
+            self.worker = threading.Thread(target=self._run, name=f'{self.name}-refresher', daemon=True)
+            self.worker.start()
+
+    def get(self, key):
+        """Latest value for key, computing it inline only the first time"""
+        self.last_read = time.monotonic()
+        self._ensure_worker()
+        entry = self.values.get(key)
+        if entry is not None:
+            return entry[1]
+        value = self.loaders[key]()
+        self.values[key] = (time.monotonic(), value)
+        return value
+
+    def age(self, key):
+        """Seconds since key was last computed, or None if it never was"""
+        entry = self.values.get(key)
+        return None if entry is None else time.monotonic() - entry[0]
+
+    def refresh(self):
+        """Ask the worker to recompute every value now"""
+        self.wake.set()
+
+    def _run_jobs(self):
+        if not self.jobs_enabled:
+            return
+        now = time.monotonic()
+        for name, job in self.jobs.items():
+            if now < job['due']:
+                continue
+            job['due'] = now + job['every']
+            try:
+                job['job']()
+            except Exception as e:
+                logging.error(f"{self.name} job {name} failed: {e}")
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self._run_jobs()
+            if time.monotonic() - self.last_read > self.idle_after:
+                continue
+            self._refresh_values()
+
+    def _refresh_values(self):
+        changed = False
+        for key, loader in self.loaders.items():
+            try:
+                value = loader()
+            except Exception as e:
+                # Keep serving the last good value
+                logging.error(f"{self.name} failed to refresh {key}: {e}")
+                continue
+            previous = self.values.get(key)
+            changed = changed or previous is None or previous[1] != value
+            self.values[key] = (time.monotonic(), value)
+        if changed and self.on_refresh:
+            self.on_refresh()
@@ -0,0 +1,115 @@
+import threading
+
+class NGramIndex:
+    """Inverted n-gram index answering case-insensitive substring searches
+
+    Each document's text is broken into overlapping n-grams and every
+    gram keeps a posting set of document ids. Exact-match filter fields
+    (such as status or blood group) get posting sets of their own, so a
+    search intersects the smallest postings first and only verifies the
+    few candidates that survive.
+    """
+
+    def __init__(self, n=3, filter_fields=()):
+        self.n = n
+        self.filter_fields = tuple(filter_fields)
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        """Drop every document"""
+        with self.lock:
+            self.postings = {}
+            self.filter_postings = {field: {} for field in self.filter_fields}
+            self.documents = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def grams(self, text):
+        """Distinct n-grams of lowercased text"""
+        text = text.lower()
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, doc_id, texts, filters=None):
+        """Index a document's searchable texts and filter values"""
+        doc_id = str(doc_id)
+        with self.lock:
+            self.remove(doc_id)
+            texts = [text.lower() for text in texts if text]
+            grams = set()
+            for text in texts:
+                grams |= self.grams(text)
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(doc_id)
+
+            values = {field: (filters or {}).get(field) for field in self.filter_fields}
+            for field, value in values.items():
+                self.filter_postings[field].setdefault(value, set()).add(doc_id)
+            self.documents[doc_id] = (texts, grams, values)
+
+    def update_filters(self, doc_id, filters):
+        """Move a document between filter postings without re-tokenising"""
+        doc_id = str(doc_id)
+        with self.lock:
+            document = self.documents.get(doc_id)
+            if document is None:
+                return False
+            values = document[2]
+            for field, value in filters.items():
+                if field not in values or values[field] == value:
+                    continue
+                self._discard(self.filter_postings[field], values[field], doc_id)
+                self.filter_postings[field].setdefault(value, set()).add(doc_id)
+                values[field] = value
+            return True
+
+    def remove(self, doc_id):
+        """Remove a document from every posting"""
+        doc_id = str(doc_id)
+        with self.lock:
+            document = self.documents.pop(doc_id, None)
+            if document is None:
+                return
+            texts, grams, values = document
+            for gram in grams:
+                self._discard(self.postings, gram, doc_id)
+            for field, value in values.items():
+                self._discard(self.filter_postings[field], value, doc_id)
+
+    def search(self, query, filters=None):
+        """Ids of documents containing query and matching all filters"""
+        query = query.lower().strip()
+        with self.lock:
+            postings = []
+            for field, value in (filters or {}).items():
+                if value:
+                    postings.append(self.filter_postings[field].get(value, set()))
+
+            if len(query) >= self.n:
+                postings.extend(self.postings.get(gram, set()) for gram in self.grams(query))
+
+            if postings:
+                postings.sort(key=len)
+                candidates = set(postings[0])
+                for posting in postings[1:]:
+                    candidates &= posting
+                    if not candidates:
+                        break
+            else:
+                candidates = set(self.documents)
+
+            # Grams can match out of order, so confirm the real substring
+            return [
+                doc_id for doc_id in candidates
+                if any(query in text for text in self.documents[doc_id][0])
+            ]
+
+    @staticmethod
+    def _discard(postings, key, doc_id):
+        posting = postings.get(key)
+        if posting is None:
+            return
+        posting.discard(doc_id)
+        if not posting:
+            del postings[key]
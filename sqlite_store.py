@@ -0,0 +1,295 @@
+import os
+import re
+import json
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from mock_store import matches
+
+# Attribute names become column names, so only allow plain identifiers
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_connections = threading.local()
+
+def _check_identifier(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQLite identifier: {name}")
+    return name
+
+def get_connection(path):
+    """Get this thread's connection to a WAL-mode SQLite database"""
+    cache = getattr(_connections, 'by_path', None)
+    if cache is None or getattr(_connections, 'pid', None) != os.getpid():
+        # Connections must never cross a gunicorn fork
+        cache = _connections.by_path = {}
+        _connections.pid = os.getpid()
+
+    connection = cache.get(path)
+    if connection is None:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None, cached_statements=256)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('PRAGMA busy_timeout=30000')
+        connection.execute('PRAGMA temp_store=MEMORY')
+        cache[path] = connection
+    return connection
+
+@contextmanager
+def transaction(path):
+    """Group writes to one database file into a single write transaction
+
+    The outermost block takes the write lock up front with BEGIN
+    IMMEDIATE, so reads inside it see data no other process can change
+    until it commits. Nested blocks become savepoints. Raising out of a
+    block rolls back its writes.
+    """
+    connection = get_connection(path)
+    if connection.in_transaction:
+        connection.execute('SAVEPOINT nested')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK TO nested')
+            connection.execute('RELEASE nested')
+            raise
+        connection.execute('RELEASE nested')
+        return
+
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+class SQLiteCollection:
+    """SQLite-backed record store with the same interface as MockCollection
+
+    Each collection is one table holding the record as JSON plus a column
+    per indexed attribute. Composite (attribute, created_at, id) indexes
+    serve filtered newest-first reads, and WAL mode lets every gunicorn
+    worker read concurrently while one writes. Sparse attributes get a
+    partial index on their JSON value covering only the rows that set it.
+    """
+
+    def __init__(self, path, name, indexes=(), sparse=()):
+        self.path = path
+        self.name = _check_identifier(name)
+        self.index_columns = [_check_identifier(attribute) for attribute in indexes]
+        self.sparse_attributes = [_check_identifier(attribute) for attribute in sparse]
+        self._create_schema()
+
+        # Statements are built once so sqlite3 reuses its prepared copies
+        columns = ['id', 'created_at', 'data'] + self.index_columns
+        self.insert_sql = (
+            f"INSERT OR REPLACE INTO {self.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        self.insert_new_sql = self.insert_sql.replace('INSERT OR REPLACE', 'INSERT OR IGNORE', 1)
+        self.update_sql = (
+            f"UPDATE {self.name} SET data = ?"
+            + ''.join(f", {column} = ?" for column in self.index_columns)
+            + " WHERE id = ?"
+        )
+        self.get_sql = f"SELECT data FROM {self.name} WHERE id = ?"
+        self.delete_sql = f"DELETE FROM {self.name} WHERE id = ?"
+        self.len_sql = f"SELECT COUNT(*) FROM {self.name}"
+
+    def _create_schema(self):
+        connection = get_connection(self.path)
+        column_defs = ''.join(f", {column} TEXT" for column in self.index_columns)
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.name} ("
+            f"id TEXT PRIMARY KEY, created_at TEXT NOT NULL, data TEXT NOT NULL{column_defs})"
+        )
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.name}_created_at_idx ON {self.name} (created_at, id)"
+        )
+        for column in self.index_columns:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.name}_{column}_idx "
+                f"ON {self.name} ({column}, created_at, id)"
+            )
+        for attribute in self.sparse_attributes:
+            value = f"json_extract(data, '$.{attribute}')"
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.name}_{attribute}_sparse_idx "
+                f"ON {self.name} ({value}) WHERE {value} IS NOT NULL"
+            )
+        logging.info(f"SQLite collection {self.name} ready at {self.path}")
+
+    @property
+    def connection(self):
+        return get_connection(self.path)
+
+    def __len__(self):
+        return self.connection.execute(self.len_sql).fetchone()[0]
+
+    def __contains__(self, record_id):
+        return self.get(record_id) is not None
+
+    def next_id(self):
+        """New record id, unique across worker processes"""
+        return str(uuid.uuid4())
+
+    def _row_values(self, record):
+        return [json.dumps(record, default=str)] + [
+            None if record.get(column) is None else str(record.get(column))
+            for column in self.index_columns
+        ]
+
+    def insert(self, record):
+        """Add or replace a record"""
+        record['id'] = str(record['id'])
+        data_and_columns = self._row_values(record)
+        self.connection.execute(
+            self.insert_sql,
+            [record['id'], record.get('created_at', '')] + data_and_columns
+        )
+        return record
+
+    def insert_many(self, records):
+        """Add or replace a batch of records in one transaction"""
+        rows = []
+        for record in records:
+            record['id'] = str(record['id'])
+            rows.append([record['id'], record.get('created_at', '')] + self._row_values(record))
+        with transaction(self.path) as connection:
+            connection.executemany(self.insert_sql, rows)
+        return len(rows)
+
+    def insert_new(self, record):
+        """Add a record unless its id is already taken; None if it was"""
+        record['id'] = str(record['id'])
+        cursor = self.connection.execute(
+            self.insert_new_sql,
+            [record['id'], record.get('created_at', '')] + self._row_values(record)
+        )
+        return record if cursor.rowcount else None
+
+    def insert_many_new(self, records):
+        """Add the records whose ids are not yet taken, in one transaction; returns those added"""
+        added = []
+        with transaction(self.path) as connection:
+            for record in records:
+                record['id'] = str(record['id'])
+                cursor = connection.execute(
+                    self.insert_new_sql,
+                    [record['id'], record.get('created_at', '')] + self._row_values(record)
+                )
+                if cursor.rowcount:
+                    added.append(record)
+        return added
+
+    def _modify(self, record_id, change):
+        """Read, change and write back one record in a single write transaction
+
+        The transaction takes the database write lock before the read, so
+        no other worker process can change the record between the check
+        that change() makes and the write. change() edits the record in
+        place and returns False to leave it untouched, or 'delete'.
+        """
+        with transaction(self.path) as connection:
+            row = connection.execute(self.get_sql, (str(record_id),)).fetchone()
+            record = json.loads(row[0]) if row else None
+            outcome = change(record) if record is not None else False
+            if outcome == 'delete':
+                connection.execute(self.delete_sql, (str(record_id),))
+            elif outcome:
+                connection.execute(self.update_sql, self._row_values(record) + [str(record_id)])
+            else:
+                return None
+            return record
+
+    def delete(self, record_id, expected=None):
+        """Remove a record, only if it matches expected; returns the removed record"""
+        return self._modify(record_id, lambda record: matches(record, expected) and 'delete')
+
+    def update(self, record_id, changes, expected=None):
+        """Apply changes to a record atomically, only if it matches expected"""
+        def change(record):
+            if not matches(record, expected):
+                return False
+            record.update(changes)
+            return True
+        return self._modify(record_id, change)
+
+    def increment(self, record_id, attribute, delta, minimum=None, changes=None):
+        """Atomically add delta to a numeric attribute
+
+        Returns the updated record, or None if it is missing or the new
+        value would fall below minimum.
+        """
+        def change(record):
+            value = int(record.get(attribute) or 0) + delta
+            if minimum is not None and value < minimum:
+                return False
+            record[attribute] = value
+            record.update(changes or {})
+            return True
+        return self._modify(record_id, change)
+
+    def get(self, record_id, default=None):
+        """Get a record by id"""
+        row = self.connection.execute(self.get_sql, (str(record_id),)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def values(self):
+        """All records, in no particular order"""
+        return [json.loads(row[0]) for row in self.connection.execute(f"SELECT data FROM {self.name}")]
+
+    def _where(self, filters):
+        clauses = []
+        params = []
+        for attribute, value in filters.items():
+            if attribute in self.index_columns:
+                clauses.append(f"{attribute} = ?")
+                params.append(str(value))
+            else:
+                clauses.append(f"json_extract(data, '$.{_check_identifier(attribute)}') = ?")
+                params.append(value)
+        return clauses, params
+
+    def count(self, attribute, value):
+        """Number of records whose attribute equals value"""
+        return self.count_matching({attribute: value})
+
+    def count_matching(self, filters):
+        """Number of records matching all filters"""
+        clauses, params = self._where(filters)
+        sql = f"SELECT COUNT(*) FROM {self.name}"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        return self.connection.execute(sql, params).fetchone()[0]
+
+    def find_one(self, attribute, value):
+        """Newest record whose attribute equals value"""
+        matches = self.find({attribute: value}, limit=1)
+        return matches[0] if matches else None
+
+    def find(self, filters=None, limit=None, before=None):
+        """Records matching all filters, newest first, resuming before a key"""
+        clauses, params = self._where(filters or {})
+        if before:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(before)
+        sql = f"SELECT data FROM {self.name}"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        sql += " ORDER BY created_at DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row[0]) for row in self.connection.execute(sql, params)]
+
+    def find_below(self, attribute, upper):
+        """Records whose sparse attribute is set and below upper, lowest first"""
+        value = f"json_extract(data, '$.{_check_identifier(attribute)}')"
+        sql = (
+            f"SELECT data FROM {self.name} "
+            f"WHERE {value} IS NOT NULL AND {value} < ? ORDER BY {value}"
+        )
+        return [json.loads(row[0]) for row in self.connection.execute(sql, (upper,))]
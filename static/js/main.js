@@ -170,9 +170,59 @@ function initializeBloodGroupValidation() {
             var selectedGroup = field.value;
             if (selectedGroup) {
                 showBloodGroupCompatibility(selectedGroup);
+                loadCompatibleStock(selectedGroup);
             }
         });
     });
+    
+    var unitsField = document.querySelector('input[name="units"]');
+    if (unitsField) {
+        unitsField.addEventListener('change', function() {
+            var groupField = document.querySelector('select[name="blood_group"]');
+            if (groupField && groupField.value) {
+                loadCompatibleStock(groupField.value);
+            }
+        });
+    }
+}
+
+/**
+ * Show hospitals holding enough stock compatible with the selected group
+ */
+function loadCompatibleStock(bloodGroup) {
+    var panel = document.getElementById('compatible-stock');
+    if (!panel) {
+        return;
+    }
+    
+    var unitsField = document.querySelector('input[name="units"]');
+    var units = unitsField && unitsField.value ? unitsField.value : 1;
+    var url = panel.dataset.url + '?blood_group=' + encodeURIComponent(bloodGroup) + '&units=' + encodeURIComponent(units);
+    
+    fetch(url)
+        .then(function(response) { return response.json(); })
+        .then(function(data) {
+            var list = document.getElementById('compatible-stock-list');
+            list.innerHTML = '';
+            
+            if (!data.hospitals || data.hospitals.length === 0) {
+                var empty = document.createElement('li');
+                empty.textContent = 'No hospital currently holds ' + units + ' compatible units';
+                list.appendChild(empty);
+            }
+            (data.hospitals || []).forEach(function(match) {
+                var groups = Object.keys(match.by_blood_group).map(function(group) {
+                    return group + ': ' + match.by_blood_group[group];
+                }).join(', ');
+                var item = document.createElement('li');
+                item.textContent = match.hospital + ' - ' + match.compatible_units + ' units (' + groups + ')';
+                list.appendChild(item);
+            });
+            panel.classList.remove('d-none');
+        })
+        .catch(function() {
+            panel.classList.add('d-none');
+        });
 }
 
 /**
@@ -0,0 +1,29 @@
+import os
+
+# Tests run against the local mock store, never a real AWS account
+os.environ['AWS_ACCESS_KEY_ID'] = ''
+os.environ['AWS_SECRET_ACCESS_KEY'] = ''
+os.environ.setdefault('LOCAL_STORAGE_BACKEND', 'memory')
+
+import pytest
+
+import models
+from mock_store import MockCollection
+
+
+@pytest.fixture
+def fresh_store(monkeypatch):
+    """Empty in-memory collections and process caches for one test"""
+    monkeypatch.setitem(models.mock_data, 'users', MockCollection(['email']))
+    monkeypatch.setitem(models.mock_data, 'blood_requests', MockCollection(['user_id', 'status', 'blood_group'], ['inventory_pending_at']))
+    monkeypatch.setitem(models.mock_data, 'donations', MockCollection(['user_id', 'status', 'blood_group'], ['inventory_pending_at']))
+    monkeypatch.setitem(models.mock_data, 'inventory_lots', MockCollection(['hospital', 'blood_group']))
+    monkeypatch.setitem(models.mock_data, 'inventory_snapshots', MockCollection())
+    monkeypatch.setitem(models.mock_data, 'inventory', MockCollection())
+    models.initialize_inventory()
+    monkeypatch.setitem(models.lot_index_state, 'built_at', None)
+    monkeypatch.setitem(models.search_index_state, 'built_at', None)
+    monkeypatch.setitem(models.search_index_state, 'index', None)
+    models.clear_dashboard_payloads()
+    yield models.mock_data
+    models.inventory_events.flush()
@@ -0,0 +1,35 @@
+class StubTable:
+    """Records DynamoDB Table calls and answers them from canned responses"""
+
+    def __init__(self, name='stub', responses=None):
+        self.name = name
+        self.responses = responses or {}
+        self.calls = []
+
+    def __getattr__(self, operation):
+        def call(**kwargs):
+            self.calls.append((operation, kwargs))
+            response = self.responses.get(operation, {})
+            if isinstance(response, Exception):
+                raise response
+            return response(**kwargs) if callable(response) else response
+        return call
+
+
+class StubResource:
+    """DynamoDB resource whose batch_get_item serves items from a dict by id"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.batch_calls = []
+
+    def batch_get_item(self, RequestItems):
+        self.batch_calls.append(RequestItems)
+        responses = {}
+        for table_name, request in RequestItems.items():
+            items = self.tables.get(table_name, {})
+            responses[table_name] = [
+                dict(items[key['id']]) for key in request['Keys'] if key['id'] in items
+            ]
+        return {'Responses': responses}
+
@@ -0,0 +1,208 @@
+from botocore.exceptions import ReadTimeoutError
+
+import models
+from sqlite_store import SQLiteCollection
+from stubs import StubTable
+
+
+def create_user(name='Asha'):
+    return models.create_user({'name': name, 'email': f'{name.lower()}@example.com', 'role': 'user'})
+
+
+def create_request(user_id, hospital='City General Hospital', blood_group='A+', units=2):
+    return models.create_blood_request({
+        'user_id': user_id, 'hospital': hospital, 'blood_group': blood_group,
+        'units': units, 'mobile': '5550100', 'status': 'pending'
+    })
+
+
+def units_available(hospital, blood_group):
+    for item in models.get_blood_inventory():
+        if item['hospital'] == hospital and item['blood_group'] == blood_group:
+            return item['units_available']
+
+
+def test_fulfill_request_withdraws_stock(fresh_store):
+    models.receive_units('City General Hospital', 'A+', 5)
+    request_id = create_request(create_user())
+
+    assert models.fulfill_blood_request(request_id)
+    models.inventory_events.flush()
+
+    assert fresh_store['blood_requests'].get(request_id)['status'] == 'fulfilled'
+    assert units_available('City General Hospital', 'A+') == 3
+    # A second fulfil is refused and moves no more stock
+    assert not models.fulfill_blood_request(request_id)
+    models.inventory_events.flush()
+    assert units_available('City General Hospital', 'A+') == 3
+
+
+def test_dashboard_recent_requests_are_the_first_listing_page(fresh_store, monkeypatch):
+    user_id = create_user()
+    request_ids = [create_request(user_id) for _ in range(3)]
+    monkeypatch.setattr(models, 'get_all_blood_requests', lambda *args, **kwargs: 1 / 0)
+
+    recent = models.get_admin_dashboard(recent_limit=2, recent_fields=['user_name', 'hospital'])['recent_requests']
+
+    assert [request['id'] for request in recent] == request_ids[:0:-1]
+    assert recent[0]['user_name'] == 'Asha'
+
+
+def test_counter_timeout_after_a_stored_request_does_not_store_it_again(fresh_store, monkeypatch):
+    tables = {
+        models.REQUESTS_TABLE: StubTable(models.REQUESTS_TABLE),
+        models.STATS_TABLE: StubTable(models.STATS_TABLE, {'update_item': ReadTimeoutError(endpoint_url='stub')})
+    }
+    monkeypatch.setattr(models, 'get_dynamodb_resource', lambda: object())
+    monkeypatch.setattr(models, 'get_table', tables.get)
+    monkeypatch.setattr(models, 'index_new_request', lambda request, in_mock: None)
+
+    request_id = create_request('1')
+
+    assert [operation for operation, _ in tables[models.REQUESTS_TABLE].calls] == ['put_item']
+    assert tables[models.REQUESTS_TABLE].calls[0][1]['Item']['id'] == request_id
+    assert len(fresh_store['blood_requests']) == 0
+
+
+def test_withdrawal_reads_lots_this_process_has_not_indexed(fresh_store):
+    models.receive_units('City General Hospital', 'A+', 2, expiry_date='2099-06-01')
+    # Another worker received a lot and counted it in
+    fresh_store['inventory_lots'].insert({
+        'id': 'elsewhere', 'hospital': 'City General Hospital', 'blood_group': 'A+',
+        'units': 3, 'expiry_date': '2099-01-01', 'created_at': '2099-01-01T00:00:00'
+    })
+    models.adjust_inventory('City General Hospital', 'A+', 3)
+
+    units_left, taken = models.withdraw_units('City General Hospital', 'A+', 4)
+
+    assert units_left == 1
+    assert [line['units'] for line in taken] == [2, 2]
+    assert taken[1]['lot_id'] == 'elsewhere'
+
+
+def test_get_requests_by_ids_without_user_names(fresh_store):
+    request_id = create_request(create_user())
+
+    requests = models.get_requests_by_ids([request_id], fields=['hospital', 'blood_group', 'units'])
+
+    assert requests == [{
+        'id': request_id, 'created_at': requests[0]['created_at'],
+        'hospital': 'City General Hospital', 'blood_group': 'A+', 'units': 2
+    }]
+
+
+def test_sqlite_inventory_is_shared_and_survives_restarts(fresh_store, monkeypatch, tmp_path):
+    path = str(tmp_path / 'blood_bank.db')
+    monkeypatch.setitem(fresh_store, 'inventory', SQLiteCollection(path, 'inventory', []))
+    models.initialize_inventory()
+    assert models.adjust_inventory('Regional Blood Bank', 'O-', 4) == 4
+
+    # Another worker, or this one after a restart, sees the same counts
+    monkeypatch.setitem(fresh_store, 'inventory', SQLiteCollection(path, 'inventory', []))
+    models.initialize_inventory()
+    assert units_available('Regional Blood Bank', 'O-') == 4
+    assert models.adjust_inventory('Regional Blood Bank', 'O-', -5) is None
+    assert models.adjust_inventory('Regional Blood Bank', 'O-', -4) == 0
+
+
+def create_donation(user_id, hospital='City General Hospital', blood_group='A+', units=3):
+    return models.create_donation_schedule({
+        'user_id': user_id, 'hospital': hospital, 'blood_group': blood_group,
+        'units': units, 'donation_date': '2024-01-01', 'status': 'scheduled'
+    })
+
+
+def test_complete_donation_adds_a_lot_and_marks_the_donation_applied(fresh_store):
+    donation_id = create_donation(create_user())
+
+    assert models.complete_donation(donation_id)
+    models.inventory_events.flush()
+
+    donation = fresh_store['donations'].get(donation_id)
+    assert donation['inventory_applied_at'] and not donation.get('inventory_pending_at')
+    assert units_available('City General Hospital', 'A+') == 3
+    assert [lot['units'] for lot in fresh_store['inventory_lots'].find()] == [3]
+
+
+def test_reapplying_an_event_moves_no_stock(fresh_store):
+    donation_id = create_donation(create_user())
+    models.complete_donation(donation_id)
+    models.inventory_events.flush()
+
+    event = {'type': 'donation_completed', 'record_id': donation_id,
+             'hospital': 'City General Hospital', 'blood_group': 'A+', 'units': 3}
+    assert not models.apply_inventory_event(event)
+    assert units_available('City General Hospital', 'A+') == 3
+
+
+def test_sweep_reapplies_a_lost_event(fresh_store, monkeypatch):
+    donation_id = create_donation(create_user())
+    # The process died after the status change, before the event was applied
+    with monkeypatch.context() as patch:
+        patch.setattr(models, 'emit_inventory_event', lambda event_type, record: None)
+        models.complete_donation(donation_id)
+    assert units_available('City General Hospital', 'A+') == 0
+
+    assert models.sweep_pending_inventory_events(retry_after=3600) == 0
+    assert models.sweep_pending_inventory_events(retry_after=0) == 1
+    models.inventory_events.flush()
+
+    assert units_available('City General Hospital', 'A+') == 3
+    assert models.sweep_pending_inventory_events(retry_after=0) == 0
+
+
+def test_event_for_an_untracked_hospital_is_marked_without_stock(fresh_store):
+    donation_id = create_donation(create_user(), hospital='Somewhere Else')
+
+    models.complete_donation(donation_id)
+    models.inventory_events.flush()
+
+    assert fresh_store['donations'].get(donation_id)['inventory_applied_at']
+    assert fresh_store['inventory_lots'].find() == []
+
+
+def test_sqlite_event_applies_in_one_transaction(fresh_store, monkeypatch, tmp_path):
+    path = str(tmp_path / 'blood_bank.db')
+    monkeypatch.setattr(models, 'LOCAL_STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setattr(models, 'SQLITE_DB_PATH', path)
+    monkeypatch.setitem(fresh_store, 'donations', SQLiteCollection(path, 'donations', ['user_id', 'status', 'blood_group'], ['inventory_pending_at']))
+    monkeypatch.setitem(fresh_store, 'inventory_lots', SQLiteCollection(path, 'inventory_lots', ['hospital', 'blood_group']))
+    monkeypatch.setitem(fresh_store, 'inventory', SQLiteCollection(path, 'inventory', []))
+    models.initialize_inventory()
+    donation_id = create_donation(create_user())
+
+    # A failure part way through leaves the donation pending and no stock moved
+    with monkeypatch.context() as patch:
+        patch.setattr(models, 'new_lot', lambda *args: 1 / 0)
+        models.complete_donation(donation_id)
+        models.inventory_events.flush()
+    assert fresh_store['donations'].get(donation_id)['inventory_pending_at']
+    assert units_available('City General Hospital', 'A+') == 0
+
+    assert models.sweep_pending_inventory_events(retry_after=0) == 1
+    models.inventory_events.flush()
+    assert units_available('City General Hospital', 'A+') == 3
+    assert fresh_store['donations'].get(donation_id)['inventory_applied_at']
+
+
+def test_apply_allocation_fulfils_what_stock_covers_and_withdraws_it(fresh_store):
+    models.receive_units('City General Hospital', 'O-', 3, expiry_date='2099-01-01')
+    models.receive_units('District Hospital', 'A+', 2, expiry_date='2099-01-01')
+    user_id = create_user()
+    covered = create_request(user_id, hospital='City General Hospital', blood_group='A+', units=4)
+    uncovered = create_request(user_id, hospital='District Hospital', blood_group='O-', units=5)
+
+    preview = models.plan_allocation()
+    assert [a['request']['id'] for a in preview['allocations']] == [covered]
+    assert units_available('City General Hospital', 'O-') == 3
+
+    plan = models.apply_allocation()
+
+    assert [a['request']['id'] for a in plan['applied']] == [covered]
+    assert plan['failed'] == []
+    assert fresh_store['blood_requests'].get(covered)['status'] == 'fulfilled'
+    assert fresh_store['blood_requests'].get(uncovered)['status'] == 'pending'
+    # The named hospital's compatible O- went first, the rest came from elsewhere
+    assert units_available('City General Hospital', 'O-') == 0
+    assert units_available('District Hospital', 'A+') == 1
+    assert sum(lot['units'] for lot in fresh_store['inventory_lots'].find()) == 1
@@ -0,0 +1,29 @@
+import pytest
+
+import models
+from app import app
+
+
+@pytest.fixture
+def admin_client(fresh_store, monkeypatch):
+    # The scheduled jobs are exercised directly, not from a request hook
+    monkeypatch.setattr(models.live_data, 'start', lambda: None)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'id': 'admin', 'name': 'Admin', 'role': 'admin'}
+    return client
+
+
+def test_viewing_inventory_does_not_sweep_expired_lots(admin_client, fresh_store):
+    models.receive_units('City General Hospital', 'A+', 4, expiry_date='2000-01-01')
+
+    assert admin_client.get('/admin/inventory').status_code == 200
+    assert [lot['units'] for lot in fresh_store['inventory_lots'].find()] == [4]
+
+    response = admin_client.post('/admin/inventory/sweep-expired')
+    assert response.status_code == 302
+    assert fresh_store['inventory_lots'].find() == []
+
+
+def test_expired_lots_are_swept_by_a_scheduled_job():
+    assert models.live_data.jobs['expired_lots']['job'] is models.sweep_expired_lots
@@ -0,0 +1,55 @@
+from allocation import allocate, donor_preference
+from compatibility import StockMatrix
+
+HOSPITALS = ['North', 'South']
+BLOOD_GROUPS = ['A+', 'A-', 'O+', 'O-']
+
+
+def matrix(stock):
+    inventory = [
+        {'hospital': hospital, 'blood_group': bg, 'units_available': units}
+        for (hospital, bg), units in stock.items()
+    ]
+    return StockMatrix(inventory, HOSPITALS, BLOOD_GROUPS)
+
+
+def request(request_id, blood_group, units, hospital='North', created_at='2024-01-01', **extra):
+    return dict(id=request_id, blood_group=blood_group, units=units, hospital=hospital, created_at=created_at, **extra)
+
+
+def test_same_group_then_least_versatile_donor_is_preferred():
+    preference = donor_preference(BLOOD_GROUPS)
+    assert preference['A+'] == ['A+', 'A-', 'O+', 'O-']
+    assert preference['O-'] == ['O-']
+
+
+def test_requests_fill_from_their_hospital_and_keep_universal_stock():
+    plan = allocate([request('r1', 'A+', 3)], matrix({('North', 'A+'): 1, ('North', 'O-'): 5, ('North', 'A-'): 2}))
+
+    [allocation] = plan['allocations']
+    assert [(line['blood_group'], line['units']) for line in allocation['lines']] == [('A+', 1), ('A-', 2)]
+    assert allocation['from_requested_hospital']
+    assert plan['remaining_stock']['North']['O-'] == 5
+    assert plan['allocated_units'] == 3
+
+
+def test_urgent_requests_go_first_and_others_wait_whole():
+    stock = matrix({('South', 'O-'): 3})
+    requests = [
+        request('routine', 'O-', 2, created_at='2024-01-01'),
+        request('urgent', 'O-', 2, created_at='2024-01-02', urgency='emergency')
+    ]
+
+    plan = allocate(requests, stock)
+
+    assert [a['request']['id'] for a in plan['allocations']] == ['urgent']
+    assert not plan['allocations'][0]['from_requested_hospital']
+    assert [(u['request']['id'], u['reason']) for u in plan['unallocated']] == [('routine', 'Not enough compatible stock')]
+    assert plan['remaining_stock']['South']['O-'] == 1
+
+
+def test_invalid_requests_are_reported_not_allocated():
+    plan = allocate([request('r1', 'Z+', 1), request('r2', 'A+', 0)], matrix({('North', 'A+'): 4}))
+
+    assert plan['allocations'] == []
+    assert {u['reason'] for u in plan['unallocated']} == {'Invalid blood group or units'}
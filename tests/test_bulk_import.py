@@ -0,0 +1,66 @@
+import io
+
+import models
+from bulk_import import import_rows
+
+
+REQUEST_ROWS = (
+    'id,user_id,hospital,blood_group,units,mobile,status\n'
+    'r1,u1,City General Hospital,A+,2,5550100,pending\n'
+    'r2,u1,City General Hospital,O-,1,5550100,fulfilled\n'
+)
+
+
+def test_reimporting_existing_ids_rejects_them_and_counts_only_new_rows(fresh_store):
+    assert import_rows('requests', io.StringIO(REQUEST_ROWS))['imported'] == 2
+    fresh_store['blood_requests'].update('r1', {'units': 9})
+
+    rows = REQUEST_ROWS + 'r3,u1,City General Hospital,B+,1,5550100,pending\n'
+    report = import_rows('requests', io.StringIO(rows))
+
+    assert report['imported'] == 1
+    assert [reject['reason'] for reject in report['rejects']] == ['id already exists: r1', 'id already exists: r2']
+    assert fresh_store['blood_requests'].get('r1')['units'] == 9
+    assert len(fresh_store['blood_requests']) == 3
+
+
+def test_rows_repeating_an_id_or_using_an_unknown_status_are_rejected(fresh_store):
+    rows = REQUEST_ROWS + 'r1,u1,City General Hospital,A+,2,5550100,pending\n' \
+                          'r4,u1,City General Hospital,A+,2,5550100,cancelled\n'
+    report = import_rows('requests', io.StringIO(rows))
+
+    assert report['imported'] == 2
+    assert [reject['reason'] for reject in report['rejects']] == ['Duplicate id in file: r1', 'Invalid status: cancelled']
+
+
+def test_users_with_a_registered_email_are_rejected(fresh_store):
+    models.create_user({'name': 'Asha', 'email': 'asha@example.com', 'role': 'user'})
+    rows = (
+        'name,email,role,blood_group,mobile,password\n'
+        'Asha,asha@example.com,user,A+,5550100,secret\n'
+        'Ravi,ravi@example.com,user,B+,5550101,secret\n'
+    )
+
+    report = import_rows('users', io.StringIO(rows))
+
+    assert report['imported'] == 1
+    assert report['rejects'] == [{'line': 2, 'reason': 'Email already registered: asha@example.com'}]
+    assert models.mock_data['users'].find_one('email', 'ravi@example.com')
+
+
+def test_registered_emails_are_checked_once_per_batch(fresh_store, monkeypatch):
+    models.create_user({'name': 'Asha', 'email': 'asha@example.com', 'role': 'user'})
+    checked = []
+    find_registered_emails = models.find_registered_emails
+    monkeypatch.setattr(models, 'find_registered_emails', lambda emails: checked.append(emails) or find_registered_emails(emails))
+    monkeypatch.setattr(models, 'get_user_by_email', None)
+    rows = 'name,email,role,blood_group,mobile,password\n' + ''.join(
+        f'User {i},{email},user,A+,5550100,secret\n'
+        for i, email in enumerate(['asha@example.com', 'ravi@example.com', 'mina@example.com'])
+    )
+
+    report = import_rows('users', io.StringIO(rows))
+
+    assert checked == [['asha@example.com', 'ravi@example.com', 'mina@example.com']]
+    assert report['imported'] == 2
+    assert report['rejects'] == [{'line': 2, 'reason': 'Email already registered: asha@example.com'}]
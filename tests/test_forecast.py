@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import models
+from forecast import encode_grid, decode_grid, resample, holt_forecast
+
+
+def test_resample_spaces_late_and_missed_snapshots_evenly():
+    # Taken at 0s, 100s and then 250s instead of 200s
+    times = [0, 100, 250]
+    history = [[0, 40], [10, 30], [40, 0]]
+
+    assert resample(times, history, 100) == [[5.0, 35.0], [20.0, 20.0], [40.0, 0.0]]
+    assert resample(times, history, 50)[-3:] == [[20.0, 20.0], [30.0, 10.0], [40.0, 0.0]]
+    assert resample([7], [[3]], 100) == [[3]]
+
+
+def test_irregular_history_forecasts_the_same_trend_as_a_regular_one():
+    regular = resample([0, 100, 200, 300], [[0], [10], [20], [30]], 100)
+    irregular = resample([0, 140, 300], [[0], [14], [30]], 100)
+
+    assert holt_forecast(irregular, 2) == holt_forecast(regular, 2) == [50.0]
+
+
+def test_holt_forecast_follows_each_series_trend_and_never_goes_negative():
+    history = [[10, 4, 7], [12, 3, 7], [14, 2, 7], [16, 1, 7]]
+
+    projected = holt_forecast(history, 2)
+
+    assert projected[0] > 16
+    assert projected[1] == 0.0
+    assert projected[2] == 7.0
+    assert holt_forecast([[5, 6]], 10) == [5.0, 6.0]
+    assert holt_forecast([], 3) == []
+
+
+def test_grids_pack_and_unpack():
+    grid = [0, 1, 250, 65536, 7]
+    assert decode_grid(encode_grid(grid)) == grid
+
+
+def test_snapshots_are_stored_per_hour_and_day_items_are_still_read(fresh_store):
+    yesterday = datetime.now() - timedelta(days=1)
+    grid = encode_grid([3] * (len(models.HOSPITALS) * len(models.BLOOD_GROUPS)))
+    day_id = f"inventory_snapshots#{yesterday.date().isoformat()}"
+    fresh_store['inventory_snapshots'].insert({
+        'id': day_id, 'created_at': yesterday.date().isoformat(),
+        'taken_at': [yesterday.replace(hour=12).isoformat()], 'grids': [grid]
+    })
+
+    taken_at = models.take_inventory_snapshot()
+
+    assert fresh_store['inventory_snapshots'].get(f"inventory_snapshots#{taken_at:%Y-%m-%dT%H}")
+    assert day_id in models.snapshot_item_ids(1)
+    assert [taken for taken, _ in models.load_snapshot_history(1)] == [yesterday.replace(hour=12).isoformat(), taken_at.isoformat()]
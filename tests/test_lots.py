@@ -0,0 +1,68 @@
+from lots import LotIndex
+
+
+def lot(lot_id, expiry_date, units=5, hospital='City General Hospital', blood_group='A+'):
+    return {'id': lot_id, 'expiry_date': expiry_date, 'units': units, 'hospital': hospital, 'blood_group': blood_group}
+
+
+def build_index():
+    index = LotIndex()
+    index.add(lot('late', '2024-03-01'))
+    index.add(lot('soon', '2024-01-10', units=2))
+    index.add(lot('mid', '2024-02-01', units=4))
+    index.add(lot('other', '2024-01-01', blood_group='O-'))
+    return index
+
+
+def test_soonest_skips_removed_and_emptied_lots():
+    index = build_index()
+    assert index.soonest('City General Hospital', 'A+')['id'] == 'soon'
+
+    index.take('soon', 2)
+    assert index.soonest('City General Hospital', 'A+')['id'] == 'mid'
+    index.remove('mid')
+    assert index.soonest('City General Hospital', 'A+')['id'] == 'late'
+    assert index.soonest('District Hospital', 'A+') is None
+    assert len(index) == 2
+
+
+def test_plan_take_spans_lots_soonest_first_without_changing_them():
+    index = build_index()
+
+    plan = index.plan_take('City General Hospital', 'A+', 7)
+
+    assert [(planned['id'], units) for planned, units in plan] == [('soon', 2), ('mid', 4), ('late', 1)]
+    assert index.lots['soon']['units'] == 2
+    assert sum(units for _, units in index.plan_take('City General Hospital', 'A+', 50)) == 11
+
+
+def test_readding_a_lot_with_a_new_expiry_does_not_plan_it_twice():
+    index = build_index()
+    index.add(lot('soon', '2024-04-01', units=2))
+
+    plan = index.plan_take('City General Hospital', 'A+', 20)
+    assert [planned['id'] for planned, _ in plan] == ['mid', 'late', 'soon']
+
+
+def test_replace_group_swaps_only_that_groups_lots():
+    index = build_index()
+
+    index.replace_group('City General Hospital', 'A+', [lot('mid', '2024-02-01', units=1), lot('new', '2024-01-05')])
+
+    assert [planned['id'] for planned, _ in index.plan_take('City General Hospital', 'A+', 20)] == ['new', 'mid']
+    assert index.soonest('City General Hospital', 'O-')['id'] == 'other'
+    assert [expired['id'] for expired in index.expired('2024-03-01')] == ['other', 'new', 'mid']
+
+
+def test_expired_and_expiring_between_are_ranges_of_the_expiry_order():
+    index = build_index()
+
+    assert [expired['id'] for expired in index.expired('2024-01-10')] == ['other']
+    assert [expiring['id'] for expiring in index.expiring_between('2024-01-10', '2024-02-01')] == ['soon', 'mid']
+    assert index.expiring_between('2024-05-01', '2024-06-01') == []
+
+
+def test_lots_without_units_are_not_indexed():
+    index = LotIndex()
+    index.add(lot('empty', '2024-01-01', units=0))
+    assert len(index) == 0
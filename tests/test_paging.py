@@ -0,0 +1,125 @@
+import pytest
+
+import dynamodb_utils
+from dynamodb_utils import read_page, read_merged_page, encode_cursor
+from stubs import StubTable
+
+
+def key_bounds(condition):
+    """(partition value, created_at upper bound or None) of a KeyConditionExpression"""
+    expression = condition.get_expression()
+    if expression['operator'] == 'AND':
+        partition, upper = expression['values']
+        return partition.get_expression()['values'][1], upper.get_expression()['values'][1]
+    return expression['values'][1], None
+
+
+class IndexTable(StubTable):
+    """Answers Query on a (status, created_at) index and Scan in insertion order"""
+
+    def __init__(self, items):
+        super().__init__(responses={'query': self.query_index, 'scan': self.scan_items})
+        self.items = items
+
+    def page(self, items, Limit, ExclusiveStartKey=None, FilterExpression=None, **kwargs):
+        start = 0
+        if ExclusiveStartKey:
+            start = next(i for i, item in enumerate(items) if item['id'] == ExclusiveStartKey['id']) + 1
+        read = items[start:start + Limit]
+        response = {'Items': [item for item in read if FilterExpression is None or FilterExpression(item)]}
+        if start + Limit < len(items):
+            response['LastEvaluatedKey'] = {'id': read[-1]['id']}
+        return response
+
+    def query_index(self, KeyConditionExpression, **kwargs):
+        status, upper = key_bounds(KeyConditionExpression)
+        partition = sorted(
+            (item for item in self.items if item['status'] == status and (upper is None or item['created_at'] <= upper)),
+            key=lambda item: item['created_at'], reverse=True
+        )
+        return self.page(partition, **kwargs)
+
+    def scan_items(self, **kwargs):
+        return self.page(self.items, **kwargs)
+
+
+def activity(count):
+    return [
+        {'id': f'r{i}', 'created_at': f'2024-01-{i:02d}', 'status': 'pending' if i % 3 else 'fulfilled'}
+        for i in range(1, count + 1)
+    ]
+
+
+def test_merged_pages_are_newest_first_across_partitions(monkeypatch):
+    table = IndexTable(activity(11))
+    monkeypatch.setattr(dynamodb_utils, 'get_table', lambda name: table)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = read_merged_page('requests', 'status-index', 'status', ['pending', 'fulfilled'], 4, cursor)
+        seen.extend(item['id'] for item in page)
+        if not cursor:
+            break
+
+    assert seen == [f'r{i}' for i in range(11, 0, -1)]
+
+
+def test_merged_page_resumes_past_records_sharing_a_created_at(monkeypatch):
+    items = [{'id': f'r{i}', 'created_at': '2024-01-01', 'status': 'pending'} for i in range(3)]
+    monkeypatch.setattr(dynamodb_utils, 'get_table', lambda name: IndexTable(items))
+
+    cursor = encode_cursor({'created_at': '2024-01-01', 'id': 'r2'})
+    page, cursor = read_merged_page('requests', 'status-index', 'status', ['pending'], 5, cursor)
+
+    assert sorted(item['id'] for item in page) == ['r0', 'r1']
+    assert cursor is None
+
+
+def test_merged_page_rejects_a_scan_cursor(monkeypatch):
+    monkeypatch.setattr(dynamodb_utils, 'get_table', lambda name: IndexTable([]))
+    with pytest.raises(ValueError):
+        read_merged_page('requests', 'status-index', 'status', ['pending'], 5, encode_cursor({'id': 'r1'}))
+
+
+def test_filtered_read_page_reads_in_large_steps_and_resumes_after_the_last_kept_item(monkeypatch):
+    table = IndexTable(activity(300))
+    monkeypatch.setattr(dynamodb_utils, 'get_table', lambda name: table)
+    fulfilled = lambda item: item['status'] == 'fulfilled'
+
+    page, cursor = read_page('requests', 5, FilterExpression=fulfilled)
+    assert [item['id'] for item in page] == ['r3', 'r6', 'r9', 'r12', 'r15']
+    assert [kwargs['Limit'] for _, kwargs in table.calls] == [dynamodb_utils.READ_PAGE_MIN_LIMIT]
+
+    page, cursor = read_page('requests', 5, cursor, FilterExpression=fulfilled)
+    assert [item['id'] for item in page] == ['r18', 'r21', 'r24', 'r27', 'r30']
+
+
+def test_filtered_read_page_returns_a_short_page_after_its_call_budget(monkeypatch):
+    monkeypatch.setattr(dynamodb_utils, 'READ_PAGE_MAX_CALLS', 2)
+    table = IndexTable(activity(500))
+    monkeypatch.setattr(dynamodb_utils, 'get_table', lambda name: table)
+
+    only = lambda item: item['id'] == 'r450'
+
+    page, cursor = read_page('requests', 5, FilterExpression=only)
+    assert page == [] and cursor
+    assert len(table.calls) == 2
+    page, cursor = read_page('requests', 5, cursor, FilterExpression=only)
+    assert page == [] and cursor
+    page, cursor = read_page('requests', 5, cursor, FilterExpression=only)
+    assert [item['id'] for item in page] == ['r450'] and cursor is None
+
+
+def test_cursor_round_trips_and_is_url_safe():
+    key = {'id': 'r/1+2', 'created_at': '2024-01-01T10:00:00'}
+    cursor = encode_cursor(key)
+
+    assert dynamodb_utils.decode_cursor(cursor) == key
+    assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+    assert encode_cursor(None) is None and dynamodb_utils.decode_cursor('') is None
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor!', encode_cursor({'id': 'x'})[:-3], 'WzFd'])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        dynamodb_utils.decode_cursor(cursor)
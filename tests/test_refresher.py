@@ -0,0 +1,43 @@
+import pytest
+from botocore.exceptions import ClientError
+
+import models
+from refresher import BackgroundRefresher
+from stubs import StubTable
+
+
+def throttled():
+    return ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'slow down'}}, 'GetItem')
+
+
+def test_admin_statistics_raise_on_dynamodb_errors_instead_of_serving_mock_counts(monkeypatch):
+    monkeypatch.setattr(models, 'get_dynamodb_resource', lambda: object())
+    monkeypatch.setattr(models, 'get_table', lambda name: StubTable(name, {'get_item': throttled()}))
+
+    with pytest.raises(ClientError):
+        models.get_admin_statistics()
+
+
+def test_inventory_refresh_raises_on_dynamodb_errors(monkeypatch):
+    monkeypatch.setattr(models, 'get_dynamodb_resource', lambda: object())
+    monkeypatch.setattr(models, 'load_inventory_grid', lambda: (_ for _ in ()).throw(throttled()))
+
+    with pytest.raises(ClientError):
+        models.refresh_inventory_cache()
+
+
+def test_a_failed_refresh_keeps_the_last_good_value():
+    results = iter([{'total': 1}, throttled()])
+
+    def loader():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    refresher = BackgroundRefresher('test', interval=3600)
+    refresher.register('stats', loader)
+    assert refresher.get('stats') == {'total': 1}
+
+    refresher._refresh_values()
+    assert refresher.get('stats') == {'total': 1}
@@ -0,0 +1,71 @@
+import models
+from search_index import NGramIndex
+
+
+def build_index():
+    index = NGramIndex(n=3, filter_fields=['status', 'blood_group'])
+    index.add('1', ['Asha Rao', 'City General Hospital'], {'status': 'pending', 'blood_group': 'A+'})
+    index.add('2', ['Ravi Kumar', 'District Hospital'], {'status': 'fulfilled', 'blood_group': 'A+'})
+    index.add('3', ['Meera Shah', 'City General Hospital'], {'status': 'pending', 'blood_group': 'O-'})
+    return index
+
+
+def test_search_matches_substrings_case_insensitively():
+    index = build_index()
+
+    assert sorted(index.search('city general')) == ['1', '3']
+    assert index.search('KUMAR') == ['2']
+    assert index.search('nowhere') == []
+
+
+def test_grams_that_match_out_of_order_are_not_a_hit():
+    index = NGramIndex(n=3)
+    index.add('1', ['abcdbc'])
+
+    assert index.search('bcdbc') == ['1']
+    # Every gram of "cdbcd" is in the text, the substring is not
+    assert index.search('cdbcd') == []
+
+
+def test_filters_narrow_results_and_short_queries_match_on_filters_alone():
+    index = build_index()
+
+    assert index.search('hospital', {'status': 'pending', 'blood_group': 'O-'}) == ['3']
+    assert sorted(index.search('', {'blood_group': 'A+'})) == ['1', '2']
+    assert sorted(index.search('as', {'status': 'pending'})) == ['1']
+    assert sorted(index.search('')) == ['1', '2', '3']
+
+
+def test_update_filters_and_remove_keep_postings_consistent():
+    index = build_index()
+
+    assert index.update_filters('1', {'status': 'fulfilled'})
+    assert sorted(index.search('', {'status': 'fulfilled'})) == ['1', '2']
+    assert not index.update_filters('missing', {'status': 'pending'})
+
+    index.remove('3')
+    assert index.search('meera') == []
+    assert 'O-' not in index.filter_postings['blood_group']
+    assert len(index) == 2
+
+    # Re-adding a document replaces its text
+    index.add('2', ['Ravi K'], {'status': 'fulfilled', 'blood_group': 'A+'})
+    assert index.search('district') == []
+
+
+def test_stale_index_keeps_serving_until_the_refresher_rebuilds_it(fresh_store, monkeypatch):
+    monkeypatch.setattr(models.live_data, 'jobs_enabled', True)
+    monkeypatch.setattr(models.live_data, 'run_soon', lambda name: None)
+    old = models.get_search_index()
+    # Another worker stored a request this process has not indexed
+    fresh_store['blood_requests'].insert({
+        'id': 'r1', 'user_id': 'u1', 'hospital': 'District Hospital', 'status': 'pending',
+        'blood_group': 'A+', 'units': 1, 'created_at': '2024-01-01T00:00:00'
+    })
+
+    models.invalidate_search_index()
+    assert models.get_search_index() is old
+
+    models.refresh_search_index()
+    assert models.get_search_index() is not old
+    assert models.get_search_index().search('district') == ['r1']
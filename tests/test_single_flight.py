@@ -0,0 +1,64 @@
+import time
+import threading
+
+import pytest
+
+from models import single_flight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    @single_flight
+    def load(key):
+        calls.append(key)
+        started.set()
+        release.wait(5)
+        return {'key': key}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(load('a')))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(load('a'))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    # Give the followers time to join the flight before the leader finishes
+    time.sleep(0.2)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == ['a']
+    assert len(results) == 4 and all(result is results[0] for result in results)
+
+
+def test_different_arguments_and_later_calls_run_again():
+    calls = []
+
+    @single_flight
+    def load(key, fields=None):
+        calls.append((key, fields))
+        return key
+
+    load('a', fields=['x'])
+    load('a', fields=['x'])
+    load('b')
+    assert calls == [('a', ['x']), ('a', ['x']), ('b', None)]
+
+
+def test_errors_reach_the_caller_and_do_not_stick():
+    outcomes = iter([RuntimeError('backend down'), 'ok'])
+
+    @single_flight
+    def load():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with pytest.raises(RuntimeError):
+        load()
+    assert load() == 'ok'
@@ -0,0 +1,112 @@
+import multiprocessing
+
+import pytest
+
+from mock_store import MockCollection
+from sqlite_store import SQLiteCollection
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def collection(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteCollection(str(tmp_path / 'store.db'), 'records', ['status'], ['pending_at'])
+    return MockCollection(['status'], ['pending_at'])
+
+
+def record(record_id, created_at, status='pending', **extra):
+    return dict(id=record_id, created_at=created_at, status=status, **extra)
+
+
+def test_find_is_newest_first_and_resumes_before_a_key(collection):
+    collection.insert_many([record(str(i), f'2024-01-0{i}') for i in range(1, 6)])
+
+    first = collection.find(limit=2)
+    assert [r['id'] for r in first] == ['5', '4']
+    rest = collection.find(limit=10, before=(first[-1]['created_at'], first[-1]['id']))
+    assert [r['id'] for r in rest] == ['3', '2', '1']
+
+
+def test_find_filters_on_indexed_and_plain_attributes(collection):
+    collection.insert(record('1', '2024-01-01', hospital='A'))
+    collection.insert(record('2', '2024-01-02', status='fulfilled', hospital='A'))
+    collection.insert(record('3', '2024-01-03', hospital='B'))
+
+    assert [r['id'] for r in collection.find({'status': 'pending'})] == ['3', '1']
+    assert [r['id'] for r in collection.find({'status': 'pending', 'hospital': 'A'})] == ['1']
+    assert collection.count('status', 'pending') == 2
+    assert collection.count_matching({'status': 'fulfilled', 'hospital': 'A'}) == 1
+
+
+def test_find_below_reads_only_records_with_the_sparse_attribute_set(collection):
+    collection.insert(record('1', '2024-01-01', pending_at='2024-01-05'))
+    collection.insert(record('2', '2024-01-02', pending_at='2024-01-03'))
+    collection.insert(record('3', '2024-01-03'))
+    collection.insert(record('4', '2024-01-04', pending_at='2024-01-09'))
+
+    assert [r['id'] for r in collection.find_below('pending_at', '2024-01-06')] == ['2', '1']
+    collection.update('2', {'pending_at': None})
+    collection.update('3', {'pending_at': '2024-01-04'})
+    collection.delete('1')
+    assert [r['id'] for r in collection.find_below('pending_at', '2024-01-06')] == ['3']
+
+
+def test_update_with_expected_values_is_a_check_and_set(collection):
+    collection.insert(record('1', '2024-01-01'))
+
+    assert collection.update('1', {'status': 'fulfilled'}, expected={'status': 'pending'})['status'] == 'fulfilled'
+    assert collection.update('1', {'status': 'fulfilled'}, expected={'status': 'pending'}) is None
+    assert collection.update('1', {'claimed': 'now'}, expected={'claimed': None})['claimed'] == 'now'
+    assert collection.update('1', {'claimed': 'again'}, expected={'claimed': None}) is None
+    assert collection.update('missing', {'status': 'x'}) is None
+    assert collection.count('status', 'fulfilled') == 1
+
+
+def test_increment_respects_the_minimum(collection):
+    collection.insert(record('lot', '2024-01-01', units=3))
+
+    assert collection.increment('lot', 'units', -2, minimum=0)['units'] == 1
+    assert collection.increment('lot', 'units', -2, minimum=0) is None
+    assert collection.increment('lot', 'units', 4, changes={'note': 'restocked'})['units'] == 5
+    assert collection.get('lot')['note'] == 'restocked'
+    assert collection.increment('missing', 'units', 1) is None
+
+
+def test_delete_and_insert_new_are_conditional(collection):
+    collection.insert(record('lot', '2024-01-01', units=1))
+
+    assert collection.delete('lot', expected={'units': 0}) is None
+    assert collection.insert_new(record('lot', '2024-01-02', units=9)) is None
+    assert collection.delete('lot')['units'] == 1
+    assert collection.delete('lot') is None
+    assert collection.insert_new(record('lot', '2024-01-02', units=9))['units'] == 9
+
+
+def test_insert_many_new_skips_taken_ids(collection):
+    collection.insert(record('1', '2024-01-01', units=1))
+
+    added = collection.insert_many_new([record('1', '2024-01-02', units=5), record('2', '2024-01-02')])
+
+    assert [r['id'] for r in added] == ['2']
+    assert collection.get('1')['units'] == 1
+
+
+def claim(path, results):
+    collection = SQLiteCollection(path, 'records', ['status'])
+    claimed = collection.update('1', {'status': 'fulfilled'}, expected={'status': 'pending'})
+    results.put(claimed is not None)
+
+
+def test_sqlite_check_and_set_holds_across_processes(tmp_path):
+    path = str(tmp_path / 'store.db')
+    SQLiteCollection(path, 'records', ['status']).insert(record('1', '2024-01-01'))
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=claim, args=(path, results)) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(results.get() for _ in workers) == [False] * 7 + [True]
+
@@ -0,0 +1,55 @@
+import pytest
+
+import dynamodb_utils
+import models
+from stubs import StubResource, StubTable
+
+
+@pytest.fixture(autouse=True)
+def empty_name_cache():
+    models.user_name_cache.clear()
+    yield
+    models.user_name_cache.clear()
+
+
+def test_attach_user_names_batches_lookups_and_caches_them(monkeypatch):
+    resource = StubResource({models.USERS_TABLE: {'u1': {'id': 'u1', 'name': 'Asha'}}})
+    monkeypatch.setattr(dynamodb_utils, 'get_dynamodb_resource', lambda: resource)
+
+    items = [{'id': 'r1', 'user_id': 'u1'}, {'id': 'r2', 'user_id': 'u1'}, {'id': 'r3', 'user_id': 'u2'}]
+    models.attach_user_names(items)
+
+    assert [item['user_name'] for item in items] == ['Asha', 'Asha', 'Unknown User']
+    assert len(resource.batch_calls) == 1
+    assert resource.batch_calls[0][models.USERS_TABLE]['Keys'] == [{'id': 'u1'}, {'id': 'u2'}]
+
+    # A second listing is answered from the LRU without another BatchGetItem
+    cached = models.attach_user_names([{'id': 'r4', 'user_id': 'u1'}])
+    assert cached[0]['user_name'] == 'Asha'
+    assert len(resource.batch_calls) == 1
+
+
+def test_user_name_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(models, 'USER_NAME_CACHE_SIZE', 2)
+    models.cache_user_name('a', 'A')
+    models.cache_user_name('b', 'B')
+    models.get_cached_user_names(['a'])
+    models.cache_user_name('c', 'C')
+
+    names, missing = models.get_cached_user_names(['a', 'b', 'c'])
+    assert names == {'a': 'A', 'c': 'C'}
+    assert missing == ['b']
+
+
+def test_create_user_in_dynamodb_does_not_fall_back_to_mock(monkeypatch):
+    table = StubTable(models.USERS_TABLE)
+    monkeypatch.setattr(models, 'get_dynamodb_resource', lambda: object())
+    monkeypatch.setattr(models, 'get_table', lambda name: table)
+    users_before = len(models.mock_data['users'])
+
+    user_id = models.create_user({'name': 'Asha', 'email': 'asha@example.com'})
+
+    assert [operation for operation, _ in table.calls] == ['put_item']
+    assert table.calls[0][1]['Item']['id'] == user_id
+    assert len(models.mock_data['users']) == users_before
+    assert models.get_cached_user_names([user_id]) == ({user_id: 'Asha'}, [])
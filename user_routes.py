@@ -1,13 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from models import (
     create_blood_request, create_donation_schedule, 
     get_user_blood_requests, get_user_donations,
-    get_user_statistics
+    get_user_dashboard, find_compatible_stock
 )
 import logging
 
 user_bp = Blueprint('user', __name__)
 
+# Fields rendered by the dashboard's recent activity lists and history tables
+RECENT_ACTIVITY_FIELDS = ['hospital', 'blood_group', 'units', 'status']
+HISTORY_FIELDS = ['hospital', 'blood_group', 'units', 'mobile', 'status']
+
 def login_required(f):
     """Decorator to require login"""
     def decorated_function(*args, **kwargs):
@@ -27,17 +31,13 @@ def dashboard():
     """User dashboard with statistics and recent activity"""
     user_id = session['user']['id']
     
-    # Get user statistics
-    stats = get_user_statistics(user_id)
-    
-    # Get recent requests and donations
-    recent_requests = get_user_blood_requests(user_id, limit=5)
-    recent_donations = get_user_donations(user_id, limit=5)
+    # Statistics and recent requests and donations, fetched in parallel
+    dashboard_data = get_user_dashboard(user_id, recent_limit=5, recent_fields=RECENT_ACTIVITY_FIELDS)
     
     return render_template('user_dashboard.html', 
-                         stats=stats, 
-                         recent_requests=recent_requests,
-                         recent_donations=recent_donations)
+                         stats=dashboard_data['stats'], 
+                         recent_requests=dashboard_data['recent_requests'],
+                         recent_donations=dashboard_data['recent_donations'])
 
 @user_bp.route('/blood-request', methods=['GET', 'POST'])
 @login_required
@@ -81,6 +81,20 @@ def blood_request():
     
     return render_template('blood_request.html')
 
+@user_bp.route('/compatible-stock')
+@login_required
+def compatible_stock():
+    """Hospitals holding enough stock compatible with a blood group"""
+    blood_group = request.args.get('blood_group', '')
+    units = max(1, request.args.get('units', 1, type=int))
+    
+    try:
+        hospitals = find_compatible_stock(blood_group, units)
+    except ValueError:
+        return jsonify({'error': 'Invalid blood group'}), 400
+    
+    return jsonify({'blood_group': blood_group, 'units': units, 'hospitals': hospitals})
+
 @user_bp.route('/donation-schedule', methods=['GET', 'POST'])
 @login_required
 def donation_schedule():
@@ -129,8 +143,8 @@ def history():
     """View complete history of requests and donations"""
     user_id = session['user']['id']
     
-    all_requests = get_user_blood_requests(user_id)
-    all_donations = get_user_donations(user_id)
+    all_requests = get_user_blood_requests(user_id, fields=HISTORY_FIELDS)
+    all_donations = get_user_donations(user_id, fields=HISTORY_FIELDS)
     
     return render_template('user_dashboard.html', 
                          show_history=True,